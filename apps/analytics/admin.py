@@ -1 +1,15 @@
 from django.contrib import admin
+from .models import DailyShipmentFact, ExportWatermark
+
+
+@admin.register(DailyShipmentFact)
+class DailyShipmentFactAdmin(admin.ModelAdmin):
+    list_display   = ("day", "origin_zone", "dest_zone", "commodity", "shipment_type",
+                      "bookings", "weight_kg", "revenue", "compacted")
+    list_filter    = ("shipment_type", "compacted")
+    date_hierarchy = "day"
+
+
+@admin.register(ExportWatermark)
+class ExportWatermarkAdmin(admin.ModelAdmin):
+    list_display = ("dataset", "format", "last_updated_at", "files", "rows", "updated_at")
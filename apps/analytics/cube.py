@@ -0,0 +1,197 @@
+"""
+Daily shipment fact cube.
+
+    record_bookings  shipments created          → +bookings, kg, declared value, booked amount
+    record_payment   payment marked SUCCESS     → +payments, revenue
+    compact          nightly: a past day's delta rows → one row per key
+    rebuild          recompute days from shipments/payments (backfill, repair)
+
+Events insert delta rows inside the caller's transaction, so the cube
+rolls back with the booking and concurrent bookings on the same corridor
+never wait on each other. Facts are keyed by the shipment's booking day
+in local time; a payment counts towards its shipment's booking day.
+"""
+
+import logging
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, Max, Min, Sum
+from django.utils import timezone
+
+logger = logging.getLogger("ishemalink.analytics")
+
+DIMENSIONS = ("day", "origin_zone_id", "dest_zone_id", "commodity_id", "shipment_type")
+MEASURES   = ("bookings", "weight_kg", "declared_value", "booked_amount", "payments", "revenue")
+
+
+def day_start(day):
+    """Local midnight starting `day`, so timestamp ranges stay sargable."""
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def day_span(start, end, first, last):
+    """
+    The days a rebuild covers: [start, end], an open end taken from the
+    data's `first` / `last` timestamp. None when there is nothing to cover.
+    """
+    start = start or (first and timezone.localdate(first))
+    end   = end or (last and timezone.localdate(last))
+    return (start, end) if start and end and start <= end else None
+
+
+def each_day(span):
+    """Every day of a day_span(), oldest first."""
+    day, end = span or (None, None)
+    while span and day <= end:
+        yield day
+        day += timedelta(days=1)
+
+
+def _key(shipment) -> tuple:
+    return (
+        timezone.localdate(shipment.created_at), shipment.origin_zone_id, shipment.dest_zone_id,
+        shipment.commodity_id, shipment.shipment_type,
+    )
+
+
+def _rows(totals, compacted=False) -> list:
+    from apps.analytics.models import DailyShipmentFact
+
+    return [
+        DailyShipmentFact(**dict(zip(DIMENSIONS, key)), **values, compacted=compacted)
+        for key, values in totals.items()
+    ]
+
+
+def _zero() -> dict:
+    return {m: 0 if m in ("bookings", "payments") else Decimal("0") for m in MEASURES}
+
+
+def record_bookings(shipments):
+    """Add newly created shipments to the cube (one delta row per key)."""
+    from apps.analytics.models import DailyShipmentFact
+
+    totals = defaultdict(_zero)
+    for shipment in shipments:
+        row = totals[_key(shipment)]
+        row["bookings"]       += 1
+        row["weight_kg"]      += shipment.weight_kg or 0
+        row["declared_value"] += shipment.declared_value or 0
+        row["booked_amount"]  += shipment.total_amount or 0
+    if totals:
+        DailyShipmentFact.objects.bulk_create(_rows(totals))
+
+
+def record_booking(shipment):
+    record_bookings([shipment])
+
+
+def record_payment(payment):
+    """Add a successful payment's revenue to its shipment's cell."""
+    from apps.analytics.models import DailyShipmentFact
+
+    row = _zero()
+    row.update(payments=1, revenue=payment.amount)
+    DailyShipmentFact.objects.bulk_create(_rows({_key(payment.shipment): row}))
+
+
+def compact(before=None) -> int:
+    """Fold delta rows of each day before `before` (default: today) into one row per key."""
+    from apps.analytics.models import DailyShipmentFact
+
+    before = before or timezone.localdate()
+    days   = list(
+        DailyShipmentFact.objects.filter(compacted=False, day__lt=before)
+        .values_list("day", flat=True).distinct().order_by("day")
+    )
+    folded = 0
+    for day in days:
+        with transaction.atomic():
+            rows   = list(DailyShipmentFact.objects.select_for_update().filter(day=day))
+            totals = defaultdict(_zero)
+            for row in rows:
+                cell = totals[tuple(getattr(row, d) for d in DIMENSIONS)]
+                for m in MEASURES:
+                    cell[m] += getattr(row, m)
+            # Delete what was locked, not "the day": a late payment's delta
+            # committed meanwhile must survive until the next run
+            DailyShipmentFact.objects.filter(pk__in=[row.pk for row in rows]).delete()
+            DailyShipmentFact.objects.bulk_create(_rows(totals, compacted=True))
+        folded += len(rows) - len(totals)
+    if days:
+        logger.info("Analytics cube: compacted %d days, %d rows folded", len(days), folded)
+    return folded
+
+
+def _totals(day) -> dict:
+    """One booking day's cells, aggregated from its shipments and their successful payments."""
+    from apps.payments.models import Payment
+    from apps.shipments.models import Shipment
+
+    # Bounded on the timestamp (not the truncated day) so ship_created_route_idx serves the range
+    since, until = day_start(day), day_start(day + timedelta(days=1))
+    shipments = Shipment.objects.filter(created_at__gte=since, created_at__lt=until)
+    payments  = Payment.objects.filter(
+        status=Payment.Status.SUCCESS, shipment__created_at__gte=since, shipment__created_at__lt=until,
+    )
+
+    totals = defaultdict(_zero)
+    for row in shipments.values("origin_zone_id", "dest_zone_id", "commodity_id", "shipment_type").annotate(
+        n=Count("id"), kg=Sum("weight_kg"), value=Sum("declared_value"), booked=Sum("total_amount"),
+    ):
+        cell = totals[(day, *(row[d] for d in DIMENSIONS[1:]))]
+        cell.update(bookings=row["n"], weight_kg=row["kg"] or 0,
+                    declared_value=row["value"] or 0, booked_amount=row["booked"] or 0)
+    for row in payments.values(
+        "shipment__origin_zone_id", "shipment__dest_zone_id", "shipment__commodity_id", "shipment__shipment_type",
+    ).annotate(n=Count("id"), amount=Sum("amount")):
+        cell = totals[(day, row["shipment__origin_zone_id"], row["shipment__dest_zone_id"],
+                       row["shipment__commodity_id"], row["shipment__shipment_type"])]
+        cell.update(payments=row["n"], revenue=row["amount"] or 0)
+    return totals
+
+
+def _rebuild_day(day) -> int:
+    """Replace one booking day's facts with its recomputed cells, in one transaction."""
+    from apps.analytics.models import DailyShipmentFact
+
+    with transaction.atomic():
+        # Lock the day's facts, read, then delete only what was locked (as compact
+        # does): the transaction's snapshot covers both, so a delta committed
+        # after it is neither counted nor deleted
+        locked = list(DailyShipmentFact.objects.select_for_update().filter(day=day).values_list("pk", flat=True))
+        totals = _totals(day)
+        DailyShipmentFact.objects.filter(pk__in=locked).delete()
+        DailyShipmentFact.objects.bulk_create(_rows(totals, compacted=True), batch_size=1000)
+    return len(totals)
+
+
+def rebuild(start=None, end=None) -> int:
+    """
+    Recompute the cube for booking days in [start, end] (all history if
+    omitted), one day per transaction.
+    """
+    from apps.analytics.models import DailyShipmentFact
+    from apps.shipments.models import Shipment
+
+    bounds = {}
+    if start is None or end is None:
+        bounds = Shipment.objects.aggregate(first=Min("created_at"), last=Max("created_at"))
+    span = day_span(start, end, bounds.get("first"), bounds.get("last"))
+
+    # Facts in the requested window but outside the booking history are stale
+    stale = DailyShipmentFact.objects.all()
+    if start:
+        stale = stale.filter(day__gte=start)
+    if end:
+        stale = stale.filter(day__lte=end)
+    if span:
+        stale = stale.exclude(day__range=span)
+    stale.delete()
+
+    cells = sum(_rebuild_day(day) for day in each_day(span))
+    logger.info("Analytics cube: rebuilt %d cells", cells)
+    return cells
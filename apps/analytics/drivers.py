@@ -0,0 +1,186 @@
+"""
+Driver delivery stats behind the leaderboard.
+
+    record_delivery  DELIVERED transition  → the driver's row for the delivery day
+    leaderboard      top drivers over a filtered set of rows
+    rebuild          recompute days from delivered shipments (backfill, repair)
+
+Rows are kept per driver × delivery day × origin zone × commodity ×
+shipment type, so the leaderboard slices by province, type and commodity
+like the cube does. A row counts deliveries and kg and keeps a QuantileSketch
+(apps.analytics.quantiles) of ASSIGNED→DELIVERED durations. A delivery is
+on time when it took no longer than its corridor's median transit
+(EtaEngine.expected_transit) at the moment it was delivered; corridors
+with too little history leave it unrated. The leaderboard sums rows per
+driver in SQL and merges sketches for the top drivers only, so ranking
+thousands of drivers never reads shipments or their events.
+"""
+
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, Min, Sum
+from django.utils import timezone
+
+from apps.analytics.cube import day_span, day_start, each_day
+from apps.analytics.quantiles import QuantileSketch
+
+logger = logging.getLogger("ishemalink.analytics")
+
+
+def _sketch(data=None) -> QuantileSketch:
+    return QuantileSketch.from_dict(data) if data else QuantileSketch(settings.DRIVER_STATS_ACCURACY)
+
+
+def _duration(assigned_at, delivered_at):
+    if assigned_at and delivered_at and delivered_at >= assigned_at:
+        return (delivered_at - assigned_at).total_seconds()
+    return None
+
+
+def _fold(stats, sketch, weight_kg, seconds, expected):
+    stats.deliveries += 1
+    stats.total_kg   += weight_kg or 0
+    if seconds is None:
+        return
+    sketch.add(seconds)
+    if expected is not None:
+        stats.rated   += 1
+        stats.on_time += seconds <= expected
+
+
+def record_delivery(shipment):
+    """Fold a just-delivered shipment into its driver's stats."""
+    from apps.analytics.models import DriverDeliveryStats
+    from apps.shipments.eta import eta_engine
+
+    if not (shipment.driver_id and shipment.delivered_at):
+        return
+    key = {
+        "driver_id":      shipment.driver_id,
+        "day":            timezone.localdate(shipment.delivered_at),
+        "origin_zone_id": shipment.origin_zone_id,
+        "commodity_id":   shipment.commodity_id,
+        "shipment_type":  shipment.shipment_type,
+    }
+    DriverDeliveryStats.objects.bulk_create([DriverDeliveryStats(**key)], ignore_conflicts=True)
+    with transaction.atomic():
+        stats  = DriverDeliveryStats.objects.select_for_update().get(**key)
+        sketch = _sketch(stats.durations)
+        _fold(
+            stats, sketch, shipment.weight_kg,
+            _duration(shipment.assigned_at, shipment.delivered_at),
+            eta_engine.expected_transit(shipment.origin_zone_id, shipment.dest_zone_id),
+        )
+        stats.durations = sketch.to_dict()
+        stats.save()
+
+
+def _minutes(seconds):
+    return None if seconds is None else round(seconds / 60)
+
+
+def leaderboard(stats=None, limit: int = 20) -> list:
+    """Top `limit` drivers by deliveries over `stats` (a DriverDeliveryStats queryset, default all)."""
+    from apps.analytics.models import DriverDeliveryStats
+    from apps.authentication.models import Agent
+
+    qs  = DriverDeliveryStats.objects.all() if stats is None else stats
+    top = list(
+        qs.values("driver_id")
+        .annotate(n=Sum("deliveries"), kg=Sum("total_kg"), n_rated=Sum("rated"), n_on_time=Sum("on_time"))
+        .order_by("-n", "driver_id")[:limit]
+    )
+    ids     = [row["driver_id"] for row in top]
+    drivers = {
+        pk: (name, plate)
+        for pk, name, plate in Agent.objects.filter(id__in=ids)
+        .values_list("id", "full_name", "driver_profile__vehicle_plate")
+    }
+    durations = {}
+    for driver_id, data in qs.filter(driver_id__in=ids).values_list("driver_id", "durations"):
+        if data:
+            if driver_id in durations:
+                durations[driver_id].merge(_sketch(data))
+            else:
+                durations[driver_id] = _sketch(data)
+
+    results = []
+    for row in top:
+        name, plate = drivers.get(row["driver_id"], ("", None))
+        sketch      = durations.get(row["driver_id"])
+        results.append({
+            "driver_name":  name,
+            "vehicle":      plate,
+            "deliveries":   row["n"],
+            "total_kg":     row["kg"],
+            "on_time_rate": round(row["n_on_time"] / row["n_rated"], 4) if row["n_rated"] else None,
+            "p50_minutes":  _minutes(sketch.quantile(0.5)) if sketch else None,
+            "p90_minutes":  _minutes(sketch.quantile(0.9)) if sketch else None,
+        })
+    return results
+
+
+def _rebuild_day(delivered, day) -> int:
+    """Replace one delivery day's rows from that day's deliveries, in one transaction."""
+    from apps.analytics.models import DriverDeliveryStats
+    from apps.shipments.eta import eta_engine
+
+    # Bounded on the timestamp (not the truncated day) so ship_delivered_idx serves the range
+    rows = delivered.filter(
+        delivered_at__gte=day_start(day), delivered_at__lt=day_start(day + timedelta(days=1)),
+    ).values_list("driver_id", "origin_zone_id", "dest_zone_id", "commodity_id", "shipment_type",
+                  "weight_kg", "assigned_at", "delivered_at")
+
+    stats, sketches = {}, defaultdict(_sketch)
+    with transaction.atomic():
+        for driver_id, origin, dest, commodity_id, shipment_type, weight_kg, assigned_at, delivered_at in rows:
+            key = (driver_id, origin, commodity_id, shipment_type)
+            row = stats.get(key)
+            if row is None:
+                row = stats[key] = DriverDeliveryStats(
+                    driver_id=driver_id, day=day, origin_zone_id=origin,
+                    commodity_id=commodity_id, shipment_type=shipment_type,
+                )
+            _fold(row, sketches[key], weight_kg, _duration(assigned_at, delivered_at),
+                  eta_engine.expected_transit(origin, dest))
+        for key, row in stats.items():
+            row.durations = sketches[key].to_dict()
+        DriverDeliveryStats.objects.filter(day=day).delete()
+        DriverDeliveryStats.objects.bulk_create(stats.values(), batch_size=1000)
+    return len(stats)
+
+
+def rebuild(start=None, end=None) -> int:
+    """
+    Recompute driver stats for delivery days in [start, end] (all history
+    if omitted), one day per transaction so memory and locks stay bounded
+    by a day's deliveries. On-time is judged against today's corridor medians.
+    """
+    from apps.analytics.models import DriverDeliveryStats
+    from apps.shipments.models import Shipment
+
+    delivered = Shipment.objects.filter(
+        status=Shipment.Status.DELIVERED, driver__isnull=False, delivered_at__isnull=False,
+    )
+    bounds = {}
+    if start is None or end is None:
+        bounds = delivered.aggregate(first=Min("delivered_at"), last=Max("delivered_at"))
+    span = day_span(start, end, bounds.get("first"), bounds.get("last"))
+
+    # Rows in the requested window but outside the delivered history are stale
+    stale = DriverDeliveryStats.objects.all()
+    if start:
+        stale = stale.filter(day__gte=start)
+    if end:
+        stale = stale.filter(day__lte=end)
+    if span:
+        stale = stale.exclude(day__range=span)
+    stale.delete()
+
+    written = sum(_rebuild_day(delivered, day) for day in each_day(span))
+    logger.info("Driver stats: rebuilt %d driver-day rows", written)
+    return written
@@ -0,0 +1,256 @@
+"""
+Bulk dataset exports for MINICOM / RRA business intelligence.
+
+    export_dataset("shipments", "csv")      → shipments/month=2026-05/part-00001.csv.gz
+    export_dataset("payments", "parquet")   → payments/month=2026-05/part-00002.parquet
+
+Rows are anonymised as in the analytics views: zones, commodity, weights
+and amounts — never names, phone numbers or gateway references.
+
+Exports are a change feed keyed on updated_at: a row is written again
+whenever it changes (a shipment delivered, a payment settled), so readers
+upsert on shipment_id / payment_id and keep the row with the latest
+updated_at. Files are partitioned by the month of the change.
+
+Each run continues from the dataset's ExportWatermark, reading rows in
+(updated_at, id) order in keyset-paginated batches of EXPORT_CHUNK. Rows go
+to a temp file — one per month, split every EXPORT_FILE_ROWS rows — which
+is then saved to EXPORT_STORAGE (local disk, or MinIO through an S3
+storage backend). Memory holds one EXPORT_CHUNK of rows whatever the
+range. The watermark moves after each stored file, so an interrupted
+export resumes at the last complete file. Rows changed less than
+EXPORT_SETTLE_SECONDS ago wait for the next run, so a transaction still
+in flight cannot commit behind the watermark.
+
+Parquet needs pyarrow (optional dependency); CSV is gzip-compressed.
+"""
+
+import csv
+import gzip
+import logging
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files import File
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger("ishemalink.analytics")
+
+# (column, ORM lookup, kind) — kind picks the Parquet type
+SHIPMENT_COLUMNS = (
+    ("shipment_id",         "id",                    "str"),
+    ("created_at",          "created_at",            "timestamp"),
+    ("shipment_type",       "shipment_type",         "str"),
+    ("status",              "status",                "str"),
+    ("origin_zone",         "origin_zone__name",     "str"),
+    ("origin_province",     "origin_zone__province", "str"),
+    ("dest_zone",           "dest_zone__name",       "str"),
+    ("dest_province",       "dest_zone__province",   "str"),
+    ("destination_country", "destination_country",   "str"),
+    ("commodity",           "commodity__name",       "str"),
+    ("hs_code",             "commodity__hs_code",    "str"),
+    ("weight_kg",           "weight_kg",             "decimal"),
+    ("declared_value",      "declared_value",        "decimal"),
+    ("tariff",              "calculated_tariff",     "decimal"),
+    ("vat_amount",          "vat_amount",            "decimal"),
+    ("total_amount",        "total_amount",          "decimal"),
+    ("delivered_at",        "delivered_at",          "timestamp"),
+    ("updated_at",          "updated_at",            "timestamp"),
+)
+
+PAYMENT_COLUMNS = (
+    ("payment_id",  "id",          "str"),
+    ("shipment_id", "shipment_id", "str"),
+    ("created_at",  "created_at",  "timestamp"),
+    ("provider",    "provider",    "str"),
+    ("amount",      "amount",      "decimal"),
+    ("currency",    "currency",    "str"),
+    ("status",      "status",      "str"),
+    ("updated_at",  "updated_at",  "timestamp"),
+)
+
+DATASETS = {
+    "shipments": ("shipments.Shipment", SHIPMENT_COLUMNS),
+    "payments":  ("payments.Payment",   PAYMENT_COLUMNS),
+}
+
+
+def export_storage():
+    """The storage backend exports are written to (settings.EXPORT_STORAGE)."""
+    backend = import_string(settings.EXPORT_STORAGE["BACKEND"])
+    return backend(**settings.EXPORT_STORAGE.get("OPTIONS", {}))
+
+
+# ── File writers ──────────────────────────────────────────────────────────────
+class _Part:
+    """One output file being written to a temp path, buffered EXPORT_CHUNK rows at a time."""
+
+    extension = ""
+
+    def __init__(self, path, columns):
+        self.path    = path
+        self.columns = columns
+        self.rows    = 0
+        self.last    = None
+        self._buffer = []
+
+    def add(self, row):
+        self._buffer.append(row)
+        self.rows += 1
+        self.last  = row
+        if len(self._buffer) >= settings.EXPORT_CHUNK:
+            self.flush()
+
+    def flush(self):
+        if self._buffer:
+            self._write(self._buffer)
+            self._buffer = []
+
+    def close(self) -> str:
+        self.flush()
+        self._close()
+        return self.path
+
+
+class _CsvPart(_Part):
+    extension = ".csv.gz"
+
+    def __init__(self, path, columns):
+        super().__init__(path, columns)
+        self._file = gzip.open(path, "wt", encoding="utf-8", newline="")
+        self._csv  = csv.writer(self._file)
+        self._csv.writerow([name for name, _, _ in columns])
+
+    def _write(self, rows):
+        self._csv.writerows(
+            ["" if v is None else v.isoformat() if isinstance(v, datetime) else v for v in row]
+            for row in rows
+        )
+
+    def _close(self):
+        self._file.close()
+
+
+class _ParquetPart(_Part):
+    extension = ".parquet"
+
+    def __init__(self, path, columns):
+        super().__init__(path, columns)
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        types = {
+            "str":       pa.string(),
+            "decimal":   pa.decimal128(18, 2),
+            "timestamp": pa.timestamp("us", tz="UTC"),
+        }
+        self._pa     = pa
+        self._schema = pa.schema([(name, types[kind]) for name, _, kind in columns])
+        self._writer = pq.ParquetWriter(path, self._schema, compression="zstd")
+
+    def _write(self, rows):
+        pa      = self._pa
+        columns = zip(*rows)
+        arrays  = [
+            pa.array([None if v is None else str(v) for v in values] if kind == "str" else values, type=field.type)
+            for values, (_, _, kind), field in zip(columns, self.columns, self._schema)
+        ]
+        self._writer.write_table(pa.Table.from_arrays(arrays, schema=self._schema))   # one row group
+
+    def _close(self):
+        self._writer.close()
+
+
+FORMATS = {"csv": _CsvPart, "parquet": _ParquetPart}
+
+
+# ── Export ────────────────────────────────────────────────────────────────────
+def _store(storage, part, mark, key, dataset, month) -> str:
+    """Save a finished part and move the watermark past its last row."""
+    path = part.close()
+    name = f"{dataset}/month={month}/part-{mark.files + 1:05d}{part.extension}"
+    if storage.exists(name):                    # left by a run that died before its watermark moved
+        storage.delete(name)
+    with open(path, "rb") as fh:
+        name = storage.save(name, File(fh))
+    os.remove(path)
+
+    mark.last_id, mark.last_updated_at = part.last[key[0]], part.last[key[1]]
+    mark.files += 1
+    mark.rows  += part.rows
+    mark.save()
+    return name
+
+
+def _keyset_rows(qs, key, after_ts, after_id):
+    """
+    Rows after (after_ts, after_id) in EXPORT_CHUNK pages, each a separate
+    short query — PgBouncer transaction pooling cannot keep a server-side
+    cursor alive between FETCHes.
+    """
+    while True:
+        page = qs
+        if after_ts is not None:
+            page = page.filter(Q(updated_at__gt=after_ts) | Q(updated_at=after_ts, id__gt=after_id))
+        page = list(page[:settings.EXPORT_CHUNK])
+        yield from page
+        if len(page) < settings.EXPORT_CHUNK:
+            return
+        after_id, after_ts = page[-1][key[0]], page[-1][key[1]]
+
+
+def export_dataset(dataset: str, fmt: str = None) -> dict:
+    """
+    Export the dataset's rows changed since its watermark. Returns
+    {"rows": n, "files": [stored names]}.
+    """
+    from apps.analytics.models import ExportWatermark
+
+    fmt = fmt or settings.EXPORT_FORMAT
+    if dataset not in DATASETS:
+        raise ValueError(f"Unknown dataset '{dataset}'; choose from {', '.join(DATASETS)}.")
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format '{fmt}'; choose from {', '.join(FORMATS)}.")
+    if fmt == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ImproperlyConfigured("Parquet exports need pyarrow (pip install pyarrow).")
+
+    label, columns = DATASETS[dataset]
+    model   = apps.get_model(label)
+    mark, _ = ExportWatermark.objects.get_or_create(dataset=dataset, format=fmt)
+
+    lookups = [lookup for _, lookup, _ in columns]
+    key     = (lookups.index("id"), lookups.index("updated_at"))      # the watermark
+    qs      = model.objects.filter(
+        updated_at__lt=timezone.now() - timedelta(seconds=settings.EXPORT_SETTLE_SECONDS),
+    )
+    rows = _keyset_rows(qs.order_by("updated_at", "id").values_list(*lookups), key,
+                        mark.last_updated_at, mark.last_id)
+
+    storage, stored, exported = export_storage(), [], 0
+    with tempfile.TemporaryDirectory(prefix="ishemalink-export-") as tmp:
+        part = month = None
+        for row in rows:
+            row_month = timezone.localtime(row[key[1]]).strftime("%Y-%m")
+            if part and (row_month != month or part.rows >= settings.EXPORT_FILE_ROWS):
+                stored.append(_store(storage, part, mark, key, dataset, month))
+                exported += part.rows
+                part = None
+            if part is None:
+                part, month = FORMATS[fmt](os.path.join(tmp, f"part{FORMATS[fmt].extension}"), columns), row_month
+            part.add(row)
+        if part:
+            stored.append(_store(storage, part, mark, key, dataset, month))
+            exported += part.rows
+
+    if stored:
+        logger.info("Export %s.%s: %d rows in %d files", dataset, fmt, exported, len(stored))
+    return {"rows": exported, "files": stored}
@@ -0,0 +1,115 @@
+"""
+HyperLogLog distinct-count sketch.
+
+2^p one-byte registers; each value hashes (64-bit BLAKE2b) to a register
+and a rank, and the register keeps the highest rank seen. Sketches merge
+by register-wise max, so a day's sketches combine into any range without
+double counting. Relative standard error is 1.04/√(2^p) — 1.6% at the
+default p=12 (4 KB).
+
+Serialised sparse (3 bytes per non-zero register) while that is smaller
+than the dense form, so a quiet corridor-day costs a few dozen bytes.
+"""
+
+import hashlib
+import math
+
+SPARSE, DENSE = b"S", b"D"
+
+
+def _sigma(x: float) -> float:
+    if x == 1.0:
+        return math.inf
+    y, z = 1.0, x
+    while True:
+        x *= x
+        z_old, z = z, z + x * y
+        y += y
+        if z == z_old:
+            return z
+
+
+def _tau(x: float) -> float:
+    if x in (0.0, 1.0):
+        return 0.0
+    y, z = 1.0, 1.0 - x
+    while True:
+        x = math.sqrt(x)
+        y *= 0.5
+        z_old, z = z, z - (1.0 - x) ** 2 * y
+        if z == z_old:
+            return z / 3
+
+
+class DistinctSketch:
+    __slots__ = ("p", "registers")
+
+    def __init__(self, p: int = 12):
+        if not 4 <= p <= 16:
+            raise ValueError("HyperLogLog precision must be between 4 and 16.")
+        self.p         = p
+        self.registers = bytearray(1 << p)
+
+    def _position(self, value) -> tuple:
+        x    = int.from_bytes(hashlib.blake2b(str(value).encode(), digest_size=8).digest(), "big")
+        bits = 64 - self.p
+        return x >> bits, bits - (x & ((1 << bits) - 1)).bit_length() + 1
+
+    def add(self, value) -> bool:
+        """Count `value`; True if a register grew (i.e. the stored sketch must be rewritten)."""
+        index, rank = self._position(value)
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+            return True
+        return False
+
+    def merge(self, other: "DistinctSketch") -> "DistinctSketch":
+        if other.p != self.p:
+            raise ValueError(f"Cannot merge sketches of precision {self.p} and {other.p}.")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def merge_bytes(self, data) -> "DistinctSketch":
+        """Merge a serialised sketch; sparse ones without expanding them."""
+        data = bytes(data)
+        if data[:1] == DENSE:
+            return self.merge(self.from_bytes(data))
+        if data[1] != self.p:
+            raise ValueError(f"Cannot merge sketches of precision {self.p} and {data[1]}.")
+        registers = self.registers
+        for i in range(2, len(data), 3):
+            index, rank = int.from_bytes(data[i:i + 2], "big"), data[i + 2]
+            if rank > registers[index]:
+                registers[index] = rank
+        return self
+
+    def count(self) -> int:
+        # Ertl's improved estimator: unbiased from 0 to 2^64 without the
+        # linear-counting switch or empirical bias tables of HLL++
+        m, q = len(self.registers), 64 - self.p
+        hist = [self.registers.count(rank) for rank in range(q + 2)]
+        z    = m * _tau(1 - hist[q + 1] / m)
+        for rank in range(q, 0, -1):
+            z = 0.5 * (z + hist[rank])
+        z += m * _sigma(hist[0] / m)
+        return round(m * m / (2 * math.log(2) * z))
+
+    @property
+    def standard_error(self) -> float:
+        """Relative standard error of count()."""
+        return 1.04 / math.sqrt(1 << self.p)
+
+    def to_bytes(self) -> bytes:
+        used = [(i, rank) for i, rank in enumerate(self.registers) if rank]
+        if 3 * len(used) < len(self.registers):
+            return SPARSE + bytes([self.p]) + b"".join(i.to_bytes(2, "big") + bytes([rank]) for i, rank in used)
+        return DENSE + bytes([self.p]) + bytes(self.registers)
+
+    @classmethod
+    def from_bytes(cls, data) -> "DistinctSketch":
+        data   = bytes(data)
+        sketch = cls(data[1])
+        if data[:1] == DENSE:
+            sketch.registers = bytearray(data[2:])
+            return sketch
+        return sketch.merge_bytes(data)
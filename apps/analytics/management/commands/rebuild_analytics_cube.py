@@ -0,0 +1,30 @@
+"""
+Management command: recompute the daily shipment fact cube, the distinct-count
+sketches and the driver delivery stats from shipments and payments.
+
+Usage:
+    python manage.py rebuild_analytics_cube                       # all history
+    python manage.py rebuild_analytics_cube --from 2026-01-01 --to 2026-03-31
+"""
+
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Rebuild the analytics fact cube, sketches and driver stats (backfill after deploy, or repair a date range)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--from", dest="start", type=date.fromisoformat, default=None)
+        parser.add_argument("--to",   dest="end",   type=date.fromisoformat, default=None)
+
+    def handle(self, *args, start=None, end=None, **options):
+        from apps.analytics import cube, drivers, sketches
+
+        cells = cube.rebuild(start, end)
+        self.stdout.write(self.style.SUCCESS(f"Analytics cube rebuilt: {cells} cells."))
+        cells = sketches.rebuild(start, end)
+        self.stdout.write(self.style.SUCCESS(f"Distinct-count sketches rebuilt: {cells} cells."))
+        rows = drivers.rebuild(start, end)
+        self.stdout.write(self.style.SUCCESS(f"Driver delivery stats rebuilt: {rows} driver-days."))
@@ -0,0 +1,46 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ("shipments", "0003_eta_transit_stats"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DailyShipmentFact",
+            fields=[
+                ("id",              models.BigAutoField(auto_created=True, primary_key=True, serialize=False)),
+                ("day",             models.DateField()),
+                ("shipment_type",   models.CharField(max_length=15)),
+                ("bookings",        models.IntegerField(default=0)),
+                ("weight_kg",       models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ("declared_value",  models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ("booked_amount",   models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ("payments",        models.IntegerField(default=0)),
+                ("revenue",         models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ("compacted",       models.BooleanField(default=False)),
+                ("origin_zone",     models.ForeignKey(
+                    on_delete=django.db.models.deletion.PROTECT, related_name="+", to="shipments.zone",
+                )),
+                ("dest_zone",       models.ForeignKey(
+                    on_delete=django.db.models.deletion.PROTECT, related_name="+", to="shipments.zone",
+                )),
+                ("commodity",       models.ForeignKey(
+                    on_delete=django.db.models.deletion.PROTECT, related_name="+", to="shipments.commodity",
+                )),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="dailyshipmentfact",
+            index=models.Index(fields=["day", "origin_zone", "dest_zone"], name="fact_day_route_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="dailyshipmentfact",
+            index=models.Index(condition=models.Q(("compacted", False)), fields=["day"], name="fact_delta_day_idx"),
+        ),
+    ]
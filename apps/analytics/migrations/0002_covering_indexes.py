@@ -0,0 +1,30 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("analytics", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="dailyshipmentfact",
+            name="fact_day_route_idx",
+        ),
+        migrations.AddIndex(
+            model_name="dailyshipmentfact",
+            index=models.Index(
+                fields=["day", "origin_zone", "dest_zone", "commodity", "shipment_type"],
+                include=["bookings", "weight_kg", "declared_value", "booked_amount", "payments", "revenue"],
+                name="fact_day_cover_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="dailyshipmentfact",
+            index=models.Index(
+                fields=["commodity", "day"], include=["bookings", "weight_kg", "declared_value"],
+                name="fact_commodity_day_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,29 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("analytics", "0002_covering_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ExportWatermark",
+            fields=[
+                ("id",              models.BigAutoField(auto_created=True, primary_key=True, serialize=False)),
+                ("dataset",         models.CharField(max_length=30)),
+                ("format",          models.CharField(max_length=10)),
+                ("last_updated_at", models.DateTimeField(blank=True, null=True)),
+                ("last_id",         models.UUIDField(blank=True, null=True)),
+                ("files",           models.PositiveIntegerField(default=0)),
+                ("rows",            models.BigIntegerField(default=0)),
+                ("updated_at",      models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(fields=("dataset", "format"), name="export_wm_dataset_fmt_uniq"),
+                ],
+            },
+        ),
+    ]
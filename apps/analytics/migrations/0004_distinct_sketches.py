@@ -0,0 +1,48 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+METRICS = [("SENDERS", "Unique senders"), ("DRIVERS", "Unique drivers")]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("analytics", "0003_exportwatermark"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CorridorSketch",
+            fields=[
+                ("id",          models.BigAutoField(auto_created=True, primary_key=True, serialize=False)),
+                ("day",         models.DateField()),
+                ("metric",      models.CharField(choices=METRICS, max_length=10)),
+                ("sketch",      models.BinaryField()),
+                ("updated_at",  models.DateTimeField(auto_now=True)),
+                ("origin_zone", models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name="+", to="shipments.zone")),
+                ("dest_zone",   models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name="+", to="shipments.zone")),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(fields=("metric", "day", "origin_zone", "dest_zone"), name="sketch_corridor_uniq"),
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="ZoneSketch",
+            fields=[
+                ("id",          models.BigAutoField(auto_created=True, primary_key=True, serialize=False)),
+                ("day",         models.DateField()),
+                ("metric",      models.CharField(choices=METRICS, max_length=10)),
+                ("sketch",      models.BinaryField()),
+                ("updated_at",  models.DateTimeField(auto_now=True)),
+                ("zone",        models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name="+", to="shipments.zone")),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(fields=("metric", "day", "zone"), name="sketch_zone_uniq"),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,46 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("analytics", "0004_distinct_sketches"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DriverDeliveryStats",
+            fields=[
+                ("id",            models.BigAutoField(auto_created=True, primary_key=True, serialize=False)),
+                ("day",           models.DateField()),
+                ("shipment_type", models.CharField(max_length=15)),
+                ("deliveries",    models.IntegerField(default=0)),
+                ("total_kg",      models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ("rated",         models.IntegerField(default=0)),
+                ("on_time",       models.IntegerField(default=0)),
+                ("durations",     models.JSONField(default=dict)),
+                ("updated_at",    models.DateTimeField(auto_now=True)),
+                ("driver",        models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="+", to=settings.AUTH_USER_MODEL)),
+                ("origin_zone",   models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name="+", to="shipments.zone")),
+                ("commodity",     models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name="+", to="shipments.commodity")),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("driver", "day", "origin_zone", "commodity", "shipment_type"),
+                        name="driver_stats_day_uniq",
+                    ),
+                ],
+                "indexes": [
+                    models.Index(
+                        fields=["day", "driver"],
+                        include=["origin_zone", "commodity", "shipment_type", "deliveries", "total_kg", "rated", "on_time"],
+                        name="driver_stats_day_idx",
+                    ),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,166 @@
+"""
+Analytics models — the daily shipment fact cube, distinct-count sketches
+and driver delivery stats behind /api/analytics/, and the watermarks of
+the bulk dataset exports (apps.analytics.export).
+"""
+
+from django.conf import settings
+from django.db import models
+
+
+class DailyShipmentFact(models.Model):
+    """
+    Bookings and revenue per day × origin zone × destination zone ×
+    commodity × shipment type. Booking and payment events each append a
+    delta row (no row locks on hot keys); compaction folds a past day's
+    rows into one row per key. Queries always SUM, so both shapes read
+    the same.
+    """
+
+    day             = models.DateField()                      # booking day, Africa/Kigali
+    origin_zone     = models.ForeignKey("shipments.Zone", on_delete=models.PROTECT, related_name="+")
+    dest_zone       = models.ForeignKey("shipments.Zone", on_delete=models.PROTECT, related_name="+")
+    commodity       = models.ForeignKey("shipments.Commodity", on_delete=models.PROTECT, related_name="+")
+    shipment_type   = models.CharField(max_length=15)
+
+    bookings        = models.IntegerField(default=0)
+    weight_kg       = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    declared_value  = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    booked_amount   = models.DecimalField(max_digits=18, decimal_places=2, default=0)   # Σ total_amount
+    payments        = models.IntegerField(default=0)
+    revenue         = models.DecimalField(max_digits=18, decimal_places=2, default=0)   # Σ successful payments
+
+    compacted       = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            # Every analytics query: day range, grouped by any dimension, read index-only
+            models.Index(
+                fields=["day", "origin_zone", "dest_zone", "commodity", "shipment_type"],
+                include=["bookings", "weight_kg", "declared_value", "booked_amount", "payments", "revenue"],
+                name="fact_day_cover_idx",
+            ),
+            # commodity=… over a long range
+            models.Index(
+                fields=["commodity", "day"], include=["bookings", "weight_kg", "declared_value"],
+                name="fact_commodity_day_idx",
+            ),
+            # Compaction: days that still have delta rows
+            models.Index(fields=["day"], name="fact_delta_day_idx", condition=models.Q(compacted=False)),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.origin_zone_id}→{self.dest_zone_id} ×{self.bookings}"
+
+
+class SketchMetric(models.TextChoices):
+    SENDERS = "SENDERS", "Unique senders"
+    DRIVERS = "DRIVERS", "Unique drivers"
+
+
+class CorridorSketch(models.Model):
+    """
+    HyperLogLog of the distinct senders (by booking day) or drivers (by
+    assignment day) on one corridor on one day — see apps.analytics.sketches.
+    """
+
+    day         = models.DateField()
+    origin_zone = models.ForeignKey("shipments.Zone", on_delete=models.PROTECT, related_name="+")
+    dest_zone   = models.ForeignKey("shipments.Zone", on_delete=models.PROTECT, related_name="+")
+    metric      = models.CharField(max_length=10, choices=SketchMetric.choices)
+    sketch      = models.BinaryField()                       # DistinctSketch.to_bytes()
+    updated_at  = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["metric", "day", "origin_zone", "dest_zone"], name="sketch_corridor_uniq"),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.origin_zone_id}→{self.dest_zone_id} {self.metric}"
+
+
+class ZoneSketch(models.Model):
+    """As CorridorSketch, for every shipment from or to one zone."""
+
+    day         = models.DateField()
+    zone        = models.ForeignKey("shipments.Zone", on_delete=models.PROTECT, related_name="+")
+    metric      = models.CharField(max_length=10, choices=SketchMetric.choices)
+    sketch      = models.BinaryField()
+    updated_at  = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["metric", "day", "zone"], name="sketch_zone_uniq"),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.zone_id} {self.metric}"
+
+
+class DriverDeliveryStats(models.Model):
+    """
+    One driver's deliveries on one day (delivery day, Africa/Kigali) per
+    origin zone × commodity × shipment type — the cube's dimensions, so the
+    leaderboard takes the same filters as every other analytics endpoint.
+    Folded in on each DELIVERED transition — see apps.analytics.drivers.
+    `durations` is a QuantileSketch of ASSIGNED→DELIVERED seconds; `rated`
+    counts deliveries whose corridor had an expected transit time, and
+    `on_time` those that arrived within it.
+    """
+
+    driver        = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="+")
+    day           = models.DateField()
+    origin_zone   = models.ForeignKey("shipments.Zone", on_delete=models.PROTECT, related_name="+")
+    commodity     = models.ForeignKey("shipments.Commodity", on_delete=models.PROTECT, related_name="+")
+    shipment_type = models.CharField(max_length=15)
+    deliveries    = models.IntegerField(default=0)
+    total_kg      = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    rated         = models.IntegerField(default=0)
+    on_time       = models.IntegerField(default=0)
+    durations     = models.JSONField(default=dict)              # QuantileSketch.to_dict()
+    updated_at    = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["driver", "day", "origin_zone", "commodity", "shipment_type"],
+                name="driver_stats_day_uniq",
+            ),
+        ]
+        indexes = [
+            # Leaderboard: day range, any dimension filter, summed per driver, read index-only
+            models.Index(
+                fields=["day", "driver"],
+                include=["origin_zone", "commodity", "shipment_type", "deliveries", "total_kg", "rated", "on_time"],
+                name="driver_stats_day_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.driver_id}: {self.deliveries} deliveries"
+
+
+class ExportWatermark(models.Model):
+    """
+    How far a dataset's incremental export has got, per output format:
+    the (updated_at, id) of the last row written to a stored file. Advanced
+    only after a file is saved, so an interrupted export resumes from the
+    last complete file.
+    """
+
+    dataset         = models.CharField(max_length=30)
+    format          = models.CharField(max_length=10)
+    last_updated_at = models.DateTimeField(null=True, blank=True)
+    last_id         = models.UUIDField(null=True, blank=True)
+    files           = models.PositiveIntegerField(default=0)     # also numbers the next part
+    rows            = models.BigIntegerField(default=0)
+    updated_at      = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["dataset", "format"], name="export_wm_dataset_fmt_uniq"),
+        ]
+
+    def __str__(self):
+        return f"{self.dataset}.{self.format} @ {self.last_updated_at} ({self.rows} rows)"
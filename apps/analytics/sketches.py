@@ -0,0 +1,217 @@
+"""
+Distinct senders / drivers per day × corridor and per day × zone.
+
+    record_senders   shipments booked    → sender into SENDERS sketches (booking day)
+    record_driver    driver assigned     → driver into DRIVERS sketches (assignment day)
+    unique_counts    merge a day range's sketches per corridor or per zone
+    rebuild          recompute days from shipments (backfill, repair)
+
+Each cell holds a DistinctSketch (apps.analytics.hll) of HLL_PRECISION,
+and a zone's cell covers shipments from and to it. An event reads its
+cells without locking and locks and rewrites only those whose registers
+grow — rare once a cell has seen its regular senders — so bookings on a
+busy corridor don't queue on one row. Unique counts over any range cost
+one merge per stored cell instead of a COUNT(DISTINCT) over shipments.
+"""
+
+import logging
+from collections import defaultdict
+from datetime import timedelta
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, Min, Q
+from django.utils import timezone
+
+from apps.analytics.cube import day_span, day_start, each_day
+from apps.analytics.hll import DistinctSketch
+
+logger = logging.getLogger("ishemalink.analytics")
+
+CORRIDOR = ("day", "origin_zone_id", "dest_zone_id")
+ZONE     = ("day", "zone_id")
+
+
+def _sketch(values=()) -> DistinctSketch:
+    sketch = DistinctSketch(settings.HLL_PRECISION)
+    for value in values:
+        sketch.add(value)
+    return sketch
+
+
+def _cells(events) -> tuple:
+    """[(day, origin, dest, value), ...] → ({corridor key: values}, {zone key: values})."""
+    corridors, zones = defaultdict(set), defaultdict(set)
+    for day, origin, dest, value in events:
+        value = str(value)
+        corridors[(day, origin, dest)].add(value)
+        zones[(day, origin)].add(value)
+        zones[(day, dest)].add(value)
+    return corridors, zones
+
+
+def _add(model, fields, metric, cells):
+    if not cells:
+        return
+    model.objects.bulk_create(
+        [model(**dict(zip(fields, key)), metric=metric, sketch=_sketch().to_bytes()) for key in cells],
+        ignore_conflicts=True,
+    )
+    match   = reduce(or_, (Q(**dict(zip(fields, key))) for key in cells))
+    growing = []
+    for pk, *key, blob in model.objects.filter(match, metric=metric).values_list("pk", *fields, "sketch"):
+        sketch = DistinctSketch.from_bytes(blob)
+        if any(sketch.add(value) for value in cells[tuple(key)]):
+            growing.append(pk)
+    if not growing:
+        return
+
+    now = timezone.now()
+    with transaction.atomic():
+        rows = list(model.objects.select_for_update().filter(pk__in=growing).order_by("pk"))
+        for row in rows:
+            sketch = DistinctSketch.from_bytes(row.sketch)
+            for value in cells[tuple(getattr(row, field) for field in fields)]:
+                sketch.add(value)
+            row.sketch, row.updated_at = sketch.to_bytes(), now
+        model.objects.bulk_update(rows, ["sketch", "updated_at"])
+
+
+def _record(metric, events):
+    from apps.analytics.models import CorridorSketch, ZoneSketch
+
+    corridors, zones = _cells(events)
+    _add(CorridorSketch, CORRIDOR, metric, corridors)
+    _add(ZoneSketch, ZONE, metric, zones)
+
+
+def record_senders(shipments):
+    """Count newly booked shipments' senders."""
+    from apps.analytics.models import SketchMetric
+
+    _record(SketchMetric.SENDERS, [
+        (timezone.localdate(s.created_at), s.origin_zone_id, s.dest_zone_id, s.sender_id) for s in shipments
+    ])
+
+
+def record_driver(shipment):
+    """Count the driver just assigned to `shipment`."""
+    from apps.analytics.models import SketchMetric
+
+    if shipment.driver_id:
+        day = timezone.localdate(shipment.assigned_at or timezone.now())
+        _record(SketchMetric.DRIVERS, [(day, shipment.origin_zone_id, shipment.dest_zone_id, shipment.driver_id)])
+
+
+def unique_counts(scope: str, metric: str, start=None, end=None, province=None) -> list:
+    """
+    Distinct senders/drivers per corridor (scope="corridor") or zone
+    (scope="zone") over [start, end], largest first, each with the
+    estimate's 95% margin.
+    """
+    from apps.analytics.models import CorridorSketch, ZoneSketch
+
+    if scope == "corridor":
+        qs, labels, zone = CorridorSketch.objects, ("origin", "destination"), "origin_zone"
+        columns = ("origin_zone__name", "dest_zone__name")
+    else:
+        qs, labels, zone = ZoneSketch.objects, ("zone", "province"), "zone"
+        columns = ("zone__name", "zone__province")
+
+    qs = qs.filter(metric=metric)
+    if start:
+        qs = qs.filter(day__gte=start)
+    if end:
+        qs = qs.filter(day__lte=end)
+    if province:
+        qs = qs.filter(**{f"{zone}__province__iexact": province})
+
+    merged = {}
+    for *group, blob in qs.values_list(*columns, "sketch").iterator(chunk_size=2000):
+        group = tuple(group)
+        if group in merged:
+            merged[group].merge_bytes(blob)
+        else:
+            merged[group] = DistinctSketch.from_bytes(blob)
+
+    results = []
+    for group, sketch in merged.items():
+        unique = sketch.count()
+        results.append({
+            **dict(zip(labels, group)),
+            "unique":    unique,
+            "margin_95": round(1.96 * sketch.standard_error * unique),
+        })
+    return sorted(results, key=lambda r: -r["unique"])
+
+
+def _build(metric, events) -> int:
+    """Write one day's sketches from its (day, origin, dest, value) rows."""
+    from apps.analytics.models import CorridorSketch, ZoneSketch
+
+    written = 0
+    corridors, zones = _cells(events)
+    for model, fields, cells in ((CorridorSketch, CORRIDOR, corridors), (ZoneSketch, ZONE, zones)):
+        model.objects.bulk_create(
+            [model(**dict(zip(fields, key)), metric=metric, sketch=_sketch(values).to_bytes())
+             for key, values in cells.items()],
+            batch_size=500,
+        )
+        written += len(cells)
+    return written
+
+
+def _rebuild_day(day) -> int:
+    """Replace one day's sketches from that day's bookings and assignments, in one transaction."""
+    from apps.analytics.models import CorridorSketch, SketchMetric, ZoneSketch
+    from apps.shipments.models import Shipment
+
+    # Bounded on the timestamps (not the truncated day) so their indexes serve the range
+    since, until = day_start(day), day_start(day + timedelta(days=1))
+    senders = Shipment.objects.filter(created_at__gte=since, created_at__lt=until)
+    drivers = Shipment.objects.filter(driver__isnull=False, assigned_at__gte=since, assigned_at__lt=until)
+
+    with transaction.atomic():
+        CorridorSketch.objects.filter(day=day).delete()
+        ZoneSketch.objects.filter(day=day).delete()
+        cells = _build(SketchMetric.SENDERS, [
+            (day, *row) for row in senders.values_list("origin_zone_id", "dest_zone_id", "sender_id")
+        ])
+        cells += _build(SketchMetric.DRIVERS, [
+            (day, *row) for row in drivers.values_list("origin_zone_id", "dest_zone_id", "driver_id")
+        ])
+    return cells
+
+
+def rebuild(start=None, end=None) -> int:
+    """
+    Recompute the sketches for days in [start, end] (all history if
+    omitted), one day per transaction.
+    """
+    from apps.analytics.models import CorridorSketch, ZoneSketch
+    from apps.shipments.models import Shipment
+
+    bounds = {}
+    if start is None or end is None:
+        bounds = Shipment.objects.aggregate(
+            first=Min("created_at"), booked=Max("created_at"), assigned=Max("assigned_at"),
+        )
+        bounds["last"] = max(filter(None, (bounds["booked"], bounds["assigned"])), default=None)
+    span = day_span(start, end, bounds.get("first"), bounds.get("last"))
+
+    # Sketches in the requested window but outside the shipment history are stale
+    for model in (CorridorSketch, ZoneSketch):
+        stale = model.objects.all()
+        if start:
+            stale = stale.filter(day__gte=start)
+        if end:
+            stale = stale.filter(day__lte=end)
+        if span:
+            stale = stale.exclude(day__range=span)
+        stale.delete()
+
+    cells = sum(_rebuild_day(day) for day in each_day(span))
+    logger.info("Analytics sketches: rebuilt %d cells", cells)
+    return cells
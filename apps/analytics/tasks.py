@@ -0,0 +1,17 @@
+"""Celery tasks for the analytics cube."""
+
+from celery import shared_task
+
+
+@shared_task
+def compact_analytics_cube():
+    """Nightly: fold yesterday's (and any older) delta rows into one row per cell."""
+    from apps.analytics.cube import compact
+    return compact()
+
+
+@shared_task
+def export_bulk_datasets(fmt: str = None):
+    """Nightly: append everything booked or paid since the last run to the MINICOM/RRA exports."""
+    from apps.analytics.export import DATASETS, export_dataset
+    return {dataset: export_dataset(dataset, fmt)["rows"] for dataset in DATASETS}
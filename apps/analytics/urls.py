@@ -1,7 +1,8 @@
 from django.urls import path
 from .views import (
     TopRoutesView, CommodityBreakdownView,
-    RevenueHeatmapView, DriverLeaderboardView, MonthlySummaryView
+    RevenueHeatmapView, DriverLeaderboardView, MonthlySummaryView,
+    UniqueCorridorsView, UniqueZonesView,
 )
 
 urlpatterns = [
@@ -10,4 +11,6 @@ urlpatterns = [
     path("revenue/heatmap/",       RevenueHeatmapView.as_view(),    name="analytics-revenue"),
     path("drivers/leaderboard/",   DriverLeaderboardView.as_view(), name="analytics-drivers"),
     path("monthly-summary/",       MonthlySummaryView.as_view(),    name="analytics-monthly"),
+    path("unique/corridors/",      UniqueCorridorsView.as_view(),   name="analytics-unique-corridors"),
+    path("unique/zones/",          UniqueZonesView.as_view(),       name="analytics-unique-zones"),
 ]
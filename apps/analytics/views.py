@@ -1,17 +1,44 @@
 """
 Analytics API — Business Intelligence for MINICOM.
 All queries use GROUP BY aggregation and avoid exposing personal data.
+
+Corridor, commodity, revenue and monthly figures are read from the daily
+fact cube (apps.analytics.cube), so a request aggregates one row per
+day × corridor × commodity × type instead of every shipment ever booked.
+Every aggregation is served through the stale-while-revalidate cache
+(apps.ops.caching) with the TTL given at its @cached_view.
+
+All endpoints take the same optional filters:
+    from, to        booking day range, inclusive (YYYY-MM-DD); for the
+                    driver leaderboard, the delivery day
+    province        province of the origin zone
+    shipment_type   DOMESTIC | INTERNATIONAL
+    commodity       commodity id or name
+The driver leaderboard is served from per-driver daily stats
+(apps.analytics.drivers), which carry the same dimensions.
+A day range is answered from the covering index on the cube's day column,
+so a one-season report reads only that season's rows.
+
+Unique senders/drivers (unique/corridors/, unique/zones/) merge the
+per-day HyperLogLog sketches of apps.analytics.sketches; they take
+?metric=senders|drivers plus from, to and province, and report each
+estimate with its 95% margin.
 """
 
-from django.db.models import Count, Sum, Avg, F, Q
+from datetime import date
+
+from django.db.models import Sum, F
 from django.db.models.functions import TruncMonth
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from drf_spectacular.utils import extend_schema
 
-from apps.shipments.models import Shipment, Zone
-from apps.payments.models import Payment
+from apps.analytics.drivers import leaderboard
+from apps.analytics.models import DailyShipmentFact, DriverDeliveryStats, SketchMetric
+from apps.analytics.sketches import unique_counts
+from apps.ops.caching import cached_response, cached_view
+from apps.shipments.models import Shipment
 
 
 def _admin_or_403(request):
@@ -20,127 +47,206 @@ def _admin_or_403(request):
     return None
 
 
+def _filters(request):
+    """Validated filter params (JSON-safe, used as the cache key) or a 400 Response."""
+    q, params = request.query_params, {}
+    for arg, name in (("from", "start"), ("to", "end")):
+        if q.get(arg):
+            try:
+                params[name] = date.fromisoformat(q[arg]).isoformat()
+            except ValueError:
+                return None, Response({"error": f"'{arg}' must be a date (YYYY-MM-DD)."}, status=400)
+    if "start" in params and "end" in params and params["start"] > params["end"]:
+        return None, Response({"error": "'from' is after 'to'."}, status=400)
+    if q.get("shipment_type"):
+        params["shipment_type"] = q["shipment_type"].upper()
+        if params["shipment_type"] not in Shipment.Type.values:
+            return None, Response({"error": f"shipment_type must be one of {', '.join(Shipment.Type.values)}."}, status=400)
+    for name in ("province", "commodity"):
+        if q.get(name, "").strip():
+            params[name] = q[name].strip()
+    return params, None
+
+
+def _filtered(qs, start=None, end=None, province=None, shipment_type=None, commodity=None):
+    """Apply analytics filters to cube rows."""
+    if start:
+        qs = qs.filter(day__gte=start)
+    if end:
+        qs = qs.filter(day__lte=end)
+    if province:
+        qs = qs.filter(origin_zone__province__iexact=province)
+    if shipment_type:
+        qs = qs.filter(shipment_type=shipment_type)
+    if commodity:
+        qs = qs.filter(commodity_id=commodity) if commodity.isdigit() else qs.filter(commodity__name__iexact=commodity)
+    return qs
+
+
+def _analytics_response(request, name):
+    err = _admin_or_403(request)
+    if err:
+        return err
+    params, err = _filters(request)
+    if err:
+        return err
+    return cached_response(name, params)
+
+
 # ── GET /api/analytics/routes/top/ ───────────────────────────────────────────
+@cached_view("analytics.top_routes", ttl=300)
+def top_routes(**filters):
+    return list(
+        _filtered(DailyShipmentFact.objects.all(), **filters)
+        .values(
+            origin=F("origin_zone__name"),
+            destination=F("dest_zone__name"),
+        )
+        .annotate(
+            shipment_count=Sum("bookings"),
+            total_weight_kg=Sum("weight_kg"),
+        )
+        .filter(shipment_count__gt=0)
+        .order_by("-shipment_count")[:20]
+    )
+
+
 @extend_schema(tags=["Analytics"], summary="Top high-traffic origin→destination corridors")
 class TopRoutesView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        err = _admin_or_403(request)
-        if err:
-            return err
-
-        routes = (
-            Shipment.objects
-            .values(
-                origin=F("origin_zone__name"),
-                destination=F("dest_zone__name"),
-            )
-            .annotate(
-                shipment_count=Count("id"),
-                total_weight_kg=Sum("weight_kg"),
-            )
-            .order_by("-shipment_count")[:20]
-        )
-        return Response(list(routes))
+        return _analytics_response(request, "analytics.top_routes")
 
 
 # ── GET /api/analytics/commodities/breakdown/ ─────────────────────────────────
+@cached_view("analytics.commodities", ttl=300)
+def commodity_breakdown(**filters):
+    return list(
+        _filtered(DailyShipmentFact.objects.all(), **filters)
+        .values(commodity_name=F("commodity__name"))
+        .annotate(
+            count=Sum("bookings"),
+            total_weight_kg=Sum("weight_kg"),
+            total_value=Sum("declared_value"),
+        )
+        .filter(count__gt=0)
+        .order_by("-total_weight_kg")
+    )
+
+
 @extend_schema(tags=["Analytics"], summary="Cargo type volume breakdown")
 class CommodityBreakdownView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        err = _admin_or_403(request)
-        if err:
-            return err
-
-        breakdown = (
-            Shipment.objects
-            .values(commodity_name=F("commodity__name"))
-            .annotate(
-                count=Count("id"),
-                total_weight_kg=Sum("weight_kg"),
-                total_value=Sum("declared_value"),
-            )
-            .order_by("-total_weight_kg")
-        )
-        return Response(list(breakdown))
+        return _analytics_response(request, "analytics.commodities")
 
 
 # ── GET /api/analytics/revenue/heatmap/ ───────────────────────────────────────
+@cached_view("analytics.revenue_heatmap", ttl=300)
+def revenue_heatmap(**filters):
+    # Revenue grouped by origin zone — anonymised (no sender names)
+    return list(
+        _filtered(DailyShipmentFact.objects.all(), **filters)
+        .filter(payments__gt=0)
+        .values(
+            zone=F("origin_zone__name"),
+            province=F("origin_zone__province"),
+        )
+        .annotate(
+            total_revenue=Sum("revenue"),
+            shipment_count=Sum("payments"),
+        )
+        .order_by("-total_revenue")
+    )
+
+
 @extend_schema(tags=["Analytics"], summary="Revenue per district/zone (geospatial heatmap data)")
 class RevenueHeatmapView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        err = _admin_or_403(request)
-        if err:
-            return err
-
-        # Revenue grouped by origin zone — anonymised (no sender names)
-        heatmap = (
-            Payment.objects
-            .filter(status=Payment.Status.SUCCESS)
-            .values(
-                zone=F("shipment__origin_zone__name"),
-                province=F("shipment__origin_zone__province"),
-            )
-            .annotate(
-                total_revenue=Sum("amount"),
-                shipment_count=Count("id"),
-            )
-            .order_by("-total_revenue")
-        )
-        return Response(list(heatmap))
+        return _analytics_response(request, "analytics.revenue_heatmap")
 
 
 # ── GET /api/analytics/drivers/leaderboard/ ────────────────────────────────────
+@cached_view("analytics.driver_leaderboard", ttl=120)
+def driver_leaderboard(**filters):
+    # On time = ASSIGNED→DELIVERED within the corridor's median transit
+    return leaderboard(_filtered(DriverDeliveryStats.objects.all(), **filters))
+
+
 @extend_schema(tags=["Analytics"], summary="Driver performance leaderboard (on-time delivery rate)")
 class DriverLeaderboardView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        err = _admin_or_403(request)
-        if err:
-            return err
-
-        # On-time = delivered before end_date (using delivered_at vs shipment created date heuristic)
-        drivers = (
-            Shipment.objects
-            .filter(status=Shipment.Status.DELIVERED, driver__isnull=False)
-            .values(
-                driver_name=F("driver__full_name"),
-                vehicle=F("driver__driver_profile__vehicle_plate"),
-            )
-            .annotate(
-                deliveries=Count("id"),
-                total_kg=Sum("weight_kg"),
-            )
-            .order_by("-deliveries")[:20]
-        )
-        return Response(list(drivers))
+        return _analytics_response(request, "analytics.driver_leaderboard")
 
 
 # ── GET /api/analytics/monthly-summary/ ───────────────────────────────────────
+@cached_view("analytics.monthly_summary", ttl=900)
+def monthly_summary(**filters):
+    return list(
+        _filtered(DailyShipmentFact.objects.all(), **filters)
+        .annotate(month=TruncMonth("day"))
+        .values("month")
+        .annotate(
+            count=Sum("bookings"),
+            total_weight_kg=Sum("weight_kg"),
+            total_revenue=Sum("booked_amount"),
+        )
+        .filter(count__gt=0)
+        .order_by("-month")[:12]
+    )
+
+
 @extend_schema(tags=["Analytics"], summary="Monthly shipment and revenue summary")
 class MonthlySummaryView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        err = _admin_or_403(request)
-        if err:
-            return err
-
-        summary = (
-            Shipment.objects
-            .annotate(month=TruncMonth("created_at"))
-            .values("month")
-            .annotate(
-                count=Count("id"),
-                total_weight_kg=Sum("weight_kg"),
-                total_revenue=Sum("total_amount"),
-            )
-            .order_by("-month")[:12]
-        )
-        return Response(list(summary))
+        return _analytics_response(request, "analytics.monthly_summary")
+
+
+# ── GET /api/analytics/unique/corridors/ · /api/analytics/unique/zones/ ───────
+def _unique_response(request, name):
+    err = _admin_or_403(request)
+    if err:
+        return err
+    params, err = _filters(request)
+    if err:
+        return err
+    if params.keys() & {"shipment_type", "commodity"}:
+        return Response({"error": "Unique counts filter on from, to and province only."}, status=400)
+    metric = request.query_params.get("metric", "senders").upper()
+    if metric not in SketchMetric.values:
+        return Response({"error": "metric must be senders or drivers."}, status=400)
+    return cached_response(name, {**params, "metric": metric})
+
+
+@cached_view("analytics.unique_corridors", ttl=300)
+def unique_corridors(metric, **filters):
+    return unique_counts("corridor", metric, **filters)
+
+
+@cached_view("analytics.unique_zones", ttl=300)
+def unique_zones(metric, **filters):
+    return unique_counts("zone", metric, **filters)
+
+
+@extend_schema(tags=["Analytics"], summary="Unique senders or drivers per corridor (HyperLogLog estimate)")
+class UniqueCorridorsView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        return _unique_response(request, "analytics.unique_corridors")
+
+
+@extend_schema(tags=["Analytics"], summary="Unique senders or drivers per zone (HyperLogLog estimate)")
+class UniqueZonesView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        return _unique_response(request, "analytics.unique_zones")
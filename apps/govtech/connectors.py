@@ -7,12 +7,55 @@ Both have mock implementations for testing without live government APIs.
 
 import logging
 import hashlib
+import threading
 import uuid
+from concurrent.futures import ThreadPoolExecutor
+
 import requests
+from requests.adapters import HTTPAdapter
 from django.conf import settings
 
+from apps.govtech.resilience import get_breaker, ConnectorUnavailable
+
 logger = logging.getLogger("ishemalink.govtech")
 
+_session      = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """
+    Process-wide pooled HTTP session for government APIs.
+    Keep-alive connections are reused across calls and threads, so a burst of
+    receipts does not pay a fresh TCP/TLS handshake to RRA for every payment.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=4,
+                    pool_maxsize=settings.GOVTECH_HTTP_POOL_SIZE,
+                )
+                session.mount("http://",  adapter)
+                session.mount("https://", adapter)
+                _session = session
+    return _session
+
+
+def _call(breaker_name: str, method: str, url: str, timeout, **kwargs) -> requests.Response:
+    """
+    Issue one government API request through the connector's circuit breaker.
+    5xx responses count as failures (and raise); 4xx are returned to the caller.
+    """
+    def _request():
+        resp = get_session().request(method, url, timeout=timeout, **kwargs)
+        if resp.status_code >= 500:
+            resp.raise_for_status()
+        return resp
+    return get_breaker(breaker_name).call(_request)
+
 
 class RRAConnector:
     """
@@ -27,7 +70,67 @@ class RRAConnector:
         POST to EBM API to get a digital signature.
         Returns {"receipt_number": "...", "signature": "..."}
         """
-        payload = {
+        try:
+            resp = _call(
+                "ebm", "POST", f"{self.BASE_URL}/api/ebm/sign/",
+                timeout=(settings.GOVTECH_CONNECT_TIMEOUT, settings.EBM_READ_TIMEOUT),
+                json=self._payload(payment),
+            )
+            resp.raise_for_status()
+            return resp.json()
+        except (requests.RequestException, ConnectorUnavailable) as exc:
+            logger.error("EBM signing failed for payment %s: %s", payment.id, exc)
+            return self._fallback(payment)
+
+    def sign_receipts(self, payments) -> dict:
+        """
+        Sign many payments at once.
+        Payments are split into EBM_BATCH_SIZE batches which are POSTed
+        concurrently to the EBM batch endpoint over the pooled session.
+        Returns {str(payment.id): {"receipt_number": ..., "signature": ...}};
+        any payment EBM could not sign gets a local fallback receipt.
+        """
+        payments = list(payments)
+        if not payments:
+            return {}
+
+        size    = settings.EBM_BATCH_SIZE
+        batches = [payments[i:i + size] for i in range(0, len(payments), size)]
+        results = {}
+        with ThreadPoolExecutor(max_workers=min(settings.EBM_SIGN_CONCURRENCY, len(batches))) as pool:
+            for batch_result in pool.map(self._sign_batch, batches):
+                results.update(batch_result)
+        return results
+
+    def _sign_batch(self, batch) -> dict:
+        try:
+            resp = _call(
+                "ebm", "POST", f"{self.BASE_URL}/api/ebm/sign-batch/",
+                timeout=(settings.GOVTECH_CONNECT_TIMEOUT, settings.EBM_BATCH_READ_TIMEOUT),
+                json={"receipts": [self._payload(p) for p in batch]},
+            )
+            resp.raise_for_status()
+            signed = {r["transaction_id"]: r for r in resp.json().get("receipts", [])}
+        except (requests.RequestException, ConnectorUnavailable, ValueError) as exc:
+            logger.error("EBM batch signing failed for %d payments: %s", len(batch), exc)
+            signed = {}
+
+        results = {}
+        for payment in batch:
+            key = str(payment.id)
+            receipt = signed.get(key)
+            if receipt and receipt.get("receipt_number"):
+                results[key] = {
+                    "receipt_number": receipt["receipt_number"],
+                    "signature":      receipt["signature"],
+                }
+            else:
+                results[key] = self._fallback(payment)
+        return results
+
+    @staticmethod
+    def _payload(payment) -> dict:
+        return {
             "transaction_id": str(payment.id),
             "amount":         str(payment.amount),
             "currency":       payment.currency,
@@ -35,25 +138,18 @@ class RRAConnector:
             "timestamp":      payment.created_at.isoformat(),
             "tracking_code":  payment.shipment.tracking_code,
         }
-        try:
-            resp = requests.post(
-                f"{self.BASE_URL}/api/ebm/sign/",
-                json=payload,
-                timeout=5,
-            )
-            resp.raise_for_status()
-            return resp.json()
-        except requests.RequestException as exc:
-            logger.error("EBM signing failed for payment %s: %s", payment.id, exc)
-            # Return a locally-computed fallback (for resilience — flag for reconciliation)
-            fallback_sig = hashlib.sha256(
-                f"{payment.id}{payment.amount}{settings.SECRET_KEY}".encode()
-            ).hexdigest()
-            return {
-                "receipt_number": f"LOCAL-{str(payment.id)[:8].upper()}",
-                "signature":      fallback_sig,
-                "fallback":       True,
-            }
+
+    @staticmethod
+    def _fallback(payment) -> dict:
+        """Locally-computed fallback receipt (for resilience — flag for reconciliation)."""
+        fallback_sig = hashlib.sha256(
+            f"{payment.id}{payment.amount}{settings.SECRET_KEY}".encode()
+        ).hexdigest()
+        return {
+            "receipt_number": f"LOCAL-{str(payment.id)[:8].upper()}",
+            "signature":      fallback_sig,
+            "fallback":       True,
+        }
 
 
 class RURAConnector:
@@ -69,23 +165,26 @@ class RURAConnector:
         GET /api/verify/{license_number}/ from RURA mock server.
         Returns True if license is valid and insurance is active.
         Blocks dispatch if False.
+        Raises ConnectorUnavailable when RURA cannot answer (outage, timeout,
+        open circuit) so callers can defer instead of treating the driver as invalid.
         """
         try:
-            resp = requests.get(
-                f"{self.BASE_URL}/api/gov/rura/verify-license/{license_number}/",
-                timeout=5,
+            resp = _call(
+                "rura", "GET", f"{self.BASE_URL}/api/gov/rura/verify-license/{license_number}/",
+                timeout=(settings.GOVTECH_CONNECT_TIMEOUT, settings.RURA_READ_TIMEOUT),
             )
-            if resp.status_code == 200:
-                data = resp.json()
-                valid = data.get("valid", False) and data.get("insurance_active", False)
-                logger.info("RURA check for %s: %s", license_number, valid)
-                return valid
-            logger.warning("RURA returned %s for license %s", resp.status_code, license_number)
-            return False
-        except requests.RequestException as exc:
+        except (requests.RequestException, ConnectorUnavailable) as exc:
             logger.error("RURA connector error for %s: %s", license_number, exc)
             # Fail-safe: do NOT dispatch if we cannot verify
-            return False
+            raise ConnectorUnavailable(f"RURA unavailable: {exc}") from exc
+
+        if resp.status_code == 200:
+            data = resp.json()
+            valid = data.get("valid", False) and data.get("insurance_active", False)
+            logger.info("RURA check for %s: %s", license_number, valid)
+            return valid
+        logger.warning("RURA returned %s for license %s", resp.status_code, license_number)
+        return False
 
 
 class CustomsManifestGenerator:
@@ -0,0 +1,161 @@
+"""
+Circuit breakers and bulkheads for government connectors.
+
+Each connector (EBM, RURA) gets a named CircuitBreaker:
+  - CLOSED     calls flow; failures are counted in fixed time windows.
+  - OPEN       failure rate in the window crossed the threshold — calls are
+               rejected immediately with CircuitOpenError (no network I/O).
+  - HALF_OPEN  reset_timeout elapsed — exactly one probe call is let through;
+               success closes the circuit, failure re-opens it.
+
+Breaker state lives in the shared cache (Redis in production), so a trip
+observed by one Gunicorn/Celery process protects every other process.
+The bulkhead (max concurrent in-flight calls) is a per-process semaphore.
+"""
+
+import logging
+import threading
+import time
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger("ishemalink.govtech")
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class ConnectorUnavailable(Exception):
+    """Government API could not give an answer (unreachable, timed out, circuit open)."""
+
+
+class CircuitOpenError(ConnectorUnavailable):
+    """Call rejected without I/O — circuit open or bulkhead full."""
+
+
+class CircuitBreaker:
+
+    def __init__(self, name, failure_rate=0.5, min_calls=10, window=30,
+                 reset_timeout=15, max_concurrent=10,
+                 failure_exceptions=(requests.RequestException,)):
+        self.name               = name
+        self.failure_rate       = failure_rate
+        self.min_calls          = min_calls
+        self.window             = window
+        self.reset_timeout      = reset_timeout
+        self.failure_exceptions = failure_exceptions
+        self._bulkhead          = threading.BoundedSemaphore(max_concurrent)
+
+    # ── State ─────────────────────────────────────────────────────────────────
+    def _key(self, suffix: str) -> str:
+        return f"govtech:cb:{self.name}:{suffix}"
+
+    @property
+    def state(self) -> str:
+        opened_at = cache.get(self._key("opened_at"))
+        if opened_at is None:
+            return CLOSED
+        if time.time() - opened_at >= self.reset_timeout:
+            return HALF_OPEN
+        return OPEN
+
+    @property
+    def rejections(self) -> int:
+        return cache.get(self._key("rejections"), 0)
+
+    def trip(self):
+        cache.set(self._key("opened_at"), time.time(), timeout=None)
+        logger.warning("Circuit %s OPEN — failing fast for %ss", self.name, self.reset_timeout)
+
+    def reset(self):
+        # Drop the current window's counts too, or the failures that tripped
+        # the circuit would re-open it on the first failure after recovery
+        bucket = int(time.time() // self.window)
+        cache.delete_many([
+            self._key("opened_at"), self._key("probe"),
+            self._key(f"calls:{bucket}"), self._key(f"failures:{bucket}"),
+        ])
+        logger.info("Circuit %s CLOSED", self.name)
+
+    def _reject(self, reason: str):
+        cache.add(self._key("rejections"), 0, timeout=None)
+        cache.incr(self._key("rejections"))
+        raise CircuitOpenError(f"{self.name}: {reason}")
+
+    def _incr(self, key: str) -> int:
+        cache.add(key, 0, timeout=self.window * 2)
+        return cache.incr(key)
+
+    def _record(self, ok: bool):
+        bucket = int(time.time() // self.window)
+        calls  = self._incr(self._key(f"calls:{bucket}"))
+        if ok:
+            return
+        failures = self._incr(self._key(f"failures:{bucket}"))
+        if calls >= self.min_calls and failures / calls >= self.failure_rate:
+            self.trip()
+
+    # ── Call ──────────────────────────────────────────────────────────────────
+    def call(self, fn, *args, **kwargs):
+        """Run fn through the breaker; raises CircuitOpenError instead of calling when unhealthy."""
+        state   = self.state
+        probing = False
+        if state == OPEN:
+            self._reject("circuit open")
+        if state == HALF_OPEN:
+            # Only one process/thread gets to probe the recovering API
+            if not cache.add(self._key("probe"), 1, timeout=self.reset_timeout):
+                self._reject("circuit half-open, probe in flight")
+            probing = True
+
+        if not self._bulkhead.acquire(blocking=False):
+            if probing:
+                cache.delete(self._key("probe"))
+            self._reject("bulkhead full")
+
+        try:
+            result = fn(*args, **kwargs)
+        except self.failure_exceptions:
+            if probing:
+                self.trip()
+            else:
+                self._record(False)
+            raise
+        finally:
+            self._bulkhead.release()
+            # Any probe outcome (including unexpected errors) frees the slot
+            if probing:
+                cache.delete(self._key("probe"))
+
+        if probing:
+            self.reset()
+        else:
+            self._record(True)
+        return result
+
+
+_breakers      = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """Process-wide breaker for a connector, configured from GOVTECH_CIRCUIT_BREAKERS."""
+    breaker = _breakers.get(name)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.get(name)
+            if breaker is None:
+                config  = settings.GOVTECH_CIRCUIT_BREAKERS.get(name, {})
+                breaker = _breakers[name] = CircuitBreaker(name, **config)
+    return breaker
+
+
+def breaker_states() -> dict:
+    """{name: (state, rejections)} for every configured connector — used by /api/ops/metrics/."""
+    states = {}
+    for name in settings.GOVTECH_CIRCUIT_BREAKERS:
+        breaker = get_breaker(name)
+        states[name] = (breaker.state, breaker.rejections)
+    return states
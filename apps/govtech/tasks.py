@@ -1,28 +1,174 @@
 """GovTech async tasks."""
 
 import logging
+import time
 from celery import shared_task
 
 logger = logging.getLogger("ishemalink.govtech.tasks")
 
+EBM_SWEEPER_LOCK = "govtech:ebm-sweeper"
+EBM_RESIGN_LOCK  = "govtech:ebm-resign"
+
+
+def save_receipts(payments, results: dict) -> int:
+    """
+    Persist signed receipts for a batch of payments in two bulk UPDATEs
+    (shipments, then payments) instead of two saves per payment.
+    LOCAL- fallback receipts are recorded as EbmStatus.FALLBACK for re-signing.
+    """
+    from django.db import transaction
+    from django.utils import timezone
+    from apps.payments.models import Payment
+    from apps.shipments.models import Shipment
+
+    now = timezone.now()
+    shipments, signed = [], []
+    for payment in payments:
+        result = results.get(str(payment.id))
+        if not result:
+            continue
+        payment.shipment.ebm_receipt_number = result["receipt_number"]
+        payment.shipment.ebm_signature      = result["signature"]
+        payment.ebm_signed = True
+        if result.get("fallback"):
+            if payment.ebm_status != Payment.EbmStatus.FALLBACK:
+                payment.ebm_fallback_at = now
+            payment.ebm_status = Payment.EbmStatus.FALLBACK
+        else:
+            payment.ebm_status = Payment.EbmStatus.SIGNED
+        shipments.append(payment.shipment)
+        signed.append(payment)
+
+    with transaction.atomic():
+        Shipment.objects.bulk_update(shipments, ["ebm_receipt_number", "ebm_signature"])
+        Payment.objects.bulk_update(signed, ["ebm_signed", "ebm_status", "ebm_fallback_at"])
+    return len(signed)
+
 
 @shared_task(bind=True, max_retries=3, default_retry_delay=10)
 def sign_ebm_receipt(self, payment_id: str):
-    """Sign EBM receipt asynchronously after payment success."""
+    """Sign a single EBM receipt (manual re-sign; bulk flow is sign_pending_ebm_receipts)."""
     from apps.payments.models import Payment
     from apps.govtech.connectors import RRAConnector
 
     try:
         payment = Payment.objects.select_related("shipment").get(id=payment_id)
         result  = RRAConnector().sign_receipt(payment)
-
-        payment.shipment.ebm_receipt_number = result["receipt_number"]
-        payment.shipment.ebm_signature      = result["signature"]
-        payment.shipment.save(update_fields=["ebm_receipt_number", "ebm_signature"])
-        payment.ebm_signed = True
-        payment.save(update_fields=["ebm_signed"])
+        save_receipts([payment], {str(payment.id): result})
 
         logger.info("EBM receipt signed for payment %s: %s", payment_id, result["receipt_number"])
     except Exception as exc:
         logger.error("EBM signing error: %s", exc)
         raise self.retry(exc=exc)
+
+
+@shared_task
+def sign_pending_ebm_receipts(chunk_size: int = None, max_chunks: int = 20):
+    """
+    Beat task: sign every successful payment that has no EBM receipt yet.
+    Pulls unsigned payments in chunks, signs each chunk concurrently in
+    EBM batches and writes the receipts back with bulk_update.
+    Only one sweeper runs at a time across workers.
+    """
+    from django.core.cache import cache
+    from django.conf import settings
+    from apps.payments.models import Payment
+    from apps.govtech.connectors import RRAConnector
+    from apps.govtech.resilience import get_breaker, OPEN
+
+    if get_breaker("ebm").state == OPEN:
+        # Leave payments unsigned rather than minting LOCAL- receipts during an outage
+        logger.info("EBM circuit open — skipping sweep")
+        return 0
+
+    if not cache.add(EBM_SWEEPER_LOCK, 1, timeout=300):
+        logger.info("EBM sweeper already running — skipping")
+        return 0
+
+    chunk_size = chunk_size or settings.EBM_SIGN_CHUNK_SIZE
+    connector  = RRAConnector()
+    total      = 0
+    try:
+        for _ in range(max_chunks):
+            chunk = list(
+                Payment.objects
+                .select_related("shipment")
+                .filter(status=Payment.Status.SUCCESS, ebm_signed=False)
+                .order_by("created_at")[:chunk_size]
+            )
+            if not chunk:
+                break
+            total += save_receipts(chunk, connector.sign_receipts(chunk))
+            if len(chunk) < chunk_size:
+                break
+    finally:
+        cache.delete(EBM_SWEEPER_LOCK)
+
+    logger.info("EBM sweeper signed %d receipts", total)
+    return total
+
+
+@shared_task
+def resign_fallback_receipts(max_receipts: int = None):
+    """
+    Beat task: replace LOCAL- fallback receipts with real RRA signatures.
+    Walks FALLBACK payments oldest-first via the partial fallback index,
+    re-signs them in concurrent EBM batches and throttles to
+    EBM_RESIGN_RATE receipts/second so a post-outage backlog drains at a
+    controlled pace. Stops early if EBM is still failing.
+    """
+    from django.core.cache import cache
+    from django.conf import settings
+    from django.db.models import Q
+    from apps.payments.models import Payment
+    from apps.govtech.connectors import RRAConnector
+    from apps.govtech.resilience import get_breaker, OPEN
+
+    if get_breaker("ebm").state == OPEN:
+        logger.info("EBM circuit open — fallback re-sign postponed")
+        return 0
+    if not cache.add(EBM_RESIGN_LOCK, 1, timeout=600):
+        return 0
+
+    max_receipts = max_receipts or settings.EBM_RESIGN_MAX_PER_RUN
+    chunk_size   = settings.EBM_BATCH_SIZE * settings.EBM_SIGN_CONCURRENCY
+    rate         = settings.EBM_RESIGN_RATE
+    connector    = RRAConnector()
+    started      = time.monotonic()
+    attempted = resigned = 0
+    cursor    = None
+    try:
+        while attempted < max_receipts:
+            qs = (
+                Payment.objects
+                .select_related("shipment")
+                .filter(ebm_status=Payment.EbmStatus.FALLBACK)
+                .order_by("ebm_fallback_at", "id")
+            )
+            if cursor:
+                fallback_at, pk = cursor
+                qs = qs.filter(Q(ebm_fallback_at__gt=fallback_at) | Q(ebm_fallback_at=fallback_at, id__gt=pk))
+            chunk = list(qs[:min(chunk_size, max_receipts - attempted)])
+            if not chunk:
+                break
+            cursor     = (chunk[-1].ebm_fallback_at, chunk[-1].id)
+            attempted += len(chunk)
+
+            results = {
+                pid: r for pid, r in connector.sign_receipts(chunk).items()
+                if not r.get("fallback")
+            }
+            resigned += save_receipts(chunk, results)
+            if not results:
+                logger.warning("EBM still failing — stopping re-sign run")
+                break
+
+            # Throttle: never exceed EBM_RESIGN_RATE receipts per second
+            ahead = attempted / rate - (time.monotonic() - started)
+            if ahead > 0:
+                time.sleep(ahead)
+    finally:
+        cache.delete(EBM_RESIGN_LOCK)
+
+    logger.info("Re-signed %d of %d fallback EBM receipts", resigned, attempted)
+    return resigned
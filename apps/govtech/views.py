@@ -1,6 +1,15 @@
-"""GovTech API views — EBM, RURA, Customs Manifest."""
+"""GovTech API views — EBM, RURA, Customs Manifest, Audit log."""
 
-from django.http import HttpResponse
+import base64
+import csv
+import json
+import uuid
+from datetime import datetime, time, timedelta
+
+from django.db.models import Q
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
@@ -8,6 +17,7 @@ from rest_framework import serializers
 from drf_spectacular.utils import extend_schema
 
 from apps.govtech.connectors import RURAConnector, CustomsManifestGenerator
+from apps.govtech.resilience import ConnectorUnavailable
 from apps.payments.models import Payment
 from apps.shipments.models import Shipment
 
@@ -35,14 +45,11 @@ class EBMSignReceiptView(APIView):
             return Response({"error": "Payment not found or not successful."}, status=404)
 
         from apps.govtech.connectors import RRAConnector
+        from apps.govtech.tasks import save_receipts
         result = RRAConnector().sign_receipt(payment)
 
         # Persist signature on shipment
-        payment.shipment.ebm_receipt_number = result["receipt_number"]
-        payment.shipment.ebm_signature      = result["signature"]
-        payment.shipment.save(update_fields=["ebm_receipt_number", "ebm_signature"])
-        payment.ebm_signed = True
-        payment.save(update_fields=["ebm_signed"])
+        save_receipts([payment], {str(payment.id): result})
 
         return Response(result)
 
@@ -53,7 +60,10 @@ class RURAVerifyView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request, license_no):
-        valid = rura.verify_license(license_no)
+        try:
+            valid = rura.verify_license(license_no)
+        except ConnectorUnavailable:
+            return Response({"error": "RURA verification temporarily unavailable."}, status=503)
         return Response({"license_number": license_no, "valid": valid})
 
 
@@ -85,29 +95,195 @@ class CustomsManifestView(APIView):
         return HttpResponse(xml_content, content_type="application/xml")
 
 
+# ── Audit log helpers ────────────────────────────────────────────────────────
+AUDIT_PAGE_SIZE     = 100
+AUDIT_MAX_PAGE_SIZE = 500
+AUDIT_EXPORT_CHUNK  = 2000
+# (ORM field, output key) — the NDJSON keys and the CSV header, in order
+AUDIT_COLUMNS = [
+    ("shipment__tracking_code", "shipment"),
+    ("from_status",             "from_status"),
+    ("to_status",               "to_status"),
+    ("actor__full_name",        "actor"),
+    ("note",                    "note"),
+    ("occurred_at",             "occurred_at"),
+]
+AUDIT_FIELDS = ["id", *(field for field, _ in AUDIT_COLUMNS)]     # id is the keyset tie-breaker
+
+
+class AuditQueryError(ValueError):
+    pass
+
+
+def _auditor_or_403(request):
+    if request.user.role not in ("ADMIN", "INSPECTOR"):
+        return Response({"error": "Insufficient permissions."}, status=403)
+    return None
+
+
+def _parse_bound(value: str, end: bool):
+    """Accept a date (whole day) or an ISO datetime; `end` bounds are exclusive."""
+    dt = parse_datetime(value)
+    if dt is None:
+        d = parse_date(value)
+        if d is None:
+            raise AuditQueryError(f"Invalid date: {value}")
+        dt = datetime.combine(d + timedelta(days=1) if end else d, time.min)
+    if timezone.is_naive(dt):
+        dt = timezone.make_aware(dt)
+    return dt
+
+
+def _audit_queryset(params):
+    """ShipmentEvents filtered by ?from= &to= &tracking_code= &actor= (index-backed)."""
+    from apps.shipments.models import ShipmentEvent
+
+    qs = ShipmentEvent.objects.all()
+    try:
+        if params.get("from"):
+            qs = qs.filter(occurred_at__gte=_parse_bound(params["from"], end=False))
+        if params.get("to"):
+            qs = qs.filter(occurred_at__lt=_parse_bound(params["to"], end=True))
+    except ValueError as exc:
+        raise AuditQueryError(str(exc))
+    if params.get("tracking_code"):
+        qs = qs.filter(shipment__tracking_code=params["tracking_code"])
+    if params.get("actor"):
+        try:
+            actor_id = uuid.UUID(params["actor"])
+        except ValueError:
+            raise AuditQueryError(f"Invalid actor: {params['actor']}")
+        qs = qs.filter(actor_id=actor_id)
+    return qs
+
+
+def _audit_export_rows(qs):
+    """
+    Chronological rows in keyset pages of (occurred_at, id).
+    Each page is its own short query, so no server-side cursor has to
+    survive across PgBouncer transaction-pooled connections.
+    """
+    qs   = qs.order_by("occurred_at", "id").values(*AUDIT_FIELDS)
+    page = list(qs[:AUDIT_EXPORT_CHUNK])
+    while page:
+        yield from page
+        if len(page) < AUDIT_EXPORT_CHUNK:
+            return
+        last = page[-1]
+        page = list(
+            qs.filter(
+                Q(occurred_at__gt=last["occurred_at"])
+                | Q(occurred_at=last["occurred_at"], id__gt=last["id"])
+            )[:AUDIT_EXPORT_CHUNK]
+        )
+
+
+def _encode_cursor(occurred_at, pk) -> str:
+    raw = f"{occurred_at.isoformat()}|{pk}".encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def _decode_cursor(cursor: str):
+    try:
+        ts, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        occurred_at = parse_datetime(ts)
+        if occurred_at is None:
+            raise ValueError
+        return occurred_at, int(pk)
+    except ValueError:
+        raise AuditQueryError("Invalid cursor.")
+
+
+def _audit_row(values: dict) -> dict:
+    row = {key: values[field] for field, key in AUDIT_COLUMNS}
+    row["actor"]       = row["actor"] or "System"
+    row["occurred_at"] = row["occurred_at"].isoformat()
+    return row
+
+
 # ── GET /api/gov/audit/access-log/ ────────────────────────────────────────────
 @extend_schema(tags=["GovTech"], summary="Government audit trail (Admin/Inspector only)")
 class AuditLogView(APIView):
+    """
+    Newest-first audit trail with keyset (cursor) pagination over
+    (occurred_at, id) — every page is an index range scan, however deep.
+    Query params: limit, cursor, from, to, tracking_code, actor.
+    """
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        if request.user.role not in ("ADMIN", "INSPECTOR"):
-            return Response({"error": "Insufficient permissions."}, status=403)
-
-        from apps.shipments.models import ShipmentEvent
-        events = ShipmentEvent.objects.select_related(
-            "shipment", "actor"
-        ).order_by("-occurred_at")[:500]
-
-        data = [
-            {
-                "shipment":     e.shipment.tracking_code,
-                "from_status":  e.from_status,
-                "to_status":    e.to_status,
-                "actor":        e.actor.full_name if e.actor else "System",
-                "note":         e.note,
-                "occurred_at":  e.occurred_at.isoformat(),
-            }
-            for e in events
-        ]
-        return Response({"count": len(data), "events": data})
+        err = _auditor_or_403(request)
+        if err:
+            return err
+
+        try:
+            limit = max(1, min(int(request.GET.get("limit", AUDIT_PAGE_SIZE)), AUDIT_MAX_PAGE_SIZE))
+            qs    = _audit_queryset(request.GET)
+            if request.GET.get("cursor"):
+                occurred_at, pk = _decode_cursor(request.GET["cursor"])
+                qs = qs.filter(Q(occurred_at__lt=occurred_at) | Q(occurred_at=occurred_at, id__lt=pk))
+        except ValueError as exc:
+            return Response({"error": str(exc)}, status=400)
+
+        rows = list(
+            qs.order_by("-occurred_at", "-id")
+            .values(*AUDIT_FIELDS)[:limit + 1]
+        )
+        has_more = len(rows) > limit
+        rows     = rows[:limit]
+        next_cursor = (
+            _encode_cursor(rows[-1]["occurred_at"], rows[-1]["id"]) if has_more and rows else None
+        )
+
+        data = [_audit_row(r) for r in rows]
+        return Response({"count": len(data), "events": data, "next_cursor": next_cursor})
+
+
+# ── GET /api/gov/audit/access-log/export/ ─────────────────────────────────────
+class _Echo:
+    """csv.writer target that hands each row straight back to the generator."""
+    def write(self, value):
+        return value
+
+
+@extend_schema(tags=["GovTech"], summary="Stream the audit trail as NDJSON or CSV (Admin/Inspector only)")
+class AuditLogExportView(APIView):
+    """
+    Chronological export for RRA/RURA audits, any date range.
+    Rows are streamed in keyset pages over (occurred_at, id) so memory stays
+    flat regardless of range size. ?output=ndjson (default) or csv.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        err = _auditor_or_403(request)
+        if err:
+            return err
+
+        output = request.GET.get("output", "ndjson")
+        if output not in ("ndjson", "csv"):
+            return Response({"error": "output must be ndjson or csv."}, status=400)
+        try:
+            qs = _audit_queryset(request.GET)
+        except ValueError as exc:
+            return Response({"error": str(exc)}, status=400)
+
+        rows = _audit_export_rows(qs)
+
+        if output == "csv":
+            writer = csv.writer(_Echo())
+
+            def stream():
+                yield writer.writerow([key for _, key in AUDIT_COLUMNS])
+                for r in rows:
+                    yield writer.writerow(_audit_row(r).values())
+            content_type = "text/csv"
+        else:
+            def stream():
+                for r in rows:
+                    yield json.dumps(_audit_row(r)) + "\n"
+            content_type = "application/x-ndjson"
+
+        response = StreamingHttpResponse(stream(), content_type=content_type)
+        response["Content-Disposition"] = f'attachment; filename="audit-log.{output}"'
+        return response
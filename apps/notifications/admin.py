@@ -1 +1,23 @@
 from django.contrib import admin
+from .models import BroadcastJob, OutboundMessage, SmsMessage
+
+
+@admin.register(BroadcastJob)
+class BroadcastJobAdmin(admin.ModelAdmin):
+    list_display    = ("id", "status", "total", "sent", "failed", "created_by", "created_at", "finished_at")
+    list_filter     = ("status",)
+    readonly_fields = ("status", "total", "sent", "failed", "created_by", "created_at", "finished_at")
+
+
+@admin.register(OutboundMessage)
+class OutboundMessageAdmin(admin.ModelAdmin):
+    list_display  = ("id", "channel", "recipient", "reference", "status", "attempts", "next_attempt_at", "sent_at")
+    list_filter   = ("status", "channel")
+    search_fields = ("recipient", "reference", "gateway_id")
+
+
+@admin.register(SmsMessage)
+class SmsMessageAdmin(admin.ModelAdmin):
+    list_display  = ("gateway_id", "phone", "carrier", "parts", "status", "error_code", "sent_at", "delivered_at")
+    list_filter   = ("status", "carrier")
+    search_fields = ("gateway_id", "phone")
@@ -0,0 +1,60 @@
+"""
+SMS coalescing — fewer, fuller messages per recipient.
+
+Gateways bill per segment: one SMS holds 160 GSM-7 characters, while a
+multi-part SMS holds 153 per part (the rest is the concatenation header).
+Any character outside GSM-7 switches the whole message to UCS-2, which
+gives 70 characters, or 67 per part. The escape characters ^{}\\[~]|€ take
+two GSM-7 units each.
+
+coalesce() takes the pending bodies for one phone, oldest first:
+    identical bodies are sent once
+    consecutive bodies are joined while the joined message costs no more
+    segments than sending them apart, and stays within SMS_MAX_PARTS
+"""
+
+from .templates import SMS_PREFIX
+
+GSM7_BASIC = frozenset(
+    "@£$¥èéùìòÇ\nØø\rÅåΔ_ΦΓΛΩΠΨΣΘΞÆæßÉ !\"#¤%&'()*+,-./0123456789:;<=>?"
+    "¡ABCDEFGHIJKLMNOPQRSTUVWXYZÄÖÑÜ§¿abcdefghijklmnopqrstuvwxyzäöñüà"
+)
+GSM7_EXTENDED = frozenset("^{}\\[~]|€\f")
+
+
+def sms_parts(text: str) -> int:
+    """How many segments the gateway bills for `text`."""
+    if all(c in GSM7_BASIC or c in GSM7_EXTENDED for c in text):
+        units, single, multi = len(text) + sum(c in GSM7_EXTENDED for c in text), 160, 153
+    else:
+        units, single, multi = len(text.encode("utf-16-le")) // 2, 70, 67
+    return 1 if units <= single else -(-units // multi)
+
+
+def join(first: str, second: str) -> str:
+    return f"{first} {second.removeprefix(SMS_PREFIX)}"
+
+
+def coalesce(bodies, max_parts: int) -> list:
+    """
+    [body, ...] for one recipient → [(text, [indices into bodies]), ...].
+    Every input index appears in exactly one output message.
+    """
+    out    = []        # [text, indices, cost of sending its bodies apart]
+    placed = {}        # body → position in out
+    for i, body in enumerate(bodies):
+        if body in placed:
+            out[placed[body]][1].append(i)
+            continue
+        parts = sms_parts(body)
+        if out:
+            last   = out[-1]
+            merged = join(last[0], body)
+            if sms_parts(merged) <= min(max_parts, last[2] + parts):
+                last[0], last[2] = merged, last[2] + parts
+                last[1].append(i)
+                placed[body] = len(out) - 1
+                continue
+        placed[body] = len(out)
+        out.append([body, [i], parts])
+    return [(text, indices) for text, indices, _ in out]
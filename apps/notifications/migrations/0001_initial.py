@@ -0,0 +1,37 @@
+import uuid
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BroadcastJob",
+            fields=[
+                ("id",          models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ("message",     models.CharField(max_length=160)),
+                ("status",      models.CharField(
+                    choices=[("QUEUED", "Queued"), ("RUNNING", "Running"), ("DONE", "Done")],
+                    default="QUEUED", max_length=8,
+                )),
+                ("total",       models.PositiveIntegerField(default=0)),
+                ("sent",        models.PositiveIntegerField(default=0)),
+                ("failed",      models.PositiveIntegerField(default=0)),
+                ("created_at",  models.DateTimeField(auto_now_add=True)),
+                ("finished_at", models.DateTimeField(blank=True, null=True)),
+                ("created_by",  models.ForeignKey(
+                    null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL,
+                )),
+            ],
+            options={"ordering": ["-created_at"]},
+        ),
+    ]
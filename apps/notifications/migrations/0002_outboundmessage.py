@@ -0,0 +1,39 @@
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("notifications", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OutboundMessage",
+            fields=[
+                ("id",              models.BigAutoField(auto_created=True, primary_key=True, serialize=False)),
+                ("channel",         models.CharField(
+                    choices=[("SMS", "SMS"), ("EMAIL", "Email")], default="SMS", max_length=5,
+                )),
+                ("recipient",       models.CharField(max_length=120)),
+                ("subject",         models.CharField(blank=True, max_length=200)),
+                ("body",            models.TextField()),
+                ("reference",       models.CharField(blank=True, max_length=40)),
+                ("status",          models.CharField(
+                    choices=[("PENDING", "Pending"), ("SENT", "Sent"), ("FAILED", "Failed — retries exhausted")],
+                    default="PENDING", max_length=7,
+                )),
+                ("attempts",        models.PositiveSmallIntegerField(default=0)),
+                ("next_attempt_at", models.DateTimeField(default=django.utils.timezone.now)),
+                ("last_error",      models.CharField(blank=True, max_length=255)),
+                ("created_at",      models.DateTimeField(auto_now_add=True)),
+                ("sent_at",         models.DateTimeField(blank=True, null=True)),
+            ],
+            options={"ordering": ["id"]},
+        ),
+        migrations.AddIndex(
+            model_name="outboundmessage",
+            index=models.Index(fields=["status", "next_attempt_at"], name="outbox_due_idx"),
+        ),
+    ]
@@ -0,0 +1,20 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("notifications", "0002_outboundmessage"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="outboundmessage",
+            name="dedupe_key",
+            field=models.CharField(blank=True, max_length=40),
+        ),
+        migrations.AddIndex(
+            model_name="outboundmessage",
+            index=models.Index(fields=["dedupe_key", "created_at"], name="outbox_dedupe_idx"),
+        ),
+    ]
@@ -0,0 +1,44 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("notifications", "0003_outbox_dedupe"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="outboundmessage",
+            name="gateway_id",
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.CreateModel(
+            name="SmsMessage",
+            fields=[
+                ("id",           models.BigAutoField(auto_created=True, primary_key=True, serialize=False)),
+                ("gateway_id",   models.CharField(max_length=64, unique=True)),
+                ("phone",        models.CharField(max_length=20)),
+                ("carrier",      models.CharField(
+                    choices=[("MTN", "MTN Rwanda"), ("AIRTEL", "Airtel Rwanda"), ("OTHER", "Other")],
+                    default="OTHER", max_length=6,
+                )),
+                ("parts",        models.PositiveSmallIntegerField(default=1)),
+                ("status",       models.CharField(
+                    choices=[
+                        ("ACCEPTED", "Accepted by gateway"), ("DELIVERED", "Delivered to handset"),
+                        ("FAILED", "Undeliverable"), ("EXPIRED", "Expired undelivered"),
+                    ],
+                    default="ACCEPTED", max_length=9,
+                )),
+                ("error_code",   models.CharField(blank=True, max_length=32)),
+                ("sent_at",      models.DateTimeField(auto_now_add=True)),
+                ("delivered_at", models.DateTimeField(blank=True, null=True)),
+                ("updated_at",   models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="smsmessage",
+            index=models.Index(fields=["carrier", "sent_at"], name="sms_carrier_sent_idx"),
+        ),
+    ]
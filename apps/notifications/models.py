@@ -0,0 +1,120 @@
+"""Notification models — broadcast jobs, the transactional outbox and SMS delivery receipts."""
+
+import uuid
+
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+
+
+class BroadcastJob(models.Model):
+    """
+    One admin broadcast to every active driver. Recipients are sent in
+    chunks by Celery (apps.notifications.tasks); each chunk adds to the
+    sent/failed counters, and the last one marks the job DONE.
+    """
+
+    class Status(models.TextChoices):
+        QUEUED  = "QUEUED",  "Queued"
+        RUNNING = "RUNNING", "Running"
+        DONE    = "DONE",    "Done"
+
+    id          = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    message     = models.CharField(max_length=160)
+    created_by  = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True)
+    status      = models.CharField(max_length=8, choices=Status.choices, default=Status.QUEUED)
+    total       = models.PositiveIntegerField(default=0)
+    sent        = models.PositiveIntegerField(default=0)
+    failed      = models.PositiveIntegerField(default=0)
+    created_at  = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"Broadcast {self.id} [{self.status}] {self.sent}/{self.total}"
+
+
+class OutboundMessage(models.Model):
+    """
+    Transactional outbox. Services write a row inside their own transaction;
+    apps.notifications.outbox sends it after commit, in batches, retrying
+    with backoff. A claimed row's next_attempt_at is pushed out by the claim
+    lease, so a crashed worker's batch is simply picked up again later.
+    SMS rows to the same phone may go out together as one coalesced message.
+    """
+
+    class Channel(models.TextChoices):
+        SMS   = "SMS",   "SMS"
+        EMAIL = "EMAIL", "Email"
+
+    class Status(models.TextChoices):
+        PENDING = "PENDING", "Pending"
+        SENT    = "SENT",    "Sent"
+        FAILED  = "FAILED",  "Failed — retries exhausted"
+
+    channel         = models.CharField(max_length=5, choices=Channel.choices, default=Channel.SMS)
+    recipient       = models.CharField(max_length=120)
+    subject         = models.CharField(max_length=200, blank=True)
+    body            = models.TextField()
+    reference       = models.CharField(max_length=40, blank=True)    # e.g. tracking code
+    dedupe_key      = models.CharField(max_length=40, blank=True)    # sha1 of channel/recipient/content
+    gateway_id      = models.CharField(max_length=64, blank=True)    # SmsMessage that carried it
+    status          = models.CharField(max_length=7, choices=Status.choices, default=Status.PENDING)
+    attempts        = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error      = models.CharField(max_length=255, blank=True)
+    created_at      = models.DateTimeField(auto_now_add=True)
+    sent_at         = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["id"]
+        indexes  = [
+            # Dispatcher: PENDING rows whose next attempt is due
+            models.Index(fields=["status", "next_attempt_at"], name="outbox_due_idx"),
+            # Enqueue: was this exact message queued recently?
+            models.Index(fields=["dedupe_key", "created_at"], name="outbox_dedupe_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.channel} → {self.recipient} [{self.status}]"
+
+
+class SmsMessage(models.Model):
+    """
+    One SMS the gateway accepted, keyed by the gateway's message id.
+    Delivery receipts (DLRs) move it from ACCEPTED to a final status.
+    """
+
+    class Carrier(models.TextChoices):
+        MTN    = "MTN",    "MTN Rwanda"
+        AIRTEL = "AIRTEL", "Airtel Rwanda"
+        OTHER  = "OTHER",  "Other"
+
+    class Status(models.TextChoices):
+        ACCEPTED  = "ACCEPTED",  "Accepted by gateway"
+        DELIVERED = "DELIVERED", "Delivered to handset"
+        FAILED    = "FAILED",    "Undeliverable"
+        EXPIRED   = "EXPIRED",   "Expired undelivered"
+
+    FINAL = (Status.DELIVERED, Status.FAILED, Status.EXPIRED)
+
+    gateway_id   = models.CharField(max_length=64, unique=True)
+    phone        = models.CharField(max_length=20)
+    carrier      = models.CharField(max_length=6, choices=Carrier.choices, default=Carrier.OTHER)
+    parts        = models.PositiveSmallIntegerField(default=1)
+    status       = models.CharField(max_length=9, choices=Status.choices, default=Status.ACCEPTED)
+    error_code   = models.CharField(max_length=32, blank=True)
+    sent_at      = models.DateTimeField(auto_now_add=True)
+    delivered_at = models.DateTimeField(null=True, blank=True)
+    updated_at   = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Delivery-rate stats per carrier over a time window
+            models.Index(fields=["carrier", "sent_at"], name="sms_carrier_sent_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.gateway_id} → {self.phone} [{self.status}]"
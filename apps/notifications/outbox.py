@@ -0,0 +1,116 @@
+"""
+Notification outbox dispatcher.
+
+BookingService writes OutboundMessage rows inside its own transaction, so
+its row locks are held for DB work only and a rolled-back booking never
+texts anyone. After commit, dispatch_due() sends what is due:
+
+    claim    short transaction: SELECT ... FOR UPDATE SKIP LOCKED on due
+             PENDING rows, push their next_attempt_at out by
+             OUTBOX_CLAIM_TIMEOUT — a lease, so concurrent workers take
+             disjoint batches and a crashed worker's batch comes back
+    send     outside any transaction: SMS coalesced per phone and sent
+             through the pooled bulk sender, email one by one
+    record   one bulk UPDATE: SENT, or attempts+1 with exponential backoff
+             (OUTBOX_RETRY_BASE · 2^(attempts-1), counting this attempt),
+             FAILED after OUTBOX_MAX_ATTEMPTS
+"""
+
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+logger = logging.getLogger("ishemalink.notifications")
+
+
+def claim_due(batch_size: int) -> list:
+    """Lease up to `batch_size` due PENDING messages to this worker."""
+    from apps.notifications.models import OutboundMessage
+
+    now = timezone.now()
+    with transaction.atomic():
+        batch = list(
+            OutboundMessage.objects
+            .select_for_update(skip_locked=True)
+            .filter(status=OutboundMessage.Status.PENDING, next_attempt_at__lte=now)
+            .order_by("next_attempt_at", "id")[:batch_size]
+        )
+        if batch:
+            OutboundMessage.objects.filter(pk__in=[m.pk for m in batch]).update(
+                next_attempt_at=now + timedelta(seconds=settings.OUTBOX_CLAIM_TIMEOUT),
+            )
+    return batch
+
+
+def send_claimed(batch) -> list:
+    """
+    Send a claimed batch; returns [delivered, ...] in batch order. SMS rows
+    are grouped per phone and coalesced, and each row takes the outcome of
+    the message that carried it.
+    """
+    from apps.notifications.coalesce import coalesce
+    from apps.notifications.models import OutboundMessage
+    from apps.notifications.service import NotificationService
+
+    notifier = NotificationService()
+    by_phone = {}
+    for message in batch:
+        if message.channel == OutboundMessage.Channel.SMS:
+            by_phone.setdefault(message.recipient, []).append(message)
+
+    texts, carried = [], []
+    for phone, rows in by_phone.items():
+        for text, indices in coalesce([m.body for m in rows], settings.SMS_MAX_PARTS):
+            texts.append((phone, text))
+            carried.append([rows[i] for i in indices])
+    outcome = {}
+    for messages, gateway_id in zip(carried, notifier.deliver(texts)):
+        for message in messages:
+            outcome[message.pk] = gateway_id is not None
+            message.gateway_id  = gateway_id or ""
+    for message in batch:
+        if message.channel == OutboundMessage.Channel.EMAIL:
+            outcome[message.pk] = notifier.send_email(message.recipient, message.subject, message.body)
+    logger.debug("Outbox: %d SMS rows sent as %d messages", sum(map(len, carried)), len(texts))
+    return [outcome[m.pk] for m in batch]
+
+
+def record_results(batch, results):
+    """Persist delivery status and schedule retries for one sent batch."""
+    from apps.notifications.models import OutboundMessage
+
+    now = timezone.now()
+    for message, ok in zip(batch, results):
+        message.attempts += 1
+        if ok:
+            message.status, message.sent_at, message.last_error = OutboundMessage.Status.SENT, now, ""
+        elif message.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+            message.status, message.last_error = OutboundMessage.Status.FAILED, "Gateway rejected the message"
+        else:
+            delay = settings.OUTBOX_RETRY_BASE * 2 ** (message.attempts - 1)
+            message.next_attempt_at, message.last_error = now + timedelta(seconds=delay), "Gateway rejected the message"
+    OutboundMessage.objects.bulk_update(
+        batch, ["status", "attempts", "next_attempt_at", "last_error", "sent_at", "gateway_id"],
+    )
+
+
+def dispatch_due(batch_size: int = None) -> dict:
+    """Send every due message, one batch at a time. Returns counts for logging."""
+    batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+    sent = failed = 0
+    while True:
+        batch = claim_due(batch_size)
+        if not batch:
+            break
+        results = send_claimed(batch)
+        record_results(batch, results)
+        sent   += sum(results)
+        failed += len(results) - sum(results)
+        if len(batch) < batch_size:
+            break
+    if sent or failed:
+        logger.info("Outbox: %d sent, %d not delivered", sent, failed)
+    return {"sent": sent, "failed": failed}
@@ -0,0 +1,130 @@
+"""
+SMS delivery receipts (DLRs).
+
+Every message the gateway accepts is recorded as an SmsMessage keyed by
+the gateway's message id (record_accepted — one bulk INSERT per send).
+The gateway later POSTs receipts in bulk to /api/notifications/dlr/;
+apply_receipts() applies them in chunks of SMS_DLR_CHUNK: one SELECT of
+the chunk's ids, one bulk_update of the rows that change. A final status
+is never overwritten, so receipts may arrive late, twice or out of order.
+"""
+
+import logging
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db.models import Count, Q
+from django.utils import timezone
+
+logger = logging.getLogger("ishemalink.notifications")
+
+# Gateway / SMPP stat codes → SmsMessage.Status
+DLR_STATUS = {
+    "DELIVERED": "DELIVERED", "DELIVRD": "DELIVERED",
+    "FAILED":    "FAILED",    "UNDELIV": "FAILED", "REJECTD": "FAILED", "REJECTED": "FAILED",
+    "EXPIRED":   "EXPIRED",
+}
+
+# Rwandan mobile prefixes after the 250 country code
+CARRIER_PREFIXES = {"78": "MTN", "79": "MTN", "72": "AIRTEL", "73": "AIRTEL"}
+
+
+def carrier_for(phone: str) -> str:
+    digits = "".join(c for c in phone if c.isdigit())
+    if digits.startswith("250"):
+        digits = digits[3:]
+    return CARRIER_PREFIXES.get(digits.lstrip("0")[:2], "OTHER")
+
+
+def record_accepted(messages, gateway_ids):
+    """Record [(phone, text), ...] the gateway accepted; gateway_ids aligned, None = not accepted."""
+    from apps.notifications.coalesce import sms_parts
+    from apps.notifications.models import SmsMessage
+
+    rows = [
+        SmsMessage(gateway_id=gateway_id, phone=phone, carrier=carrier_for(phone), parts=sms_parts(text))
+        for (phone, text), gateway_id in zip(messages, gateway_ids)
+        if gateway_id                       # accepted without an id cannot be tracked
+    ]
+    if rows:
+        SmsMessage.objects.bulk_create(rows, batch_size=1000, ignore_conflicts=True)
+
+
+def _receipt_time(value):
+    if isinstance(value, (int, float)):
+        try:
+            return datetime.fromtimestamp(value, tz=dt_timezone.utc)
+        except (OverflowError, OSError, ValueError):     # NaN or out of range
+            return None
+    if isinstance(value, str):
+        try:
+            parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+        return parsed if parsed.tzinfo else parsed.replace(tzinfo=dt_timezone.utc)
+    return None
+
+
+def apply_receipts(receipts) -> dict:
+    """
+    Apply [{"message_id", "status", "error_code"?, "done_at"?}, ...].
+    Returns {"applied", "unknown", "ignored"}: ignored covers malformed
+    receipts, unrecognised statuses and messages already final.
+    """
+    from apps.notifications.models import SmsMessage
+
+    latest  = {}
+    ignored = 0
+    for receipt in receipts:
+        status = DLR_STATUS.get(str(receipt.get("status", "")).upper()) if isinstance(receipt, dict) else None
+        if status is None or not receipt.get("message_id"):
+            ignored += 1
+            continue
+        latest[str(receipt["message_id"])] = (status, receipt)    # last receipt per message wins
+
+    now     = timezone.now()
+    applied = unknown = 0
+    ids     = list(latest)
+    for start in range(0, len(ids), settings.SMS_DLR_CHUNK):
+        chunk   = ids[start:start + settings.SMS_DLR_CHUNK]
+        found   = SmsMessage.objects.filter(gateway_id__in=chunk).only("id", "gateway_id", "status")
+        changed = []
+        for message in found:
+            if message.status in SmsMessage.FINAL:
+                ignored += 1
+                continue
+            status, receipt = latest[message.gateway_id]
+            message.status       = status
+            message.error_code   = str(receipt.get("error_code") or "")[:32]
+            message.delivered_at = (_receipt_time(receipt.get("done_at")) or now) if status == "DELIVERED" else None
+            message.updated_at   = now
+            changed.append(message)
+        unknown += len(chunk) - len(found)
+        if changed:
+            SmsMessage.objects.bulk_update(changed, ["status", "error_code", "delivered_at", "updated_at"])
+        applied += len(changed)
+
+    logger.info("DLR: %d applied, %d unknown, %d ignored", applied, unknown, ignored)
+    return {"applied": applied, "unknown": unknown, "ignored": ignored}
+
+
+def carrier_stats(days: int) -> list:
+    """Per-carrier delivery counts and rate over the last `days` days."""
+    from apps.notifications.models import SmsMessage
+
+    rows = (
+        SmsMessage.objects
+        .filter(sent_at__gte=timezone.now() - timedelta(days=days))
+        .values("carrier")
+        .annotate(
+            sent      = Count("id"),
+            delivered = Count("id", filter=Q(status=SmsMessage.Status.DELIVERED)),
+            failed    = Count("id", filter=Q(status__in=[SmsMessage.Status.FAILED, SmsMessage.Status.EXPIRED])),
+            pending   = Count("id", filter=Q(status=SmsMessage.Status.ACCEPTED)),
+        )
+        .order_by("carrier")
+    )
+    return [
+        {**row, "delivery_rate": round(row["delivered"] / row["sent"], 4) if row["sent"] else None}
+        for row in rows
+    ]
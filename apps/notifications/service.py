@@ -2,33 +2,105 @@
 Notification service.
 Supports SMS (via Rwanda SMS gateway) and Email.
 In production, swap the HTTP calls with the real provider SDK.
+
+SMS goes over a process-wide pooled session. Bulk sends (driver
+broadcasts) are split into SMS_BULK_SIZE batches POSTed concurrently to
+the gateway's /send-bulk endpoint (or fanned out as single sends when
+SMS_GATEWAY_BULK is off), throttled to SMS_RATE_LIMIT messages/second
+across all workers.
+
+Booking notifications don't call the gateway at all: enqueue_sms /
+enqueue_email write an OutboundMessage in the caller's transaction, and
+apps.notifications.outbox sends it once that transaction has committed.
+Repeats are dropped at enqueue, and SMS to one phone are held briefly so
+they can be coalesced (apps.notifications.coalesce).
 """
 
+import hashlib
 import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
 import requests
+from requests.adapters import HTTPAdapter
 from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
 
 logger = logging.getLogger("ishemalink.notifications")
 
+_session      = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """Pooled keep-alive session to the SMS gateway, shared by every sender thread."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=settings.SMS_CONCURRENCY)
+                session.mount("http://",  adapter)
+                session.mount("https://", adapter)
+                _session = session
+    return _session
+
+
+def acquire_send_budget(count: int):
+    """
+    Block until `count` messages fit in the current one-second window of
+    the gateway rate limit. The window counter lives in the cache so all
+    workers share it; a batch larger than the limit gets a window to itself.
+    """
+    rate = settings.SMS_RATE_LIMIT
+    while True:
+        window = int(time.time())
+        key    = f"sms:rate:{window}"
+        cache.add(key, 0, timeout=5)
+        try:
+            used = cache.incr(key, count)
+        except ValueError:                  # window key expired between add and incr
+            continue
+        if used <= rate or used == count:
+            return
+        time.sleep(max(window + 1 - time.time(), 0))
+
 
 class NotificationService:
     """Send SMS and Email notifications. Fails silently — never blocks the main flow."""
 
     def send_sms(self, phone: str, message: str) -> bool:
         """Send SMS via gateway. Returns True on success."""
+        from apps.notifications.receipts import record_accepted
+
+        gateway_id = self._post_sms(phone, message)
+        if gateway_id is None:
+            return False
+        record_accepted([(phone, message)], [gateway_id])
+        return True
+
+    def _post_sms(self, phone: str, message: str):
+        """POST one SMS; returns the gateway message id ("" if none given), or None if not accepted."""
         try:
-            resp = requests.post(
+            resp = get_session().post(
                 f"{settings.SMS_GATEWAY_URL}/send",
                 json={"phone": phone, "message": message},
                 timeout=3,
             )
             if resp.status_code == 200:
                 logger.info("SMS sent to %s", phone)
-                return True
+                try:
+                    return str(resp.json().get("message_id") or "")
+                except ValueError:
+                    return ""
             logger.warning("SMS gateway returned %s for %s", resp.status_code, phone)
         except requests.RequestException as exc:
             logger.warning("SMS failed for %s: %s", phone, exc)
-        return False
+        return None
 
     def send_email(self, email: str, subject: str, body: str) -> bool:
         """Send email (stub — wire to SendGrid/AWS SES in production)."""
@@ -36,13 +108,124 @@ class NotificationService:
         # In production: send via Django email backend or SendGrid API
         return True
 
-    def broadcast_to_drivers(self, message: str) -> int:
-        """Send SMS to all active drivers. Returns count sent."""
-        from apps.authentication.models import Agent
-        drivers = Agent.objects.filter(role="DRIVER", is_active=True)
-        sent = 0
-        for driver in drivers:
-            if self.send_sms(driver.phone, message):
-                sent += 1
-        logger.info("Broadcast sent to %d drivers", sent)
-        return sent
+    # ── Outbox ────────────────────────────────────────────────────────────────
+    def enqueue_sms(self, phone: str, message: str, reference: str = ""):
+        """Write an SMS to the outbox inside the current transaction; sent after commit."""
+        from apps.notifications.models import OutboundMessage
+        return self._enqueue(OutboundMessage(
+            channel=OutboundMessage.Channel.SMS, recipient=phone, body=message, reference=reference,
+        ))
+
+    def enqueue_email(self, email: str, subject: str, body: str, reference: str = ""):
+        """Write an email to the outbox inside the current transaction; sent after commit."""
+        from apps.notifications.models import OutboundMessage
+        return self._enqueue(OutboundMessage(
+            channel=OutboundMessage.Channel.EMAIL, recipient=email, subject=subject[:200],
+            body=body, reference=reference,
+        ))
+
+    def _enqueue(self, message):
+        """
+        Save unless the same message went to the same recipient within
+        OUTBOX_DEDUPE_WINDOW (a retried booking step). An SMS is held for
+        SMS_COALESCE_WINDOW — or joins the hold of one already pending for
+        that phone — so the dispatcher can send them as one.
+        """
+        from apps.notifications.models import OutboundMessage
+        from apps.notifications.tasks import dispatch_outbox
+
+        now = timezone.now()
+        message.dedupe_key = hashlib.sha1(
+            "\x1f".join((message.channel, message.recipient, message.subject, message.body)).encode()
+        ).hexdigest()
+        duplicate = (
+            OutboundMessage.objects
+            .filter(dedupe_key=message.dedupe_key,
+                    created_at__gte=now - timedelta(seconds=settings.OUTBOX_DEDUPE_WINDOW))
+            .exclude(status=OutboundMessage.Status.FAILED)
+            .first()
+        )
+        if duplicate is not None:
+            logger.info("Outbox: duplicate %s to %s dropped", message.channel, message.recipient)
+            return duplicate
+
+        hold = 0
+        if message.channel == OutboundMessage.Channel.SMS and settings.SMS_COALESCE_WINDOW:
+            pending = (
+                OutboundMessage.objects
+                .filter(channel=message.channel, recipient=message.recipient,
+                        status=OutboundMessage.Status.PENDING, attempts=0, next_attempt_at__gt=now)
+                .order_by("next_attempt_at")
+                .values_list("next_attempt_at", flat=True)
+                .first()
+            )
+            message.next_attempt_at = pending or now + timedelta(seconds=settings.SMS_COALESCE_WINDOW)
+            hold = max((message.next_attempt_at - now).total_seconds(), 0)
+        message.save()
+        transaction.on_commit(lambda: dispatch_outbox.apply_async(countdown=hold))
+        return message
+
+    # ── Bulk ──────────────────────────────────────────────────────────────────
+    def send_bulk(self, messages) -> int:
+        """
+        Send [(phone, message), ...] with bounded concurrency and the shared
+        rate limit. Returns how many the gateway accepted.
+        """
+        return sum(gateway_id is not None for gateway_id in self.deliver(messages))
+
+    def deliver(self, messages) -> list:
+        """
+        send_bulk() with a per-message outcome, in input order: the gateway
+        message id, or None if it was not accepted. Accepted messages are
+        recorded as SmsMessage rows for delivery receipts.
+        """
+        from apps.notifications.receipts import record_accepted
+
+        messages = list(messages)
+        if not messages:
+            return []
+        if settings.SMS_GATEWAY_BULK:
+            size = settings.SMS_BULK_SIZE
+            jobs, send = [messages[i:i + size] for i in range(0, len(messages), size)], self._send_batch
+        else:
+            jobs, send = [[item] for item in messages], self._send_one
+        with ThreadPoolExecutor(max_workers=min(settings.SMS_CONCURRENCY, len(jobs))) as pool:
+            results = [gateway_id for batch in pool.map(send, jobs) for gateway_id in batch]
+        record_accepted(messages, results)
+        return results
+
+    def _send_one(self, batch) -> list:
+        acquire_send_budget(1)
+        return [self._post_sms(*batch[0])]
+
+    def _send_batch(self, batch) -> list:
+        acquire_send_budget(len(batch))
+        try:
+            resp = get_session().post(
+                f"{settings.SMS_GATEWAY_URL}/send-bulk",
+                json={"messages": [{"phone": phone, "message": message} for phone, message in batch]},
+                timeout=settings.SMS_BULK_TIMEOUT,
+            )
+            resp.raise_for_status()
+            results = resp.json().get("results", [])
+        except (requests.RequestException, ValueError) as exc:
+            logger.warning("SMS bulk send of %d failed: %s", len(batch), exc)
+            return [None] * len(batch)
+        ids = [
+            str(r.get("message_id") or "") if r.get("status") == "ACCEPTED" else None
+            for r in results[:len(batch)]
+        ]
+        return ids + [None] * (len(batch) - len(ids))
+
+    def broadcast_to_drivers(self, message: str, created_by=None):
+        """
+        Queue an SMS to all active drivers and return the BroadcastJob at once;
+        Celery sends it in chunks after the job row is committed.
+        """
+        from apps.notifications.models import BroadcastJob
+        from apps.notifications.tasks import dispatch_broadcast
+
+        job = BroadcastJob.objects.create(message=message, created_by=created_by)
+        transaction.on_commit(lambda: dispatch_broadcast.delay(str(job.id)))
+        logger.info("Broadcast %s queued", job.id)
+        return job
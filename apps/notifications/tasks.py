@@ -0,0 +1,59 @@
+"""Celery tasks for SMS broadcasts and the notification outbox."""
+
+import logging
+from celery import shared_task
+from django.utils import timezone
+
+logger = logging.getLogger("ishemalink.notifications.tasks")
+
+
+@shared_task
+def dispatch_broadcast(job_id: str):
+    """Split a broadcast into SMS_BROADCAST_CHUNK recipient chunks, one task each."""
+    from django.conf import settings
+    from apps.authentication.models import Agent
+    from apps.notifications.models import BroadcastJob
+
+    phones = list(
+        Agent.objects.filter(role="DRIVER", is_active=True).order_by("id").values_list("phone", flat=True)
+    )
+    size   = settings.SMS_BROADCAST_CHUNK
+    chunks = [phones[i:i + size] for i in range(0, len(phones), size)]
+
+    updated = BroadcastJob.objects.filter(pk=job_id, status=BroadcastJob.Status.QUEUED).update(
+        status=BroadcastJob.Status.RUNNING if chunks else BroadcastJob.Status.DONE, total=len(phones),
+    )
+    if not updated:                          # already dispatched (task redelivered)
+        return 0
+    if not chunks:
+        BroadcastJob.objects.filter(pk=job_id).update(finished_at=timezone.now())
+    for chunk in chunks:
+        send_broadcast_chunk.delay(job_id, chunk)
+    logger.info("Broadcast %s: %d recipients in %d chunks", job_id, len(phones), len(chunks))
+    return len(chunks)
+
+
+@shared_task
+def send_broadcast_chunk(job_id: str, phones: list):
+    """Send one chunk through the pooled bulk sender and add to the job's counters."""
+    from django.db.models import F
+    from apps.notifications.models import BroadcastJob
+    from apps.notifications.service import NotificationService
+
+    message = BroadcastJob.objects.values_list("message", flat=True).get(pk=job_id)
+    sent    = NotificationService().send_bulk((phone, message) for phone in phones)
+
+    BroadcastJob.objects.filter(pk=job_id).update(
+        sent=F("sent") + sent, failed=F("failed") + len(phones) - sent,
+    )
+    BroadcastJob.objects.filter(
+        pk=job_id, status=BroadcastJob.Status.RUNNING, total__lte=F("sent") + F("failed"),
+    ).update(status=BroadcastJob.Status.DONE, finished_at=timezone.now())
+    return sent
+
+
+@shared_task
+def dispatch_outbox():
+    """Send due outbox messages. Queued on commit by each enqueue, and run by beat to pick up retries."""
+    from apps.notifications.outbox import dispatch_due
+    return dispatch_due()
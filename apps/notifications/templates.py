@@ -0,0 +1,68 @@
+"""
+Notification message templates.
+
+Each template is parsed once at import into literal/field pieces, so
+rendering is a single join with no format-string parsing per message, and
+a misspelt field fails at import instead of mid-booking. SMS bodies share
+the SMS_PREFIX brand tag; the coalescer drops it from every part but the
+first when it merges messages to one phone.
+"""
+
+from string import Formatter
+
+SMS_PREFIX = "IshemaLink: "
+
+
+class MessageTemplate:
+    __slots__ = ("name", "_parts", "fields")
+
+    def __init__(self, name: str, text: str):
+        self.name   = name
+        self._parts = []
+        for literal, field, spec, conversion in Formatter().parse(text):
+            if spec or conversion:
+                raise ValueError(f"Template {name}: format specs are not supported ({field}).")
+            self._parts.append((literal, field))
+        self.fields = frozenset(field for _, field in self._parts if field)
+
+    def render(self, **values) -> str:
+        missing = self.fields - values.keys()
+        if missing:
+            raise KeyError(f"Template {self.name} needs {', '.join(sorted(missing))}.")
+        return "".join(
+            literal + (str(values[field]) if field else "")
+            for literal, field in self._parts
+        )
+
+
+SMS_TEMPLATES = {
+    name: MessageTemplate(name, SMS_PREFIX + text)
+    for name, text in {
+        "payment_received": "Payment received for {code}. Amount: {amount} RWF. Assigning your driver now.",
+        "driver_assigned":  "Driver {driver} ({plate}) is on the way. Track: {code}",
+        "delivered":        "Shipment {code} has arrived at its destination.",
+        "payment_failed":   "Payment failed for {code}. Reason: {reason}. Please retry.",
+    }.items()
+}
+
+EMAIL_TEMPLATES = {
+    "customs_documents": (
+        "Customs Documentation Required",
+        MessageTemplate(
+            "customs_documents",
+            "Dear Exporter,\n\n"
+            "Your shipment {code} has been assigned to {driver}. Please ensure customs "
+            "documents are ready for border crossing.\n\nIshemaLink Team",
+        ),
+    ),
+}
+
+
+def render_sms(name: str, **values) -> str:
+    return SMS_TEMPLATES[name].render(**values)
+
+
+def render_email(name: str, **values) -> tuple:
+    """(subject, body) for an email template."""
+    subject, template = EMAIL_TEMPLATES[name]
+    return subject, template.render(**values)
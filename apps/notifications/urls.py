@@ -1,6 +1,9 @@
 from django.urls import path
-from .views import BroadcastView
+from .views import BroadcastView, BroadcastJobView, DeliveryReceiptView, SmsDeliveryStatsView
 
 urlpatterns = [
-    path("broadcast/", BroadcastView.as_view(), name="notifications-broadcast"),
+    path("broadcast/",               BroadcastView.as_view(),        name="notifications-broadcast"),
+    path("broadcast/<uuid:job_id>/", BroadcastJobView.as_view(),     name="notifications-broadcast-job"),
+    path("dlr/",                     DeliveryReceiptView.as_view(),  name="notifications-dlr"),
+    path("sms/stats/",               SmsDeliveryStatsView.as_view(), name="notifications-sms-stats"),
 ]
@@ -1,10 +1,17 @@
-"""Notification broadcast endpoint."""
+"""Notification endpoints — driver broadcasts, SMS delivery receipts and delivery stats."""
 
+import hmac
+import json
+
+from django.conf import settings
+from django.utils.decorators import method_decorator
+from django.views.decorators.csrf import csrf_exempt
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework import serializers
 from drf_spectacular.utils import extend_schema
+from apps.notifications.models import BroadcastJob
 from apps.notifications.service import NotificationService
 
 notifier = NotificationService()
@@ -14,8 +21,17 @@ class BroadcastSerializer(serializers.Serializer):
     message = serializers.CharField(max_length=160)
 
 
+class BroadcastJobSerializer(serializers.ModelSerializer):
+    job_id = serializers.UUIDField(source="id", read_only=True)
+
+    class Meta:
+        model  = BroadcastJob
+        fields = ["job_id", "status", "total", "sent", "failed", "created_at", "finished_at"]
+
+
 @extend_schema(tags=["Notifications"], summary="Broadcast SMS to all active drivers (Admin only)")
 class BroadcastView(APIView):
+    """Queues the broadcast and returns 202 at once; poll the job for progress."""
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
@@ -23,5 +39,62 @@ class BroadcastView(APIView):
             return Response({"error": "Admin only."}, status=403)
         ser = BroadcastSerializer(data=request.data)
         ser.is_valid(raise_exception=True)
-        count = notifier.broadcast_to_drivers(ser.validated_data["message"])
-        return Response({"sent_to": count})
+        job = notifier.broadcast_to_drivers(ser.validated_data["message"], created_by=request.user)
+        return Response(BroadcastJobSerializer(job).data, status=202)
+
+
+@extend_schema(tags=["Notifications"], summary="Broadcast job progress (Admin only)")
+class BroadcastJobView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, job_id):
+        if request.user.role != "ADMIN":
+            return Response({"error": "Admin only."}, status=403)
+        job = BroadcastJob.objects.filter(pk=job_id).first()
+        if job is None:
+            return Response({"error": "Not found"}, status=404)
+        return Response(BroadcastJobSerializer(job).data)
+
+
+@extend_schema(tags=["Notifications"], summary="Bulk SMS delivery receipts (gateway callback)")
+@method_decorator(csrf_exempt, name="dispatch")
+class DeliveryReceiptView(APIView):
+    """
+    The gateway POSTs {"receipts": [...]} with the shared SMS_DLR_TOKEN in
+    X-DLR-Token. Thousands of receipts are applied per request in a few
+    bulk queries; replays and out-of-order receipts are harmless.
+    """
+    permission_classes     = [AllowAny]
+    authentication_classes = []   # gateway callback, not JWT-authenticated
+
+    def post(self, request):
+        from apps.notifications.receipts import apply_receipts
+
+        token = request.headers.get("X-DLR-Token", "")
+        if not settings.SMS_DLR_TOKEN or not hmac.compare_digest(token, settings.SMS_DLR_TOKEN):
+            return Response({"error": "Invalid receipt token."}, status=403)
+        try:
+            receipts = json.loads(request.body)["receipts"]
+        except (ValueError, KeyError, TypeError):
+            return Response({"error": 'Expected {"receipts": [...]}.'}, status=400)
+        if not isinstance(receipts, list):
+            return Response({"error": "receipts must be a list."}, status=400)
+        if len(receipts) > settings.SMS_DLR_MAX_RECEIPTS:
+            return Response({"error": f"At most {settings.SMS_DLR_MAX_RECEIPTS} receipts per request."}, status=413)
+        return Response(apply_receipts(receipts))
+
+
+@extend_schema(tags=["Notifications"], summary="SMS delivery rate per carrier (Admin only)")
+class SmsDeliveryStatsView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        from apps.notifications.receipts import carrier_stats
+
+        if request.user.role != "ADMIN":
+            return Response({"error": "Admin only."}, status=403)
+        try:
+            days = min(max(int(request.query_params.get("days", 7)), 1), 90)
+        except ValueError:
+            return Response({"error": "days must be an integer."}, status=400)
+        return Response({"days": days, "carriers": carrier_stats(days)})
@@ -0,0 +1,112 @@
+"""
+Stale-while-revalidate response cache for dashboard and analytics views.
+
+A view's aggregation is registered with @cached_view(name, ttl) and served
+through cached_response(name, params). Each entry carries the time it goes
+stale; it is kept in the cache for a further `stale` seconds:
+
+    fresh       served as is                                   X-Cache: HIT
+    stale       served as is; one worker recomputes it in the
+                background (Celery) while everyone else keeps
+                reading the old value                          X-Cache: STALE
+    missing     single-flight: the process that wins the
+                cache.add() lock computes, the rest poll for
+                its result (SWR_WAIT_TIMEOUT) instead of
+                running the same aggregation                   X-Cache: MISS
+
+So however many Control Tower screens refresh at once, each aggregation
+runs at most once per key per TTL.
+"""
+
+import hashlib
+import json
+import logging
+import time
+from importlib import import_module
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.response import Response
+
+logger = logging.getLogger("ishemalink.ops")
+
+POLL_INTERVAL = 0.05
+
+_registry = {}      # name → (compute, ttl, stale)
+
+
+def cached_view(name: str, ttl: int, stale: int = None):
+    """Register `compute(**params)` as the cached aggregation behind `name`."""
+    def decorator(compute):
+        _registry[name] = (compute, ttl, ttl * 4 if stale is None else stale)
+        return compute
+    return decorator
+
+
+def _key(name: str, params: dict) -> str:
+    digest = hashlib.sha1(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()[:16]
+    return f"swr:{name}:{digest}"
+
+
+def _store(name: str, params: dict, key: str):
+    compute, ttl, stale = _registry[name]
+    data = compute(**params)
+    cache.set(key, {"data": data, "fresh_until": time.time() + ttl}, timeout=ttl + stale)
+    return data
+
+
+def _revalidate(name: str, params: dict, key: str):
+    from apps.ops.tasks import refresh_cached_view
+
+    compute = _registry[name][0]
+    try:
+        refresh_cached_view.delay(name, compute.__module__, params)
+    except Exception as exc:                    # broker down: serve stale, retry next request
+        cache.delete(f"{key}:lock")
+        logger.warning("SWR refresh of %s not queued: %s", name, exc)
+
+
+def fetch(name: str, params: dict = None) -> tuple:
+    """(data, "HIT" | "STALE" | "MISS") for a registered aggregation."""
+    params = params or {}
+    key    = _key(name, params)
+    lock   = f"{key}:lock"
+
+    entry = cache.get(key)
+    if entry is not None:
+        if time.time() < entry["fresh_until"]:
+            return entry["data"], "HIT"
+        if cache.add(lock, 1, timeout=settings.SWR_LOCK_TIMEOUT):
+            _revalidate(name, params, key)
+        return entry["data"], "STALE"
+
+    if cache.add(lock, 1, timeout=settings.SWR_LOCK_TIMEOUT):
+        try:
+            return _store(name, params, key), "MISS"
+        finally:
+            cache.delete(lock)
+
+    deadline = time.time() + settings.SWR_WAIT_TIMEOUT
+    while time.time() < deadline:
+        time.sleep(POLL_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry["data"], "HIT"
+    logger.warning("SWR: gave up waiting for %s, computing it here", name)
+    return _store(name, params, key), "MISS"
+
+
+def refresh(name: str, module: str, params: dict):
+    """Recompute one entry and release its lock (runs in a Celery worker)."""
+    if name not in _registry:
+        import_module(module)                   # worker: registers the view's aggregations
+    key = _key(name, params)
+    try:
+        _store(name, params, key)
+    finally:
+        cache.delete(f"{key}:lock")
+
+
+def cached_response(name: str, params: dict = None) -> Response:
+    data, state = fetch(name, params)
+    return Response(data, headers={"X-Cache": state})
@@ -0,0 +1,10 @@
+"""Celery tasks for the ops app."""
+
+from celery import shared_task
+
+
+@shared_task
+def refresh_cached_view(name: str, module: str, params: dict):
+    """Background revalidation of a stale dashboard/analytics cache entry."""
+    from apps.ops.caching import refresh
+    refresh(name, module, params)
@@ -4,6 +4,7 @@ Operations views:
   - Prometheus-formatted metrics
   - Maintenance mode toggle
   - Admin dashboard summary
+    (dashboard and metrics aggregates go through the SWR cache in apps.ops.caching)
   - Test seeding and load simulation
 """
 
@@ -24,6 +25,8 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from drf_spectacular.utils import extend_schema
 
+from apps.ops.caching import cached_response, cached_view, fetch
+
 logger = logging.getLogger("ishemalink.ops")
 
 
@@ -69,20 +72,27 @@ class DeepHealthView(APIView):
 
 
 # ── GET /api/ops/metrics/ ────────────────────────────────────────────────────
+@cached_view("ops.metrics", ttl=15)
+def metrics_gauges():
+    from apps.shipments.models import Shipment
+    from apps.payments.models import Payment
+
+    shipment_counts = dict(
+        Shipment.objects.values_list("status").annotate(c=Count("id"))
+    )
+    total_revenue = Payment.objects.filter(
+        status=Payment.Status.SUCCESS
+    ).aggregate(t=Sum("amount"))["t"] or 0
+    return shipment_counts, total_revenue
+
+
 @extend_schema(tags=["Ops"], summary="Prometheus-formatted operational metrics")
 class MetricsView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        from apps.shipments.models import Shipment
-        from apps.payments.models import Payment
-
-        shipment_counts = dict(
-            Shipment.objects.values_list("status").annotate(c=Count("id"))
-        )
-        total_revenue = Payment.objects.filter(
-            status=Payment.Status.SUCCESS
-        ).aggregate(t=Sum("amount"))["t"] or 0
+        # DB gauges come from the shared cache; circuit states below are live
+        (shipment_counts, total_revenue), _ = fetch("ops.metrics")
 
         # Prometheus text format
         lines = [
@@ -97,6 +107,22 @@ class MetricsView(APIView):
             "# TYPE ishemalink_revenue_rwf gauge",
             f"ishemalink_revenue_rwf {total_revenue}",
         ]
+        from apps.govtech.resilience import breaker_states, STATE_VALUES
+        states = breaker_states()
+        lines += [
+            "",
+            "# HELP ishemalink_circuit_state Government connector circuit (0=closed, 1=half-open, 2=open)",
+            "# TYPE ishemalink_circuit_state gauge",
+        ]
+        for name, (state, _) in states.items():
+            lines.append(f'ishemalink_circuit_state{{connector="{name}"}} {STATE_VALUES[state]}')
+        lines += [
+            "",
+            "# HELP ishemalink_circuit_rejections_total Calls rejected by an open circuit or full bulkhead",
+            "# TYPE ishemalink_circuit_rejections_total counter",
+        ]
+        for name, (_, rejections) in states.items():
+            lines.append(f'ishemalink_circuit_rejections_total{{connector="{name}"}} {rejections}')
         from django.http import HttpResponse
         return HttpResponse("\n".join(lines), content_type="text/plain; version=0.0.4")
 
@@ -116,6 +142,31 @@ class MaintenanceToggleView(APIView):
 
 
 # ── GET /api/admin/dashboard/summary/ ────────────────────────────────────────
+@cached_view("ops.dashboard_summary", ttl=15)
+def dashboard_summary():
+    from apps.shipments.models import Shipment
+    from apps.payments.models import Payment
+    from apps.authentication.models import Agent
+
+    active_trucks  = Shipment.objects.filter(status=Shipment.Status.IN_TRANSIT).count()
+    today_revenue  = Payment.objects.filter(
+        status=Payment.Status.SUCCESS
+    ).aggregate(t=Sum("amount"))["t"] or 0
+    pending_payments = Payment.objects.filter(status=Payment.Status.PENDING).count()
+    total_agents   = Agent.objects.filter(is_active=True).count()
+    shipment_summary = dict(
+        Shipment.objects.values_list("status").annotate(c=Count("id"))
+    )
+
+    return {
+        "active_trucks_in_transit": active_trucks,
+        "today_revenue_rwf":        str(today_revenue),
+        "pending_payments":         pending_payments,
+        "active_agents":            total_agents,
+        "shipments_by_status":      shipment_summary,
+    }
+
+
 @extend_schema(tags=["Admin"], summary="Control Tower — live fleet and revenue overview")
 class DashboardSummaryView(APIView):
     permission_classes = [IsAuthenticated]
@@ -123,28 +174,7 @@ class DashboardSummaryView(APIView):
     def get(self, request):
         if request.user.role != "ADMIN":
             return Response({"error": "Admin only."}, status=403)
-
-        from apps.shipments.models import Shipment
-        from apps.payments.models import Payment
-        from apps.authentication.models import Agent
-
-        active_trucks  = Shipment.objects.filter(status=Shipment.Status.IN_TRANSIT).count()
-        today_revenue  = Payment.objects.filter(
-            status=Payment.Status.SUCCESS
-        ).aggregate(t=Sum("amount"))["t"] or 0
-        pending_payments = Payment.objects.filter(status=Payment.Status.PENDING).count()
-        total_agents   = Agent.objects.filter(is_active=True).count()
-        shipment_summary = dict(
-            Shipment.objects.values_list("status").annotate(c=Count("id"))
-        )
-
-        return Response({
-            "active_trucks_in_transit": active_trucks,
-            "today_revenue_rwf":        str(today_revenue),
-            "pending_payments":         pending_payments,
-            "active_agents":            total_agents,
-            "shipments_by_status":      shipment_summary,
-        })
+        return cached_response("ops.dashboard_summary")
 
 
 # ── POST /api/test/seed/ ─────────────────────────────────────────────────────
@@ -158,6 +188,8 @@ class SeedView(APIView):
 
         from apps.shipments.models import Shipment, Zone, Commodity
         from apps.authentication.models import Agent
+        from apps.analytics.cube import record_bookings
+        from apps.analytics.sketches import record_senders
 
         count = int(request.data.get("count", 100))
         zones = list(Zone.objects.all())
@@ -167,11 +199,11 @@ class SeedView(APIView):
         if not zones or not commodities:
             return Response({"error": "Seed Zones and Commodities first via admin."}, status=400)
 
-        created = 0
+        created = []
         for _ in range(count):
             oz, dz = random.sample(zones, 2)
             suffix = "".join(random.choices(string.ascii_uppercase + string.digits, k=8))
-            Shipment.objects.create(
+            created.append(Shipment.objects.create(
                 tracking_code = f"SEED-{suffix}",
                 shipment_type = random.choice([Shipment.Type.DOMESTIC, Shipment.Type.INTERNATIONAL]),
                 status        = random.choice([
@@ -186,10 +218,11 @@ class SeedView(APIView):
                 destination_country = random.choice(["UG", "KE", "TZ", ""]),
                 total_amount  = Decimal(random.uniform(2000, 80000)).quantize(Decimal("0.01")),
                 offline_created = random.random() < 0.1,
-            )
-            created += 1
+            ))
+        record_bookings(created)
+        record_senders(created)
 
-        return Response({"seeded": created})
+        return Response({"seeded": len(created)})
 
 
 
@@ -0,0 +1,48 @@
+from django.db import migrations, models
+
+
+def backfill_ebm_status(apps, schema_editor):
+    """Signed payments whose shipment carries a LOCAL- receipt were fallbacks."""
+    Payment = apps.get_model("payments", "Payment")
+    signed  = Payment.objects.filter(ebm_signed=True)
+    signed.filter(shipment__ebm_receipt_number__startswith="LOCAL-").update(
+        ebm_status="FALLBACK", ebm_fallback_at=models.F("updated_at"),
+    )
+    signed.exclude(shipment__ebm_receipt_number__startswith="LOCAL-").update(ebm_status="SIGNED")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("payments", "0002_payment_status_ebm_idx"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="payment",
+            name="ebm_status",
+            field=models.CharField(
+                choices=[
+                    ("UNSIGNED", "Unsigned"),
+                    ("SIGNED",   "Signed by RRA"),
+                    ("FALLBACK", "Local fallback — awaiting RRA re-sign"),
+                ],
+                default="UNSIGNED",
+                max_length=10,
+            ),
+        ),
+        migrations.AddField(
+            model_name="payment",
+            name="ebm_fallback_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_ebm_status, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="payment",
+            index=models.Index(
+                condition=models.Q(ebm_status="FALLBACK"),
+                fields=["ebm_fallback_at", "id"],
+                name="pay_ebm_fallback_idx",
+            ),
+        ),
+    ]
@@ -28,6 +28,11 @@ class Payment(models.Model):
         FAILED   = "FAILED",   "Failed"
         REFUNDED = "REFUNDED", "Refunded"
 
+    class EbmStatus(models.TextChoices):
+        UNSIGNED = "UNSIGNED", "Unsigned"
+        SIGNED   = "SIGNED",   "Signed by RRA"
+        FALLBACK = "FALLBACK", "Local fallback — awaiting RRA re-sign"
+
     id          = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     shipment    = models.OneToOneField(
         "shipments.Shipment", on_delete=models.PROTECT, related_name="payment"
@@ -39,11 +44,25 @@ class Payment(models.Model):
     gateway_ref = models.CharField(max_length=100, blank=True, db_index=True)
     status      = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
     ebm_signed  = models.BooleanField(default=False)
+    ebm_status  = models.CharField(max_length=10, choices=EbmStatus.choices, default=EbmStatus.UNSIGNED)
+    ebm_fallback_at = models.DateTimeField(null=True, blank=True)   # when a LOCAL- receipt was issued
     created_at  = models.DateTimeField(auto_now_add=True)
     updated_at  = models.DateTimeField(auto_now=True)
 
     class Meta:
-        indexes = [models.Index(fields=["gateway_ref"]), models.Index(fields=["status"])]
+        indexes = [
+            models.Index(fields=["gateway_ref"]),
+            models.Index(fields=["status"]),
+            # EBM batch signer: status=SUCCESS AND ebm_signed=False
+            models.Index(fields=["status", "ebm_signed"], name="pay_status_ebm_idx"),
+            # Fallback re-sign sweeper: only LOCAL- receipts, oldest first
+            models.Index(
+                fields=["ebm_fallback_at", "id"], name="pay_ebm_fallback_idx",
+                condition=models.Q(ebm_status="FALLBACK"),
+            ),
+            # Bulk export: keyset scan from the last watermark
+            models.Index(fields=["updated_at", "id"], name="pay_updated_idx"),
+        ]
 
     def __str__(self):
         return f"{self.shipment.tracking_code} – {self.status} ({self.amount} RWF)"
@@ -80,7 +99,7 @@ class MomoMockAdapter(PaymentGatewayAdapter):
         gateway_ref = str(_uuid.uuid4())
         payment.gateway_ref = gateway_ref
         payment.status      = Payment.Status.PENDING
-        payment.save(update_fields=["gateway_ref", "status"])
+        payment.save(update_fields=["gateway_ref", "status", "updated_at"])
 
         logger.info(
             "MOMO MOCK: Push prompt sent to %s for %s RWF. Ref: %s",
@@ -15,5 +15,5 @@ class PaymentDetailSerializer(serializers.ModelSerializer):
     class Meta:
         model  = Payment
         fields = ["id", "tracking_code", "provider", "amount", "currency",
-                  "payer_phone", "gateway_ref", "status", "ebm_signed",
+                  "payer_phone", "gateway_ref", "status", "ebm_signed", "ebm_status",
                   "created_at", "updated_at"]
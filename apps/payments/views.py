@@ -125,9 +125,8 @@ class PaymentWebhookView(APIView):
                 payment.status = Payment.Status.SUCCESS
                 payment.save(update_fields=["status", "updated_at"])
 
-                # EBM receipt signing (async)
-                from apps.govtech.tasks import sign_ebm_receipt
-                sign_ebm_receipt.delay(str(payment.id))
+                # EBM receipt signing is picked up by the batch sweeper
+                # (apps.govtech.tasks.sign_pending_ebm_receipts, ebm_signed=False)
 
                 # Advance shipment state
                 booking_service.confirm_payment(payment.shipment, payment)
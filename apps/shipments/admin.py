@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Shipment, Zone, Commodity, ShipmentEvent
+from .models import Shipment, Zone, Commodity, ShipmentEvent, TransitStat
 
 
 @admin.register(Zone)
@@ -28,3 +28,10 @@ class ShipmentAdmin(admin.ModelAdmin):
 class ShipmentEventAdmin(admin.ModelAdmin):
     list_display  = ("shipment", "from_status", "to_status", "actor", "occurred_at")
     readonly_fields = ("occurred_at",)
+
+
+@admin.register(TransitStat)
+class TransitStatAdmin(admin.ModelAdmin):
+    list_display    = ("origin_zone", "dest_zone", "samples", "median_s", "p90_s", "updated_at")
+    exclude         = ("recent",)
+    readonly_fields = ("origin_zone", "dest_zone", "samples", "median_s", "p90_s", "last_event_id", "last_event_at")
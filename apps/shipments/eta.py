@@ -0,0 +1,207 @@
+"""
+ETA engine — zone×zone transit-time matrix from delivery history.
+
+refresh_transit_stats() folds DELIVERED events past the watermark (the
+(occurred_at, id) of the last event folded) into per-pair TransitStat rows:
+duration is DELIVERED − first ASSIGNED, median/p90 over the latest
+ETA_MAX_SAMPLES. It runs on Celery beat; each run only reads the new events.
+Events younger than ETA_SETTLE_SECONDS wait for the next run — ids and
+timestamps are taken at insert, so a delivery transaction still in flight
+could otherwise commit behind the watermark and never be folded.
+
+EtaEngine keeps the matrix and zone centres in process memory (reloaded
+every ETA_MATRIX_TTL seconds), so estimate() is a dict lookup plus a
+little arithmetic — no queries on the request path.
+"""
+
+import logging
+import math
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+logger = logging.getLogger("ishemalink.eta")
+
+EARTH_RADIUS_KM   = 6371.0
+ACTIVE_STATUSES   = ("ASSIGNED", "IN_TRANSIT", "AT_BORDER")
+PENDING_STATUSES  = ("CONFIRMED", "PAID")
+ETA_WATERMARK_KEY = "eta:watermark"
+
+
+def _percentile(ordered: list, q: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    return float(ordered[max(0, math.ceil(q * len(ordered)) - 1)])
+
+
+def _haversine_km(a, b) -> float:
+    lat1, lng1, lat2, lng2 = map(math.radians, (*a, *b))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(h))
+
+
+# ── Matrix refresh ────────────────────────────────────────────────────────────
+def refresh_transit_stats(batch_size: int = 5000) -> int:
+    """Fold newly delivered shipments into TransitStat. Returns deliveries processed."""
+    from django.db import transaction
+    from django.db.models import Min, Q
+    from apps.shipments.models import Shipment, ShipmentEvent, TransitStat
+
+    marks = [
+        TransitStat.objects.filter(last_event_at__isnull=False)
+        .order_by("-last_event_at", "-last_event_id").values_list("last_event_at", "last_event_id").first()
+    ]
+    cached = cache.get(ETA_WATERMARK_KEY)
+    if cached:
+        marks.append((parse_datetime(cached[0]), cached[1]))
+    marks = [mark for mark in marks if mark]
+
+    events = ShipmentEvent.objects.filter(
+        to_status=Shipment.Status.DELIVERED,
+        occurred_at__lt=timezone.now() - timedelta(seconds=settings.ETA_SETTLE_SECONDS),
+    )
+    if marks:
+        after_at, after_id = max(marks)
+        events = events.filter(Q(occurred_at__gt=after_at) | Q(occurred_at=after_at, id__gt=after_id))
+    delivered = list(
+        events.order_by("occurred_at", "id")
+        .values_list("id", "shipment_id", "occurred_at",
+                     "shipment__origin_zone_id", "shipment__dest_zone_id")[:batch_size]
+    )
+    if not delivered:
+        return 0
+
+    assigned = dict(
+        ShipmentEvent.objects
+        .filter(shipment_id__in={row[1] for row in delivered}, to_status=Shipment.Status.ASSIGNED)
+        .values("shipment_id").annotate(first=Min("occurred_at"))
+        .values_list("shipment_id", "first")
+    )
+
+    durations = {}
+    for _, shipment_id, delivered_at, origin, dest in delivered:
+        started = assigned.get(shipment_id)
+        if started and delivered_at > started:
+            durations.setdefault((origin, dest), []).append((delivered_at - started).total_seconds())
+    last_id, last_at = delivered[-1][0], delivered[-1][2]
+
+    existing = {
+        (s.origin_zone_id, s.dest_zone_id): s
+        for s in TransitStat.objects.filter(
+            origin_zone_id__in={o for o, _ in durations}, dest_zone_id__in={d for _, d in durations},
+        )
+    }
+    to_create, to_update = [], []
+    for pair, new in durations.items():
+        stat = existing.get(pair)
+        if stat is None:
+            stat = TransitStat(origin_zone_id=pair[0], dest_zone_id=pair[1], median_s=0, p90_s=0)
+            to_create.append(stat)
+        else:
+            to_update.append(stat)
+        stat.recent   = (stat.recent + new)[-settings.ETA_MAX_SAMPLES:]
+        stat.samples += len(new)
+        ordered       = sorted(stat.recent)
+        stat.median_s = _percentile(ordered, 0.5)
+        stat.p90_s    = _percentile(ordered, 0.9)
+        stat.last_event_id = last_id
+        stat.last_event_at = last_at
+
+    with transaction.atomic():
+        TransitStat.objects.bulk_create(to_create)
+        TransitStat.objects.bulk_update(
+            to_update, ["recent", "samples", "median_s", "p90_s", "last_event_id", "last_event_at"],
+        )
+    # Deliveries without an ASSIGNED event advance no row; remember them so
+    # the next run doesn't rescan them (losing this key only costs a rescan)
+    cache.set(ETA_WATERMARK_KEY, (last_at.isoformat(), last_id), timeout=None)
+
+    logger.info("ETA matrix: folded %d deliveries into %d zone pairs", len(delivered), len(durations))
+    return len(delivered)
+
+
+# ── In-memory engine ──────────────────────────────────────────────────────────
+class EtaEngine:
+
+    def __init__(self):
+        self._matrix    = {}       # (origin_id, dest_id) → (median_s, p90_s, samples)
+        self._centers   = {}       # zone_id → (lat, lng)
+        self._loaded_at = None
+        self._lock      = threading.Lock()
+
+    def reload(self):
+        from apps.shipments.models import TransitStat, Zone
+
+        matrix = {
+            (o, d): (median, p90, n)
+            for o, d, median, p90, n in TransitStat.objects.values_list(
+                "origin_zone_id", "dest_zone_id", "median_s", "p90_s", "samples",
+            )
+        }
+        centers = {
+            zid: (lat, lng)
+            for zid, lat, lng in Zone.objects.filter(center_lat__isnull=False, center_lng__isnull=False)
+            .values_list("id", "center_lat", "center_lng")
+        }
+        with self._lock:
+            self._matrix, self._centers = matrix, centers
+            self._loaded_at = time.monotonic()
+
+    def _ensure_loaded(self):
+        if self._loaded_at is None or time.monotonic() - self._loaded_at >= settings.ETA_MATRIX_TTL:
+            self.reload()
+
+    def estimate(self, origin_id, dest_id, status, assigned_at=None, position=None, now=None):
+        """
+        {"expected_at", "latest_at", "remaining_minutes", "basis", "samples"} or None
+        when the shipment isn't moving/pending or the corridor has too little history.
+        `latest_at` is the p90 bound. With a GPS position on an active shipment the
+        remaining time is scaled by the straight-line distance left to the destination.
+        """
+        if status not in ACTIVE_STATUSES and status not in PENDING_STATUSES:
+            return None
+        self._ensure_loaded()
+        stat = self._matrix.get((origin_id, dest_id))
+        if stat is None or stat[2] < settings.ETA_MIN_SAMPLES:
+            return None
+        median, p90, samples = stat
+        now = now or timezone.now()
+
+        origin_c, dest_c = self._centers.get(origin_id), self._centers.get(dest_id)
+        if status in ACTIVE_STATUSES and position and origin_c and dest_c:
+            total = _haversine_km(origin_c, dest_c)
+            left  = _haversine_km(position, dest_c)
+            share = min(max(left / total, 0.0), 1.0) if total else 0.0
+            remaining, remaining_p90, basis = median * share, p90 * share, "gps_progress"
+        elif status in ACTIVE_STATUSES and assigned_at:
+            elapsed = (now - assigned_at).total_seconds()
+            remaining, remaining_p90, basis = max(median - elapsed, 0), max(p90 - elapsed, 0), "zone_history"
+        else:
+            remaining, remaining_p90, basis = median, p90, "zone_history"
+
+        return {
+            "expected_at":       (now + timedelta(seconds=remaining)).isoformat(),
+            "latest_at":         (now + timedelta(seconds=remaining_p90)).isoformat(),
+            "remaining_minutes": round(remaining / 60),
+            "basis":             basis,
+            "samples":           samples,
+        }
+
+    def expected_transit(self, origin_id, dest_id):
+        """Median ASSIGNED→DELIVERED seconds for the corridor, or None with too little history."""
+        self._ensure_loaded()
+        stat = self._matrix.get((origin_id, dest_id))
+        return stat[0] if stat and stat[2] >= settings.ETA_MIN_SAMPLES else None
+
+    def for_shipment(self, shipment, position=None):
+        return self.estimate(
+            shipment.origin_zone_id, shipment.dest_zone_id, shipment.status,
+            assigned_at=shipment.assigned_at, position=position,
+        )
+
+
+eta_engine = EtaEngine()
@@ -1,5 +1,5 @@
 """
-Management command: seed initial Rwandan zones and commodities.
+Management command: seed initial Rwandan zones, commodities and geofences.
 
 Usage:
     python manage.py seed_initial_data
@@ -11,20 +11,36 @@ from apps.shipments.models import Zone, Commodity
 
 
 ZONES = [
-    ("Kigali Central",   "Kigali",   "50.00", False),
-    ("Kigali Nyarugenge","Kigali",   "50.00", False),
-    ("Musanze",          "Northern", "45.00", False),
-    ("Rubavu",           "Western",  "44.00", False),
-    ("Nyamagabe",        "Southern", "42.00", False),
-    ("Huye",             "Southern", "43.00", False),
-    ("Rwamagana",        "Eastern",  "41.00", False),
-    ("Kayonza",          "Eastern",  "41.00", False),
-    ("Rusizi",           "Western",  "46.00", True),   # Border with DRC
-    ("Bugesera",         "Eastern",  "40.00", False),
-    ("Nyanza",           "Southern", "43.00", False),
-    ("Gicumbi",          "Northern", "45.00", False),
+    # name               province    rate     border  centre (lat, lng)
+    ("Kigali Central",   "Kigali",   "50.00", False, (-1.9441, 30.0619)),
+    ("Kigali Nyarugenge","Kigali",   "50.00", False, (-1.9499, 30.0588)),
+    ("Musanze",          "Northern", "45.00", False, (-1.4996, 29.6344)),
+    ("Rubavu",           "Western",  "44.00", False, (-1.6793, 29.2590)),
+    ("Nyamagabe",        "Southern", "42.00", False, (-2.4090, 29.4975)),
+    ("Huye",             "Southern", "43.00", False, (-2.5967, 29.7394)),
+    ("Rwamagana",        "Eastern",  "41.00", False, (-1.9487, 30.4347)),
+    ("Kayonza",          "Eastern",  "41.00", False, (-1.9003, 30.5089)),
+    ("Rusizi",           "Western",  "46.00", True,  (-2.4846, 28.9075)),   # Border with DRC
+    ("Bugesera",         "Eastern",  "40.00", False, (-2.2089, 30.0990)),
+    ("Nyanza",           "Southern", "43.00", False, (-2.3516, 29.7509)),
+    ("Gicumbi",          "Northern", "45.00", False, (-1.5757, 30.0673)),
 ]
 
+# Geofences: a small delivery area around each zone depot, plus border posts
+DEPOT_HALF_DEG = 0.0025    # ~280 m either side of the zone centre
+
+BORDER_POSTS = [
+    # name                zone       centre (lat, lng)
+    ("Rusizi I Border",  "Rusizi",  (-2.4818, 28.9019)),   # Bukavu crossing
+    ("Rusizi II Border", "Rusizi",  (-2.5398, 28.8968)),
+]
+BORDER_HALF_DEG = 0.0015
+
+
+def _square(lat, lng, half):
+    return [[lat - half, lng - half], [lat - half, lng + half], [lat + half, lng + half], [lat + half, lng - half]]
+
+
 COMMODITIES = [
     ("Potatoes",          "0701.90", True),
     ("Coffee",            "0901.11", True),
@@ -44,21 +60,26 @@ COMMODITIES = [
 
 
 class Command(BaseCommand):
-    help = "Seed initial Rwandan zones and commodities"
+    help = "Seed initial Rwandan zones, commodities and geofences"
 
     def handle(self, *args, **options):
         created_zones = 0
-        for name, province, rate, is_border in ZONES:
+        for name, province, rate, is_border, (lat, lng) in ZONES:
             _, created = Zone.objects.get_or_create(
                 name=name,
                 defaults={
                     "province":     province,
                     "base_rate_kg": Decimal(rate),
                     "is_border":    is_border,
+                    "center_lat":   lat,
+                    "center_lng":   lng,
                 },
             )
             if created:
                 created_zones += 1
+            else:
+                # Zones seeded before centres existed
+                Zone.objects.filter(name=name, center_lat__isnull=True).update(center_lat=lat, center_lng=lng)
 
         created_commodities = 0
         for name, hs_code, is_perishable in COMMODITIES:
@@ -69,6 +90,24 @@ class Command(BaseCommand):
             if created:
                 created_commodities += 1
 
+        from apps.tracking.models import Geofence
+
+        zones   = {z.name: z for z in Zone.objects.all()}
+        fences  = [
+            (f"{name} depot", Geofence.Kind.ZONE, name, _square(lat, lng, DEPOT_HALF_DEG))
+            for name, _, _, _, (lat, lng) in ZONES
+        ] + [
+            (name, Geofence.Kind.BORDER_POST, zone, _square(lat, lng, BORDER_HALF_DEG))
+            for name, zone, (lat, lng) in BORDER_POSTS
+        ]
+        created_fences = 0
+        for name, kind, zone, polygon in fences:
+            _, created = Geofence.objects.get_or_create(
+                name=name, defaults={"kind": kind, "zone": zones[zone], "polygon": polygon},
+            )
+            if created:
+                created_fences += 1
+
         self.stdout.write(self.style.SUCCESS(
-            f"Seeded {created_zones} zones and {created_commodities} commodities."
+            f"Seeded {created_zones} zones, {created_commodities} commodities and {created_fences} geofences."
         ))
@@ -0,0 +1,23 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("shipments", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="shipmentevent",
+            index=models.Index(fields=["occurred_at", "id"], name="event_occurred_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="shipmentevent",
+            index=models.Index(fields=["shipment", "occurred_at", "id"], name="event_ship_occurred_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="shipmentevent",
+            index=models.Index(fields=["actor", "occurred_at", "id"], name="event_actor_occurred_idx"),
+        ),
+    ]
@@ -0,0 +1,68 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_assigned_at(apps, schema_editor):
+    """Shipments already assigned take the time of their first ASSIGNED event."""
+    Shipment      = apps.get_model("shipments", "Shipment")
+    ShipmentEvent = apps.get_model("shipments", "ShipmentEvent")
+    first_assigned = (
+        ShipmentEvent.objects
+        .filter(shipment=models.OuterRef("pk"), to_status="ASSIGNED")
+        .order_by("occurred_at")
+        .values("occurred_at")[:1]
+    )
+    Shipment.objects.filter(assigned_at__isnull=True).update(assigned_at=models.Subquery(first_assigned))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("shipments", "0002_shipmentevent_audit_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="zone",
+            name="center_lat",
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="zone",
+            name="center_lng",
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="shipment",
+            name="assigned_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_assigned_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="shipmentevent",
+            index=models.Index(fields=["to_status", "occurred_at", "id"], name="event_status_occurred_idx"),
+        ),
+        migrations.CreateModel(
+            name="TransitStat",
+            fields=[
+                ("id",            models.BigAutoField(auto_created=True, primary_key=True, serialize=False)),
+                ("samples",       models.PositiveIntegerField(default=0)),
+                ("recent",        models.JSONField(default=list)),
+                ("median_s",      models.FloatField()),
+                ("p90_s",         models.FloatField()),
+                ("last_event_id", models.BigIntegerField(default=0)),
+                ("last_event_at", models.DateTimeField(blank=True, null=True)),
+                ("updated_at",    models.DateTimeField(auto_now=True)),
+                ("origin_zone",   models.ForeignKey(
+                    on_delete=django.db.models.deletion.CASCADE, related_name="+", to="shipments.zone",
+                )),
+                ("dest_zone",     models.ForeignKey(
+                    on_delete=django.db.models.deletion.CASCADE, related_name="+", to="shipments.zone",
+                )),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="transitstat",
+            constraint=models.UniqueConstraint(fields=("origin_zone", "dest_zone"), name="transit_stat_pair_uniq"),
+        ),
+    ]
@@ -0,0 +1,27 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("shipments", "0003_eta_transit_stats"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="shipment",
+            index=models.Index(
+                fields=["created_at", "origin_zone", "dest_zone"],
+                include=["commodity", "shipment_type", "weight_kg", "declared_value", "total_amount"],
+                name="ship_created_route_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="shipment",
+            index=models.Index(
+                condition=models.Q(("status", "DELIVERED")),
+                fields=["delivered_at"], include=["driver", "weight_kg"],
+                name="ship_delivered_idx",
+            ),
+        ),
+    ]
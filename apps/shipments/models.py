@@ -16,6 +16,8 @@ class Zone(models.Model):
     base_rate_kg = models.DecimalField(max_digits=8, decimal_places=2,
                                        validators=[MinValueValidator(0)])
     is_border    = models.BooleanField(default=False)
+    center_lat   = models.FloatField(null=True, blank=True)   # used for GPS-progress ETAs
+    center_lng   = models.FloatField(null=True, blank=True)
 
     def __str__(self):
         return f"{self.name} ({self.province})"
@@ -82,6 +84,7 @@ class Shipment(models.Model):
     notes         = models.TextField(blank=True)
     created_at    = models.DateTimeField(auto_now_add=True)
     updated_at    = models.DateTimeField(auto_now=True)
+    assigned_at   = models.DateTimeField(null=True, blank=True)
     delivered_at  = models.DateTimeField(null=True, blank=True)
 
     # Offline: created offline and synced later
@@ -95,6 +98,19 @@ class Shipment(models.Model):
             models.Index(fields=["status"]),
             models.Index(fields=["sender", "status"]),
             models.Index(fields=["created_at"]),
+            # Range-bounded aggregation by corridor (cube rebuild --from/--to), index-only
+            models.Index(
+                fields=["created_at", "origin_zone", "dest_zone"],
+                include=["commodity", "shipment_type", "weight_kg", "declared_value", "total_amount"],
+                name="ship_created_route_idx",
+            ),
+            # Driver stats rebuild: deliveries in a date range
+            models.Index(
+                fields=["delivered_at"], include=["driver", "weight_kg"],
+                name="ship_delivered_idx", condition=models.Q(status="DELIVERED"),
+            ),
+            # Bulk export: keyset scan of changed rows from the last watermark
+            models.Index(fields=["updated_at", "id"], name="ship_updated_idx"),
         ]
 
     def __str__(self):
@@ -112,3 +128,36 @@ class ShipmentEvent(models.Model):
 
     class Meta:
         ordering = ["occurred_at"]
+        indexes  = [
+            # Audit log keyset pagination / export over (occurred_at, id)
+            models.Index(fields=["occurred_at", "id"], name="event_occurred_idx"),
+            models.Index(fields=["shipment", "occurred_at", "id"], name="event_ship_occurred_idx"),
+            models.Index(fields=["actor", "occurred_at", "id"], name="event_actor_occurred_idx"),
+            # Incremental ETA refresh: DELIVERED events past an (occurred_at, id) watermark
+            models.Index(fields=["to_status", "occurred_at", "id"], name="event_status_occurred_idx"),
+        ]
+
+
+class TransitStat(models.Model):
+    """
+    Historical ASSIGNED→DELIVERED transit time for one origin→destination
+    zone pair. `recent` keeps the latest ETA_MAX_SAMPLES durations (seconds)
+    so median/p90 can be refreshed incrementally; see apps.shipments.eta.
+    """
+    origin_zone   = models.ForeignKey(Zone, on_delete=models.CASCADE, related_name="+")
+    dest_zone     = models.ForeignKey(Zone, on_delete=models.CASCADE, related_name="+")
+    samples       = models.PositiveIntegerField(default=0)
+    recent        = models.JSONField(default=list)
+    median_s      = models.FloatField()
+    p90_s         = models.FloatField()
+    last_event_id = models.BigIntegerField(default=0)     # refresh watermark: (last_event_at, last_event_id)
+    last_event_at = models.DateTimeField(null=True, blank=True)
+    updated_at    = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["origin_zone", "dest_zone"], name="transit_stat_pair_uniq"),
+        ]
+
+    def __str__(self):
+        return f"{self.origin_zone_id}→{self.dest_zone_id}: median {self.median_s / 3600:.1f} h"
@@ -1,6 +1,7 @@
 """Shipment serializers."""
 
 from rest_framework import serializers
+from .eta import eta_engine
 from .models import Shipment, Zone, Commodity, ShipmentEvent
 
 
@@ -51,6 +52,7 @@ class ShipmentDetailSerializer(serializers.ModelSerializer):
     sender_name  = serializers.CharField(source="sender.full_name", read_only=True)
     driver_name  = serializers.CharField(source="driver.full_name",  read_only=True, default=None)
     driver_phone = serializers.CharField(source="driver.phone",       read_only=True, default=None)
+    eta          = serializers.SerializerMethodField()
 
     class Meta:
         model  = Shipment
@@ -61,9 +63,12 @@ class ShipmentDetailSerializer(serializers.ModelSerializer):
             "weight_kg", "declared_value", "destination_country",
             "calculated_tariff", "vat_amount", "total_amount",
             "ebm_receipt_number", "notes", "events",
-            "created_at", "delivered_at",
+            "created_at", "assigned_at", "delivered_at", "eta",
         ]
 
+    def get_eta(self, obj):
+        return eta_engine.for_shipment(obj)
+
 
 class TariffEstimateSerializer(serializers.Serializer):
     origin_zone   = serializers.PrimaryKeyRelatedField(queryset=Zone.objects.all())
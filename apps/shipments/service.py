@@ -18,7 +18,13 @@ from django.utils import timezone
 from apps.shipments.models import Shipment, ShipmentEvent, Zone
 from apps.payments.models import Payment
 from apps.notifications.service import NotificationService
+from apps.analytics.cube import record_booking, record_payment
+from apps.analytics.drivers import record_delivery
+from apps.analytics.sketches import record_driver, record_senders
+from apps.notifications.templates import render_email, render_sms
 from apps.govtech.connectors import RURAConnector
+from apps.govtech.resilience import ConnectorUnavailable
+from apps.tracking.events import notify_shipment_changed
 
 logger = logging.getLogger("ishemalink.booking")
 
@@ -119,6 +125,8 @@ class BookingService:
             to_status=Shipment.Status.CONFIRMED, actor=sender,
             note="Shipment created and tariff calculated",
         )
+        record_booking(shipment)
+        record_senders([shipment])
         logger.info("Shipment %s created for agent %s", tracking_code, sender.phone)
         return shipment
 
@@ -134,20 +142,20 @@ class BookingService:
 
         shipment.status = Shipment.Status.PAID
         shipment.save(update_fields=["status", "updated_at"])
+        notify_shipment_changed(shipment)
 
         ShipmentEvent.objects.create(
             shipment=shipment, from_status=Shipment.Status.CONFIRMED,
             to_status=Shipment.Status.PAID, actor=None,
             note=f"Payment {payment.gateway_ref} confirmed",
         )
+        record_payment(payment)
 
-        # Notify sender via SMS
-        self.notifier.send_sms(
+        # Notify sender via SMS (outbox — sent after commit)
+        self.notifier.enqueue_sms(
             phone=shipment.sender.phone,
-            message=(
-                f"IshemaLink: Payment received for {shipment.tracking_code}. "
-                f"Amount: {payment.amount} RWF. Assigning your driver now."
-            ),
+            message=render_sms("payment_received", code=shipment.tracking_code, amount=payment.amount),
+            reference=shipment.tracking_code,
         )
 
         # Assign driver (may raise if none available)
@@ -155,10 +163,13 @@ class BookingService:
 
     # ── Step 3: assign driver ─────────────────────────────────────────────────
     @transaction.atomic
-    def assign_driver(self, shipment: Shipment) -> Shipment:
+    def assign_driver(self, shipment: Shipment, defer_on_outage: bool = True) -> Shipment:
         """
         Find nearest available RURA-verified driver and lock with SELECT FOR UPDATE.
         Prevents the race condition where two shipments grab the same driver.
+        During a RURA outage the assignment is handed to retry_driver_assignment
+        once, after commit; that task passes defer_on_outage=False so ConnectorUnavailable
+        reaches its capped self.retry().
         """
         from apps.authentication.models import DriverProfile, Agent
 
@@ -186,7 +197,21 @@ class BookingService:
             return shipment
 
         # Validate RURA license before assigning
-        rura_ok = self.rura.verify_license(driver_profile.license_number)
+        try:
+            rura_ok = self.rura.verify_license(driver_profile.license_number)
+        except ConnectorUnavailable:
+            # RURA outage is not the driver's fault — keep them verified and retry later
+            if not defer_on_outage:
+                raise
+            logger.warning("RURA unavailable — deferring assignment for %s", shipment.tracking_code)
+            from apps.shipments.tasks import retry_driver_assignment
+            # Only once the payment commits: a rolled-back confirmation must not
+            # leave a retry behind. Robust, so failing to queue it can't turn an
+            # already-committed payment webhook into a 500
+            transaction.on_commit(lambda: retry_driver_assignment.apply_async(
+                args=[str(shipment.id)], countdown=60
+            ), robust=True)
+            return shipment
         if not rura_ok:
             logger.warning(
                 "Driver %s failed RURA check — skipping",
@@ -194,14 +219,17 @@ class BookingService:
             )
             driver_profile.rura_verified = False
             driver_profile.save(update_fields=["rura_verified"])
-            return self.assign_driver(shipment)  # try next
+            return self.assign_driver(shipment, defer_on_outage)  # try next
 
         driver_profile.is_available = False
         driver_profile.save(update_fields=["is_available"])
 
-        shipment.driver = driver_profile.agent
-        shipment.status = Shipment.Status.ASSIGNED
-        shipment.save(update_fields=["driver", "status", "updated_at"])
+        shipment.driver      = driver_profile.agent
+        shipment.status      = Shipment.Status.ASSIGNED
+        shipment.assigned_at = timezone.now()
+        shipment.save(update_fields=["driver", "status", "assigned_at", "updated_at"])
+        notify_shipment_changed(shipment)
+        record_driver(shipment)
 
         ShipmentEvent.objects.create(
             shipment=shipment, from_status=Shipment.Status.PAID,
@@ -210,25 +238,24 @@ class BookingService:
             note=f"Driver {driver_profile.agent.full_name} assigned",
         )
 
-        # Notify both parties
-        self.notifier.send_sms(
+        # Notify both parties (outbox — sent after commit)
+        self.notifier.enqueue_sms(
             phone=shipment.sender.phone,
-            message=(
-                f"IshemaLink: Driver {driver_profile.agent.full_name} "
-                f"({driver_profile.vehicle_plate}) is on the way. "
-                f"Track: {shipment.tracking_code}"
+            message=render_sms(
+                "driver_assigned", driver=driver_profile.agent.full_name,
+                plate=driver_profile.vehicle_plate, code=shipment.tracking_code,
             ),
+            reference=shipment.tracking_code,
         )
         if shipment.shipment_type == Shipment.Type.INTERNATIONAL:
-            self.notifier.send_email(
+            subject, body = render_email(
+                "customs_documents", code=shipment.tracking_code, driver=driver_profile.agent.full_name,
+            )
+            self.notifier.enqueue_email(
                 email=shipment.sender.phone,   # in real system: exporter email
-                subject="Customs Documentation Required",
-                body=(
-                    f"Dear Exporter,\n\n"
-                    f"Your shipment {shipment.tracking_code} has been assigned to "
-                    f"{driver_profile.agent.full_name}. Please ensure customs documents "
-                    f"are ready for border crossing.\n\nIshemaLink Team"
-                ),
+                subject=subject,
+                body=body,
+                reference=shipment.tracking_code,
             )
 
         logger.info(
@@ -237,6 +264,54 @@ class BookingService:
         )
         return shipment
 
+    # ── Step 4: GPS-driven transitions (geofence engine) ────────────────────
+    GPS_TRANSITIONS = {
+        Shipment.Status.IN_TRANSIT: (Shipment.Status.ASSIGNED, Shipment.Status.AT_BORDER),
+        Shipment.Status.AT_BORDER:  (Shipment.Status.ASSIGNED, Shipment.Status.IN_TRANSIT),
+        Shipment.Status.DELIVERED:  (Shipment.Status.ASSIGNED, Shipment.Status.IN_TRANSIT,
+                                     Shipment.Status.AT_BORDER),
+    }
+
+    @transaction.atomic
+    def record_transition(self, tracking_code: str, to_status: str, note: str = "") -> bool:
+        """
+        Apply a transition detected from GPS. The shipment is re-read under a
+        row lock, so stale or duplicate detections are ignored. Returns True
+        if the status changed. Delivery releases the driver.
+        """
+        from apps.authentication.models import DriverProfile
+
+        shipment = Shipment.objects.select_for_update().filter(tracking_code=tracking_code).first()
+        if shipment is None or shipment.status not in self.GPS_TRANSITIONS.get(to_status, ()):
+            return False
+        if to_status == Shipment.Status.AT_BORDER and shipment.shipment_type != Shipment.Type.INTERNATIONAL:
+            return False
+
+        from_status     = shipment.status
+        shipment.status = to_status
+        fields          = ["status", "updated_at"]
+        if to_status == Shipment.Status.DELIVERED:
+            shipment.delivered_at = timezone.now()
+            fields.append("delivered_at")
+            DriverProfile.objects.filter(agent_id=shipment.driver_id).update(is_available=True)
+        shipment.save(update_fields=fields)
+        notify_shipment_changed(shipment)
+
+        ShipmentEvent.objects.create(
+            shipment=shipment, from_status=from_status, to_status=to_status,
+            actor=shipment.driver, note=note[:255],
+        )
+
+        if to_status == Shipment.Status.DELIVERED:
+            record_delivery(shipment)
+            self.notifier.enqueue_sms(
+                phone=shipment.sender.phone,
+                message=render_sms("delivered", code=shipment.tracking_code),
+                reference=shipment.tracking_code,
+            )
+        logger.info("Shipment %s %s → %s (%s)", tracking_code, from_status, to_status, note)
+        return True
+
     # ── Rollback on payment failure ────────────────────────────────────────────
     @transaction.atomic
     def handle_payment_failure(self, shipment: Shipment, reason: str) -> Shipment:
@@ -244,6 +319,7 @@ class BookingService:
         shipment.status = Shipment.Status.FAILED
         shipment.notes  = f"Payment failed: {reason}"
         shipment.save(update_fields=["status", "notes", "updated_at"])
+        notify_shipment_changed(shipment)
 
         ShipmentEvent.objects.create(
             shipment=shipment, from_status=Shipment.Status.CONFIRMED,
@@ -251,11 +327,9 @@ class BookingService:
             note=f"Payment failure: {reason}",
         )
 
-        self.notifier.send_sms(
+        self.notifier.enqueue_sms(
             phone=shipment.sender.phone,
-            message=(
-                f"IshemaLink: Payment failed for {shipment.tracking_code}. "
-                f"Reason: {reason}. Please retry."
-            ),
+            message=render_sms("payment_failed", code=shipment.tracking_code, reason=reason),
+            reference=shipment.tracking_code,
         )
         return shipment
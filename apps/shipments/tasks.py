@@ -8,7 +8,8 @@ logger = logging.getLogger("ishemalink.tasks")
 
 @shared_task(bind=True, max_retries=5, default_retry_delay=300)
 def retry_driver_assignment(self, shipment_id: str):
-    """Retry driver assignment when no drivers were available."""
+    """Retry driver assignment when no drivers were available or RURA was down."""
+    from apps.govtech.resilience import ConnectorUnavailable
     from apps.shipments.models import Shipment
     from apps.shipments.service import BookingService
 
@@ -16,15 +17,25 @@ def retry_driver_assignment(self, shipment_id: str):
         shipment = Shipment.objects.get(id=shipment_id)
         if shipment.status == Shipment.Status.PAID:
             service = BookingService()
-            service.assign_driver(shipment)
+            service.assign_driver(shipment, defer_on_outage=False)
             logger.info("Driver assigned on retry for %s", shipment.tracking_code)
     except Shipment.DoesNotExist:
         logger.error("Shipment %s not found for driver retry", shipment_id)
+    except ConnectorUnavailable as exc:
+        logger.warning("RURA still unavailable for %s: %s", shipment_id, exc)
+        raise self.retry(exc=exc, countdown=60)
     except Exception as exc:
         logger.warning("Driver assignment retry failed: %s", exc)
         raise self.retry(exc=exc)
 
 
+@shared_task
+def refresh_eta_matrix():
+    """Beat task: fold newly delivered shipments into the zone×zone ETA matrix."""
+    from apps.shipments.eta import refresh_transit_stats
+    return refresh_transit_stats()
+
+
 @shared_task
 def auto_fail_unpaid_shipments():
     """
@@ -34,6 +45,7 @@ def auto_fail_unpaid_shipments():
     from datetime import timedelta
     from django.utils import timezone
     from apps.shipments.models import Shipment, ShipmentEvent
+    from apps.tracking.events import notify_shipment_changed
 
     cutoff = timezone.now() - timedelta(minutes=30)
     stale = Shipment.objects.filter(
@@ -43,7 +55,8 @@ def auto_fail_unpaid_shipments():
     for s in stale:
         s.status = Shipment.Status.FAILED
         s.notes  = "Auto-cancelled: payment timeout"
-        s.save(update_fields=["status", "notes"])
+        s.save(update_fields=["status", "notes", "updated_at"])
+        notify_shipment_changed(s)
         ShipmentEvent.objects.create(
             shipment=s, from_status=Shipment.Status.CONFIRMED,
             to_status=Shipment.Status.FAILED,
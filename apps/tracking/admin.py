@@ -1 +1,17 @@
 from django.contrib import admin
+from .models import Geofence, TrajectoryChunk
+
+
+@admin.register(TrajectoryChunk)
+class TrajectoryChunkAdmin(admin.ModelAdmin):
+    list_display    = ("shipment", "started_at", "ended_at", "point_count")
+    search_fields   = ("shipment__tracking_code",)
+    readonly_fields = ("shipment", "started_at", "ended_at", "point_count")
+    exclude         = ("data",)
+
+
+@admin.register(Geofence)
+class GeofenceAdmin(admin.ModelAdmin):
+    list_display  = ("name", "kind", "zone", "is_active")
+    list_filter   = ("kind", "is_active")
+    search_fields = ("name", "zone__name")
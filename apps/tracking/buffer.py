@@ -0,0 +1,187 @@
+"""
+Write-behind buffer for driver GPS fixes.
+
+The WebSocket path only records the latest fix per shipment in a Redis hash
+(HSET overwrites, so the buffer never holds more than one entry per truck)
+and never waits on PostgreSQL: fixes are persisted to DriverProfile in one
+bulk UPDATE per run of the flush_gps_buffer beat task (every 5 s); rows
+already holding a newer position are left alone. Without Redis the buffer
+is an in-process dict.
+
+Each push also updates the hot tracking entry (hotcache.py) in the same
+Redis round trip. Every fix is also appended to a trail list; the
+flush_gps_trails beat task (every 5 min) turns each shipment's accumulated
+fixes into one delta-encoded TrajectoryChunk (one bulk INSERT for all
+trucks). A failed INSERT puts the drained fixes back for the next run.
+"""
+
+import json
+import logging
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.db.models import Case, DateTimeField, F, FloatField, Q, Value, When
+
+from ishemalink.redis_client import get_redis
+
+from . import hotcache
+
+logger = logging.getLogger("ishemalink.tracking")
+
+PENDING_KEY = "gps:pending"
+TRAIL_KEY   = "gps:trail"
+
+
+class LocationBuffer:
+
+    def __init__(self):
+        self._local = {}
+        self._trail = []
+        self._lock  = threading.Lock()
+
+    # ── Write path ────────────────────────────────────────────────────────────
+    def push(self, tracking_code: str, lat: float, lng: float, ts: float = None):
+        self.push_many([tracking_code], [(ts or time.time(), lat, lng)])
+
+    def push_many(self, tracking_codes, fixes):
+        """
+        Buffer a batch of (ts, lat, lng) fixes for every shipment on one truck
+        in a single round trip. Only the newest fix becomes the pending/live one.
+        """
+        fixes  = [(float(lat), float(lng), float(ts)) for ts, lat, lng in fixes]
+        latest = max(fixes, key=lambda fix: fix[2])
+        redis  = get_redis()
+        if redis is not None:
+            pipe = redis.pipeline(transaction=False)
+            for code in tracking_codes:
+                pipe.hset(PENDING_KEY, code, json.dumps(latest))
+                pipe.rpush(TRAIL_KEY, *(json.dumps([code, *fix]) for fix in fixes))
+                hotcache.record_fix(code, *latest, pipe=pipe)
+            pipe.execute()
+        else:
+            with self._lock:
+                for code in tracking_codes:
+                    self._local[code] = latest
+                    self._trail.extend((code, *fix) for fix in fixes)
+            for code in tracking_codes:
+                hotcache.record_fix(code, *latest)
+
+    # ── Flush ─────────────────────────────────────────────────────────────────
+    def drain(self) -> dict:
+        """Atomically take every pending fix: {tracking_code: (lat, lng, ts)}."""
+        redis = get_redis()
+        if redis is not None:
+            pipe = redis.pipeline(transaction=True)
+            pipe.hgetall(PENDING_KEY)
+            pipe.delete(PENDING_KEY)
+            raw, _ = pipe.execute()
+            return {
+                (k.decode() if isinstance(k, bytes) else k): tuple(json.loads(v))
+                for k, v in raw.items()
+            }
+        with self._lock:
+            pending, self._local = self._local, {}
+        return pending
+
+    def drain_trail(self) -> list:
+        """Atomically take every buffered fix: [(tracking_code, lat, lng, ts), ...]."""
+        redis = get_redis()
+        if redis is not None:
+            pipe = redis.pipeline(transaction=True)
+            pipe.lrange(TRAIL_KEY, 0, -1)
+            pipe.delete(TRAIL_KEY)
+            raw, _ = pipe.execute()
+            return [tuple(json.loads(item)) for item in raw]
+        with self._lock:
+            trail, self._trail = self._trail, []
+        return trail
+
+    def restore_trail(self, trail: list):
+        """Put drained fixes back at the head of the trail, ahead of anything pushed since."""
+        redis = get_redis()
+        if redis is not None:
+            redis.lpush(TRAIL_KEY, *(json.dumps(list(item)) for item in reversed(trail)))
+            return
+        with self._lock:
+            self._trail[:0] = trail
+
+    def flush(self) -> int:
+        """Persist pending fixes with a single lookup and a single guarded bulk UPDATE."""
+        from apps.authentication.models import DriverProfile
+        from apps.shipments.models import Shipment
+
+        pending = self.drain()
+        if not pending:
+            return 0
+
+        rows = (
+            Shipment.objects
+            .filter(tracking_code__in=pending.keys(), driver__driver_profile__isnull=False)
+            .values_list("tracking_code", "driver__driver_profile__id")
+        )
+        latest = {}
+        for code, profile_id in rows:
+            fix = pending[code]
+            if profile_id not in latest or fix[2] > latest[profile_id][2]:
+                latest[profile_id] = fix
+        if not latest:
+            return 0
+
+        # Same "only if newer" guard as the offline upload path: a buffered
+        # socket fix must never move a driver behind an already-stored position.
+        newer, lats, lngs, seen = Q(), [], [], []
+        for profile_id, (lat, lng, ts) in latest.items():
+            seen_at = datetime.fromtimestamp(ts, tz=dt_timezone.utc)
+            guard   = Q(id=profile_id) & (Q(last_seen__isnull=True) | Q(last_seen__lt=seen_at))
+            newer  |= guard
+            lats.append(When(guard, then=Value(lat)))
+            lngs.append(When(guard, then=Value(lng)))
+            seen.append(When(guard, then=Value(seen_at)))
+        moved = DriverProfile.objects.filter(newer).update(
+            current_lat = Case(*lats, default=F("current_lat"), output_field=FloatField()),
+            current_lng = Case(*lngs, default=F("current_lng"), output_field=FloatField()),
+            last_seen   = Case(*seen, default=F("last_seen"), output_field=DateTimeField()),
+        )
+        logger.debug("GPS buffer flushed %d fixes to %d drivers", len(pending), moved)
+        return moved
+
+    def flush_trails(self) -> int:
+        """Append one TrajectoryChunk per shipment with buffered fixes. Returns chunks written."""
+        from apps.shipments.models import Shipment
+        from apps.tracking.models import TrajectoryChunk
+        from apps.tracking.trajectory import encode
+
+        trail = self.drain_trail()
+        if not trail:
+            return 0
+
+        by_code = {}
+        for code, lat, lng, ts in trail:
+            by_code.setdefault(code, []).append((ts, lat, lng))
+        try:
+            ids = dict(
+                Shipment.objects.filter(tracking_code__in=by_code.keys()).values_list("tracking_code", "id")
+            )
+            chunks = []
+            for code, points in by_code.items():
+                if code not in ids:
+                    continue
+                points.sort()
+                chunks.append(TrajectoryChunk(
+                    shipment_id = ids[code],
+                    started_at  = datetime.fromtimestamp(points[0][0], tz=dt_timezone.utc),
+                    ended_at    = datetime.fromtimestamp(points[-1][0], tz=dt_timezone.utc),
+                    point_count = len(points),
+                    data        = encode(points),
+                ))
+            TrajectoryChunk.objects.bulk_create(chunks)
+        except Exception:
+            # The whole fleet's trail since the last run is in hand — don't drop it
+            self.restore_trail(trail)
+            raise
+        logger.debug("GPS trail flushed %d fixes into %d chunks", len(trail), len(chunks))
+        return len(chunks)
+
+
+location_buffer = LocationBuffer()
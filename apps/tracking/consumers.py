@@ -2,66 +2,357 @@
 Real-time tracking.
 WebSocket consumer (Django Channels) publishes driver GPS coordinates.
 Drivers push location via POST; subscribers receive via WS.
+GPS fixes are fanned out first and persisted write-behind (see buffer.py).
+
+The shipment, its assigned driver and the connected user are resolved once
+at connect; reassignments arrive as `shipment_changed` group events, so
+handling a GPS message never touches the database.
+
+Fan-out is coalesced (see fanout.py): a driver's fixes are published to
+the per-driver group at most GPS_FANOUT_RATE times per second, once for
+all of the driver's active shipments, and each subscriber can ask for a
+lower rate with ?rate= or {"type": "subscribe", "rate": n}.
+
+Every driver fix is also run through the geofence engine (geofence.py);
+only an actual fence crossing reaches the database.
+
+Driver apps may negotiate the `ishemalink.gps.v1` subprotocol and send
+batches of fixes as binary frames (protocol.py); JSON text frames keep
+working for everyone else.
+
+FleetConsumer (ws/fleet/) is the Control Tower map: an admin sends a
+viewport bbox and receives batched upsert/remove diffs for every truck
+inside it, fed by per-geohash-tile groups (see fleet.py).
 """
 
+import asyncio
 import json
 import logging
+import time
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
 from channels.generic.websocket import AsyncJsonWebsocketConsumer
 from channels.db import database_sync_to_async
+from django.conf import settings
+
+from .buffer import location_buffer
+from .events import group_name, driver_group_name
+from .fanout import LatestWins
+from .fleet import record_position, snapshot, tile_group_name, tile_of
+from .geofence import apply_transitions, geofence_engine
+from .protocol import SUBPROTOCOL, FrameError, decode_frame, valid_fixes
+from .geo import tiles_for_bbox
 
 logger = logging.getLogger("ishemalink.tracking")
 
+ACTIVE_STATUSES = ("ASSIGNED", "IN_TRANSIT", "AT_BORDER")
+
+
+def scope_user_id(scope):
+    """Session user (AuthMiddlewareStack) or a JWT access token in ?token=."""
+    user = scope.get("user")
+    if user is not None and user.is_authenticated:
+        return str(user.pk)
+
+    token = parse_qs(scope.get("query_string", b"").decode()).get("token")
+    if not token:
+        return None
+    from rest_framework_simplejwt.exceptions import TokenError
+    from rest_framework_simplejwt.settings import api_settings
+    from rest_framework_simplejwt.tokens import AccessToken
+    try:
+        return str(AccessToken(token[0])[api_settings.USER_ID_CLAIM])
+    except (TokenError, KeyError):
+        return None
+
+
+def load_driver_codes(driver_id, code):
+    """Every active shipment on the driver's truck — one fix moves all of them."""
+    from apps.shipments.models import Shipment
+    codes = set(
+        Shipment.objects.filter(driver_id=driver_id, status__in=ACTIVE_STATUSES)
+        .values_list("tracking_code", flat=True)
+    )
+    codes.add(code)
+    return sorted(codes)
+
 
 class TrackingConsumer(AsyncJsonWebsocketConsumer):
     """WebSocket — subscribe to live tracking for a given tracking_code."""
 
     async def connect(self):
         self.tracking_code = self.scope["url_route"]["kwargs"]["tracking_code"]
-        self.group_name    = f"tracking_{self.tracking_code}"
+        self.group_name    = group_name(self.tracking_code)
 
-        # Validate shipment exists
-        exists = await self._shipment_exists(self.tracking_code)
-        if not exists:
+        # Resolve shipment, driver and caller once for the connection
+        context = await self._resolve(self.tracking_code)
+        if context is None:
             await self.close(code=4004)
             return
+        self.shipment_id, self.driver_id, self.user_id, self.driver_codes = context
+
+        self.publisher  = LatestWins(settings.GPS_FANOUT_RATE, self._publish)
+        self.subscriber = LatestWins(self._requested_rate(), self.send_json)
+        self.tile       = None
+        self.binary     = SUBPROTOCOL in self.scope.get("subprotocols", ())
 
         await self.channel_layer.group_add(self.group_name, self.channel_name)
-        await self.accept()
+        if self.driver_id:
+            await self.channel_layer.group_add(driver_group_name(self.driver_id), self.channel_name)
+        await self.accept(subprotocol=SUBPROTOCOL if self.binary else None)
         logger.info("WS connected for %s", self.tracking_code)
 
     async def disconnect(self, code):
+        for throttle in (getattr(self, "publisher", None), getattr(self, "subscriber", None)):
+            if throttle is not None:
+                throttle.cancel()
         await self.channel_layer.group_discard(self.group_name, self.channel_name)
+        if getattr(self, "driver_id", None):
+            await self.channel_layer.group_discard(driver_group_name(self.driver_id), self.channel_name)
+
+    @property
+    def is_assigned_driver(self) -> bool:
+        return self.user_id is not None and self.user_id == self.driver_id
+
+    def _requested_rate(self, rate=None) -> float:
+        """Subscriber rate in updates/s, capped at the publish rate (0 = publish rate)."""
+        if rate is None:
+            rate = parse_qs(self.scope.get("query_string", b"").decode()).get("rate", [0])[0]
+        try:
+            rate = float(rate)
+        except (TypeError, ValueError):
+            rate = 0.0
+        return min(rate, settings.GPS_FANOUT_RATE) if rate > 0 else 0.0
+
+    async def receive(self, text_data=None, bytes_data=None, **kwargs):
+        if bytes_data is None:
+            await super().receive(text_data=text_data, bytes_data=bytes_data, **kwargs)
+            return
+        if not self.binary:
+            await self.send_json({"type": "error", "error": f"Binary frames need the {SUBPROTOCOL} subprotocol."})
+            return
+        try:
+            fixes = decode_frame(bytes_data)
+        except FrameError as exc:
+            await self.send_json({"type": "error", "error": str(exc)})
+            return
+        await self._ingest(fixes)
 
     async def receive_json(self, content):
+        if content.get("type") == "subscribe":
+            self.subscriber.rate = self._requested_rate(content.get("rate"))
+            return
+
         # Drivers push their GPS here
         lat = content.get("lat")
         lng = content.get("lng")
-        if lat is not None and lng is not None:
-            await self._update_driver_location(self.tracking_code, lat, lng)
+        if lat is None or lng is None:
+            return
+        try:
+            fix = (time.time(), float(lat), float(lng))
+        except (TypeError, ValueError):
+            await self.send_json({"type": "error", "error": "lat and lng must be numbers."})
+            return
+        await self._ingest([fix])
+
+    async def _ingest(self, fixes):
+        """Fan out the newest of a batch of (ts, lat, lng) fixes and buffer all of them."""
+        if not self.is_assigned_driver:
+            await self.send_json({"type": "error", "error": "Only the assigned driver can push locations."})
+            return
+
+        valid = valid_fixes(fixes)
+        if len(valid) < len(fixes):
+            await self.send_json({"type": "error", "error": f"Dropped {len(fixes) - len(valid)} invalid fix(es)."})
+        if not valid:
+            return
+        fixes = valid
+
+        _, lat, lng = max(fixes)
+        await self.publisher.offer((lat, lng))
+        await self._check_geofences(fixes)
+        await sync_to_async(location_buffer.push_many, thread_sensitive=False)(self.driver_codes, fixes)
+
+    async def _check_geofences(self, fixes):
+        # Edge state is a Redis round trip (or the engine's lock), so it never runs on the loop
+        codes = self.driver_codes
+        if geofence_engine.ready(codes):
+            transitions = await sync_to_async(geofence_engine.evaluate_fixes, thread_sensitive=False)(codes, fixes)
+        else:
+            transitions = await database_sync_to_async(geofence_engine.evaluate_fixes)(codes, fixes)
+        if transitions:
+            await database_sync_to_async(apply_transitions)(transitions)
+
+    async def _publish(self, fix):
+        lat, lng = fix
+        await self.channel_layer.group_send(
+            driver_group_name(self.driver_id),
+            {"type": "location_update", "lat": lat, "lng": lng, "tracking_codes": self.driver_codes},
+        )
+
+        # Fleet map: the truck's tile, plus the tile it just left
+        tile  = tile_of(lat, lng)
+        truck = {
+            "driver_id": self.driver_id, "lat": lat, "lng": lng,
+            "tracking_codes": self.driver_codes, "tile": tile, "ts": time.time(),
+        }
+        await sync_to_async(record_position, thread_sensitive=False)(self.driver_id, tile, truck, self.tile)
+        await self.channel_layer.group_send(tile_group_name(tile), {"type": "fleet_update", "truck": truck})
+        if self.tile and self.tile != tile:
             await self.channel_layer.group_send(
-                self.group_name,
-                {"type": "location_update", "lat": lat, "lng": lng, "tracking_code": self.tracking_code},
+                tile_group_name(self.tile), {"type": "fleet_leave", "driver_id": self.driver_id, "tile": tile},
             )
+        self.tile = tile
 
     async def location_update(self, event):
-        await self.send_json(event)
+        if self.tracking_code not in event["tracking_codes"]:
+            return
+        await self.subscriber.offer({
+            "type":          "location_update",
+            "lat":           event["lat"],
+            "lng":           event["lng"],
+            "tracking_code": self.tracking_code,
+        })
+
+    async def shipment_changed(self, event):
+        if event["driver_id"] != self.driver_id:
+            if self.driver_id:
+                await self.channel_layer.group_discard(driver_group_name(self.driver_id), self.channel_name)
+            if event["driver_id"]:
+                await self.channel_layer.group_add(driver_group_name(event["driver_id"]), self.channel_name)
+            self.driver_id = event["driver_id"]
+        if self.is_assigned_driver:
+            self.driver_codes = await self._driver_codes(self.driver_id, self.tracking_code)
+        await self.send_json({
+            "type":          "shipment_update",
+            "tracking_code": event["tracking_code"],
+            "status":        event["status"],
+        })
 
     @database_sync_to_async
-    def _shipment_exists(self, code):
+    def _resolve(self, code):
+        """
+        (shipment_id, driver_id, user_id, driver_codes) or None if the shipment
+        doesn't exist. driver_codes is only populated for the assigned driver.
+        """
         from apps.shipments.models import Shipment
-        return Shipment.objects.filter(tracking_code=code).exists()
+        row = Shipment.objects.filter(tracking_code=code).values_list("id", "driver_id").first()
+        if row is None:
+            return None
+        shipment_id, driver_id = row
+        driver_id = str(driver_id) if driver_id else None
+        user_id   = scope_user_id(self.scope)
+        codes     = load_driver_codes(driver_id, code) if user_id and user_id == driver_id else []
+        return str(shipment_id), driver_id, user_id, codes
 
     @database_sync_to_async
-    def _update_driver_location(self, code, lat, lng):
-        from django.utils import timezone
-        from apps.shipments.models import Shipment
+    def _driver_codes(self, driver_id, code):
+        return load_driver_codes(driver_id, code)
+
+
+class FleetConsumer(AsyncJsonWebsocketConsumer):
+    """
+    WebSocket — national fleet map for admins.
+    Client sends {"type": "viewport", "bbox": [south, west, north, east]};
+    server replies with a diff for the new viewport, then pushes batched
+    {"type": "diff", "upsert": [...], "remove": [...]} at FLEET_PUSH_RATE.
+    A truck silent for FLEET_STALE_AFTER is removed, as snapshot() would.
+    """
+
+    async def connect(self):
+        if not await self._is_admin(scope_user_id(self.scope)):
+            await self.close(code=4003)
+            return
+        self.tiles   = set()
+        self.visible = {}          # driver_id → (tile, ts of its latest position)
+        self.upserts = {}
+        self.removes = set()
+        self.pusher  = LatestWins(settings.FLEET_PUSH_RATE, self._push_diff)
+        self.sweeper = asyncio.get_running_loop().create_task(self._sweep_stale())
+        await self.accept()
+
+    async def disconnect(self, code):
+        if hasattr(self, "pusher"):
+            self.pusher.cancel()
+            self.sweeper.cancel()
+        for tile in getattr(self, "tiles", ()):
+            await self.channel_layer.group_discard(tile_group_name(tile), self.channel_name)
+
+    async def receive_json(self, content):
+        if content.get("type") != "viewport":
+            return
         try:
-            shipment = Shipment.objects.select_related("driver__driver_profile").get(tracking_code=code)
-            if shipment.driver and hasattr(shipment.driver, "driver_profile"):
-                dp = shipment.driver.driver_profile
-                dp.current_lat = lat
-                dp.current_lng = lng
-                dp.last_seen   = timezone.now()
-                dp.save(update_fields=["current_lat", "current_lng", "last_seen"])
-        except Shipment.DoesNotExist:
-            pass
+            tiles = tiles_for_bbox(
+                *(float(v) for v in content["bbox"]),
+                precision=settings.FLEET_TILE_PRECISION, max_tiles=settings.FLEET_MAX_TILES,
+            )
+        except (KeyError, TypeError, ValueError) as exc:
+            await self.send_json({"type": "error", "error": str(exc)})
+            return
+
+        added, dropped = tiles - self.tiles, self.tiles - tiles
+        for tile in dropped:
+            await self.channel_layer.group_discard(tile_group_name(tile), self.channel_name)
+        for tile in added:
+            await self.channel_layer.group_add(tile_group_name(tile), self.channel_name)
+        self.tiles = tiles
+
+        gone = [driver_id for driver_id, (tile, _) in self.visible.items() if tile not in tiles]
+        for driver_id in gone:
+            del self.visible[driver_id]
+            self.upserts.pop(driver_id, None)
+        trucks = await sync_to_async(snapshot, thread_sensitive=False)(added) if added else {}
+        for driver_id, truck in trucks.items():
+            self.visible[driver_id] = (truck["tile"], truck["ts"])
+        await self.send_json({
+            "type": "diff", "tiles": len(tiles),
+            "upsert": list(trucks.values()), "remove": gone,
+        })
+
+    async def fleet_update(self, event):
+        truck = event["truck"]
+        if truck["tile"] not in self.tiles:
+            return
+        self.visible[truck["driver_id"]] = (truck["tile"], truck["ts"])
+        self.removes.discard(truck["driver_id"])
+        self.upserts[truck["driver_id"]] = truck
+        await self.pusher.offer(None)
+
+    async def fleet_leave(self, event):
+        # Still visible if the truck moved into another tile of this viewport
+        if event["tile"] in self.tiles or event["driver_id"] not in self.visible:
+            return
+        del self.visible[event["driver_id"]]
+        self.upserts.pop(event["driver_id"], None)
+        self.removes.add(event["driver_id"])
+        await self.pusher.offer(None)
+
+    async def _sweep_stale(self):
+        # Checked every tenth of the stale age, so a silent truck leaves at most 10% late
+        while True:
+            await asyncio.sleep(settings.FLEET_STALE_AFTER / 10)
+            await self._expire_stale()
+
+    async def _expire_stale(self):
+        cutoff = time.time() - settings.FLEET_STALE_AFTER
+        stale  = [driver_id for driver_id, (_, ts) in self.visible.items() if ts < cutoff]
+        if not stale:
+            return
+        for driver_id in stale:
+            del self.visible[driver_id]
+            self.upserts.pop(driver_id, None)
+            self.removes.add(driver_id)
+        await self.pusher.offer(None)
+
+    async def _push_diff(self, _):
+        if not (self.upserts or self.removes):
+            return
+        upserts, self.upserts = self.upserts, {}
+        removes, self.removes = self.removes, set()
+        await self.send_json({"type": "diff", "upsert": list(upserts.values()), "remove": sorted(removes)})
+
+    @database_sync_to_async
+    def _is_admin(self, user_id):
+        from apps.authentication.models import Agent
+        return bool(user_id) and Agent.objects.filter(pk=user_id, role="ADMIN", is_active=True).exists()
@@ -0,0 +1,48 @@
+"""Server-side pushes to tracking WebSocket groups."""
+
+import logging
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+
+logger = logging.getLogger("ishemalink.tracking")
+
+
+def group_name(tracking_code: str) -> str:
+    return f"tracking_{tracking_code}"
+
+
+def driver_group_name(driver_id: str) -> str:
+    """Location updates are published once per driver, for all of their shipments."""
+    return f"tracking_driver_{driver_id}"
+
+
+def notify_shipment_changed(shipment):
+    """
+    Publish a shipment's new driver/status after commit: refresh the hot
+    tracking entry read by LiveTrackingView and tell open tracking sockets
+    to refresh their cached authorization context. Nothing is published
+    for a transition that was rolled back.
+    """
+    from .hotcache import record_summary, summary_for
+
+    summary = summary_for(shipment)
+    event   = {
+        "type":          "shipment_changed",
+        "tracking_code": shipment.tracking_code,
+        "driver_id":     str(shipment.driver_id) if shipment.driver_id else None,
+        "status":        shipment.status,
+    }
+
+    def send():
+        record_summary(shipment.tracking_code, **summary)
+        layer = get_channel_layer()
+        if layer is None:
+            return
+        try:
+            async_to_sync(layer.group_send)(group_name(shipment.tracking_code), event)
+        except Exception as exc:
+            logger.warning("Tracking push failed for %s: %s", shipment.tracking_code, exc)
+
+    transaction.on_commit(send)
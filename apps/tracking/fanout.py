@@ -0,0 +1,47 @@
+"""
+Rate-coalesced delivery for live location updates.
+
+LatestWins emits at most `rate` items per second. An item that arrives
+inside the interval replaces whatever is pending and goes out when the
+interval ends, so watchers always get the newest fix, just less often.
+The tracking consumer uses one on the driver side (channel-layer publishes)
+and one per subscriber (?rate= / subscribe message).
+"""
+
+import asyncio
+
+
+class LatestWins:
+
+    def __init__(self, rate: float, emit):
+        self.rate     = rate
+        self.emit     = emit
+        self._last    = None
+        self._pending = None
+        self._timer   = None
+
+    @property
+    def interval(self) -> float:
+        return 1.0 / self.rate if self.rate > 0 else 0.0
+
+    async def offer(self, item):
+        loop = asyncio.get_running_loop()
+        now  = loop.time()
+        if self._timer is None and (self._last is None or now - self._last >= self.interval):
+            self._last = now
+            await self.emit(item)
+            return
+        self._pending = item
+        if self._timer is None:
+            self._timer = loop.create_task(self._emit_later(self._last + self.interval - now))
+
+    async def _emit_later(self, delay: float):
+        await asyncio.sleep(max(delay, 0))
+        item, self._pending, self._timer = self._pending, None, None
+        self._last = asyncio.get_running_loop().time()
+        await self.emit(item)
+
+    def cancel(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = self._pending = None
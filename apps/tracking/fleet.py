@@ -0,0 +1,79 @@
+"""
+Live fleet positions grouped by geohash tile, for the Control Tower map.
+
+Each tile keeps a Redis hash `fleet:tile:{hash}` of driver_id → latest
+position, written on every coalesced publish (so at most GPS_FANOUT_RATE
+writes per truck per second). A FleetConsumer subscribing to a viewport
+gets its snapshot from these hashes and then follows the tile groups.
+Without Redis the tiles are dicts in the Django cache.
+"""
+
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from ishemalink.redis_client import get_redis
+
+from .geo import geohash
+
+TILE_TTL = 60 * 60
+
+
+def tile_key(tile: str) -> str:
+    return f"fleet:tile:{tile}"
+
+
+def tile_group_name(tile: str) -> str:
+    return f"fleet_tile_{tile}"
+
+
+def tile_of(lat: float, lng: float) -> str:
+    return geohash(lat, lng, settings.FLEET_TILE_PRECISION)
+
+
+def record_position(driver_id: str, tile: str, truck: dict, prev_tile: str = None):
+    """Store the truck under its tile, removing it from the tile it just left."""
+    redis = get_redis()
+    if redis is not None:
+        pipe = redis.pipeline(transaction=False)
+        if prev_tile and prev_tile != tile:
+            pipe.hdel(tile_key(prev_tile), driver_id)
+        pipe.hset(tile_key(tile), driver_id, json.dumps(truck))
+        pipe.expire(tile_key(tile), TILE_TTL)
+        pipe.execute()
+        return
+    if prev_tile and prev_tile != tile:
+        entries = cache.get(tile_key(prev_tile)) or {}
+        entries.pop(driver_id, None)
+        cache.set(tile_key(prev_tile), entries, TILE_TTL)
+    entries = cache.get(tile_key(tile)) or {}
+    entries[driver_id] = truck
+    cache.set(tile_key(tile), entries, TILE_TTL)
+
+
+def snapshot(tiles) -> dict:
+    """{driver_id: truck} for every fresh truck in the given tiles."""
+    tiles  = list(tiles)
+    cutoff = time.time() - settings.FLEET_STALE_AFTER
+    redis  = get_redis()
+    if redis is not None:
+        pipe = redis.pipeline(transaction=False)
+        for tile in tiles:
+            pipe.hgetall(tile_key(tile))
+        raw = pipe.execute()
+        per_tile = [
+            {(k.decode() if isinstance(k, bytes) else k): json.loads(v) for k, v in entries.items()}
+            for entries in raw
+        ]
+    else:
+        found    = cache.get_many([tile_key(t) for t in tiles])
+        per_tile = [found.get(tile_key(t), {}) for t in tiles]
+
+    trucks = {}
+    for entries in per_tile:
+        for driver_id, truck in entries.items():
+            if truck["ts"] >= cutoff:
+                trucks[driver_id] = truck
+    return trucks
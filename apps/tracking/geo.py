@@ -0,0 +1,56 @@
+"""Geohash helpers for spatial grouping of live trucks."""
+
+import math
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def geohash(lat: float, lng: float, precision: int) -> str:
+    lat_lo, lat_hi = -90.0, 90.0
+    lng_lo, lng_hi = -180.0, 180.0
+    chars, bits, value, even = [], 0, 0, True
+    while len(chars) < precision:
+        if even:
+            mid = (lng_lo + lng_hi) / 2
+            value = value * 2 + (lng >= mid)
+            lng_lo, lng_hi = (mid, lng_hi) if lng >= mid else (lng_lo, mid)
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            value = value * 2 + (lat >= mid)
+            lat_lo, lat_hi = (mid, lat_hi) if lat >= mid else (lat_lo, mid)
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_BASE32[value])
+            bits = value = 0
+    return "".join(chars)
+
+
+def cell_size(precision: int) -> tuple:
+    """(lat_degrees, lng_degrees) covered by one geohash cell."""
+    total    = precision * 5
+    lng_bits = (total + 1) // 2
+    lat_bits = total // 2
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lng_bits
+
+
+def tiles_for_bbox(south: float, west: float, north: float, east: float, precision: int,
+                   max_tiles: int = None) -> set:
+    """
+    Geohash cells intersecting a viewport. Raises ValueError for an inverted
+    box or when more than max_tiles cells would be needed.
+    """
+    if south > north or west > east:
+        raise ValueError("bbox must be [south, west, north, east].")
+    dlat, dlng = cell_size(precision)
+    rows = math.floor((north + 90) / dlat) - math.floor((south + 90) / dlat) + 1
+    cols = math.floor((east + 180) / dlng) - math.floor((west + 180) / dlng) + 1
+    if max_tiles is not None and rows * cols > max_tiles:
+        raise ValueError(f"Viewport spans {rows * cols} tiles (max {max_tiles}) — zoom in.")
+
+    lat0 = (math.floor((south + 90) / dlat) + 0.5) * dlat - 90
+    lng0 = (math.floor((west + 180) / dlng) + 0.5) * dlng - 180
+    return {
+        geohash(min(lat0 + r * dlat, 90.0), min(lng0 + c * dlng, 180.0), precision)
+        for r in range(rows) for c in range(cols)
+    }
@@ -0,0 +1,253 @@
+"""
+Geofencing — automatic IN_TRANSIT / AT_BORDER / DELIVERED transitions from GPS.
+
+Active Geofence polygons are loaded into a uniform lat/lng grid
+(GEOFENCE_CELL_DEG): each cell lists the fences whose bounding box touches
+it, so a fix is checked against a handful of candidates with a bbox test
+before the ray-casting point-in-polygon. The index and each shipment's
+origin/destination zones are held in process memory and reloaded every
+GEOFENCE_RELOAD_INTERVAL seconds, so evaluating a fix never queries the DB.
+
+Transitions are edge-triggered: the engine remembers which fences each
+shipment was last inside and only reacts when that set changes —
+    leaves its origin ZONE fence   → IN_TRANSIT
+    enters a BORDER_POST fence     → AT_BORDER   (international only)
+    leaves a BORDER_POST fence     → IN_TRANSIT
+    stays in its destination ZONE  → DELIVERED
+A shipment's first fix only records where it is: there is no earlier fix
+to have crossed from. Fixes no newer than the last one evaluated are
+skipped, so an offline batch uploaded after the socket moved on can't
+replay crossings out of order. DELIVERED needs GEOFENCE_DWELL_FIXES consecutive
+fixes or GEOFENCE_DWELL_SECONDS inside the destination after entering it,
+so one jittery fix near the depot doesn't close a shipment. The edge state
+lives in Redis (`geofence:state:{code}`), shared by every worker a
+driver's socket may land on; without Redis it is a dict behind the
+engine's lock. The rare edge is then applied by
+BookingService.record_transition, which re-checks the shipment's status
+under a row lock.
+"""
+
+import json
+import logging
+import math
+import threading
+import time
+from collections import namedtuple
+
+from django.conf import settings
+
+from ishemalink.redis_client import get_redis
+
+logger = logging.getLogger("ishemalink.tracking")
+
+Fence = namedtuple("Fence", "id name kind zone_id bbox polygon")
+
+STATE_TTL = 24 * 60 * 60
+
+
+def state_key(code: str) -> str:
+    return f"geofence:state:{code}"
+
+
+def point_in_polygon(lat: float, lng: float, polygon) -> bool:
+    """Ray casting over a [[lat, lng], ...] ring."""
+    inside = False
+    j = len(polygon) - 1
+    for i in range(len(polygon)):
+        lat_i, lng_i = polygon[i]
+        lat_j, lng_j = polygon[j]
+        if (lat_i > lat) != (lat_j > lat):
+            cross = lng_i + (lat - lat_i) * (lng_j - lng_i) / (lat_j - lat_i)
+            if lng < cross:
+                inside = not inside
+        j = i
+    return inside
+
+
+class GridIndex:
+    """Fences bucketed by the grid cells their bounding boxes cover."""
+
+    def __init__(self, fences, cell_deg: float):
+        self.cell_deg = cell_deg
+        self.fences   = {}
+        self._cells   = {}
+        for fence in fences:
+            self.fences[fence.id] = fence
+            south, west, north, east = fence.bbox
+            for row in range(self._cell(south), self._cell(north) + 1):
+                for col in range(self._cell(west), self._cell(east) + 1):
+                    self._cells.setdefault((row, col), []).append(fence)
+
+    def _cell(self, degrees: float) -> int:
+        return math.floor(degrees / self.cell_deg)
+
+    def locate(self, lat: float, lng: float) -> list:
+        """Fences containing the point."""
+        return [
+            fence for fence in self._cells.get((self._cell(lat), self._cell(lng)), ())
+            if fence.bbox[0] <= lat <= fence.bbox[2] and fence.bbox[1] <= lng <= fence.bbox[3]
+            and point_in_polygon(lat, lng, fence.polygon)
+        ]
+
+
+def build_fence(fence_id, name, kind, zone_id, polygon) -> Fence:
+    lats = [p[0] for p in polygon]
+    lngs = [p[1] for p in polygon]
+    return Fence(fence_id, name, kind, zone_id, (min(lats), min(lngs), max(lats), max(lngs)),
+                 [(float(lat), float(lng)) for lat, lng in polygon])
+
+
+class GeofenceEngine:
+
+    def __init__(self):
+        self._index     = GridIndex((), 1.0)
+        self._routes    = {}       # tracking_code → (origin_zone_id, dest_zone_id), per reload period
+        self._state     = {}       # tracking_code → edge state, when there is no Redis
+        self._loaded_at = None
+        self._lock      = threading.Lock()
+
+    def _fresh(self) -> bool:
+        return (self._loaded_at is not None
+                and time.monotonic() - self._loaded_at < settings.GEOFENCE_RELOAD_INTERVAL)
+
+    def ready(self, codes) -> bool:
+        """True when `codes` can be evaluated without touching the DB."""
+        return self._fresh() and all(code in self._routes for code in codes)
+
+    def load(self, codes=()):
+        """Reload the index when stale and fetch routes for unknown codes in one query."""
+        from apps.shipments.models import Shipment
+        from apps.tracking.models import Geofence
+
+        if not self._fresh():
+            index = GridIndex(
+                (build_fence(*row) for row in Geofence.objects.filter(is_active=True)
+                 .values_list("id", "name", "kind", "zone_id", "polygon")),
+                settings.GEOFENCE_CELL_DEG,
+            )
+            with self._lock:
+                # Fence state survives the reload (or a crossing would be missed);
+                # shipments not evaluated since the last reload are dropped
+                self._state = {code: state for code, state in self._state.items() if code in self._routes}
+                self._index, self._routes = index, {}
+                self._loaded_at = time.monotonic()
+
+        missing = [code for code in codes if code not in self._routes]
+        if missing:
+            routes = {
+                code: (origin, dest)
+                for code, origin, dest in Shipment.objects.filter(tracking_code__in=missing)
+                .values_list("tracking_code", "origin_zone_id", "dest_zone_id")
+            }
+            with self._lock:
+                self._routes.update(routes)
+
+    def _step(self, state, route, lat: float, lng: float, ts: float) -> tuple:
+        """
+        (new state, [(to_status, note), ...]) for one fix. State is
+        {"inside": [fence ids], "arrived": ts | None, "fixes": n, "ts": ts},
+        where `arrived` is set while a destination entry waits out its dwell
+        and `ts` is the newest fix evaluated so far.
+        """
+        if state is not None and ts <= state.get("ts", float("-inf")):
+            return state, []
+        fences = self._index.locate(lat, lng)
+        now    = {fence.id for fence in fences}
+        if state is None:
+            return {"inside": sorted(now), "arrived": None, "fixes": 0, "ts": ts}, []
+
+        prev = set(state["inside"])
+        origin, dest = route
+        arrived, fixes = state["arrived"], state["fixes"]
+        transitions = []
+        for fence_id in prev - now:
+            fence = self._index.fences.get(fence_id)
+            if fence is None:                       # deactivated since the last fix
+                continue
+            if fence.kind == "BORDER_POST":
+                transitions.append(("IN_TRANSIT", f"Cleared {fence.name}"))
+            elif fence.zone_id == origin:
+                transitions.append(("IN_TRANSIT", f"Left {fence.name}"))
+
+        depot = None
+        for fence in fences:
+            if fence.kind == "BORDER_POST":
+                if fence.id not in prev:
+                    transitions.append(("AT_BORDER", f"Entered {fence.name}"))
+            elif fence.zone_id == dest:
+                depot = fence
+                if fence.id not in prev:
+                    arrived, fixes = ts, 0
+        if depot is None:
+            arrived = None                          # left before the dwell was up
+        elif arrived is not None:
+            fixes += 1
+            if fixes >= settings.GEOFENCE_DWELL_FIXES or ts - arrived >= settings.GEOFENCE_DWELL_SECONDS:
+                transitions.append(("DELIVERED", f"Arrived in {depot.name}"))
+                arrived = None
+        if arrived is None:
+            fixes = 0
+        return {"inside": sorted(now), "arrived": arrived, "fixes": fixes, "ts": ts}, transitions
+
+    def _run(self, codes, fixes) -> list:
+        transitions, changed = [], {}
+        states = self._load_states(codes)
+        for ts, lat, lng in sorted(fixes):
+            for code in codes:
+                route = self._routes.get(code)
+                if route is None:
+                    continue
+                state, found = self._step(states.get(code), route, lat, lng, ts)
+                if state != states.get(code):
+                    states[code] = changed[code] = state
+                transitions.extend((code, to_status, note) for to_status, note in found)
+        self._save_states(changed)
+        return transitions
+
+    def _load_states(self, codes) -> dict:
+        redis = get_redis()
+        if redis is None:
+            return {code: self._state[code] for code in codes if code in self._state}
+        raw = redis.mget([state_key(code) for code in codes])
+        return {code: json.loads(value) for code, value in zip(codes, raw) if value is not None}
+
+    def _save_states(self, states: dict):
+        if not states:
+            return
+        redis = get_redis()
+        if redis is None:
+            self._state.update(states)
+            return
+        pipe = redis.pipeline(transaction=False)
+        for code, state in states.items():
+            pipe.set(state_key(code), json.dumps(state), ex=STATE_TTL)
+        pipe.execute()
+
+    def evaluate_fixes(self, codes, fixes) -> list:
+        """[(tracking_code, to_status, note), ...] for a truck carrying `codes`, over (ts, lat, lng) fixes."""
+        if not self.ready(codes):
+            self.load(codes)
+        if get_redis() is not None:
+            return self._run(codes, fixes)
+        with self._lock:
+            return self._run(codes, fixes)
+
+    def evaluate_many(self, codes, lat: float, lng: float) -> list:
+        """evaluate_fixes() for a single fix taken now."""
+        return self.evaluate_fixes(codes, [(time.time(), lat, lng)])
+
+
+def apply_transitions(transitions) -> int:
+    """Persist geofence transitions. Returns how many changed a shipment's status."""
+    from apps.shipments.service import BookingService
+
+    service = BookingService()
+    applied = 0
+    for code, to_status, note in transitions:
+        if service.record_transition(code, to_status, note=f"Geofence: {note}"):
+            applied += 1
+    logger.debug("Geofence applied %d of %d transitions", applied, len(transitions))
+    return applied
+
+
+geofence_engine = GeofenceEngine()
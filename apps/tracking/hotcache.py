@@ -0,0 +1,147 @@
+"""
+Hot per-shipment tracking state for LiveTrackingView.
+
+One Redis hash per tracking code, `track:{code}`:
+    status, driver, vehicle,
+    origin, dest, assigned_at       ← state transitions (notify_shipment_changed)
+    lat, lng, last_seen             ← GPS ingestion (LocationBuffer.push)
+
+A poll is a single HGETALL. An entry only counts as a hit once the
+summary fields are present; on a miss the view reads PostgreSQL once and
+fills the hash without overwriting a fresher GPS fix. The ETA is computed
+per poll from the entry and the in-memory matrix (apps.shipments.eta).
+Without Redis the entry is a dict in the Django cache.
+"""
+
+from datetime import datetime, timezone as dt_timezone
+
+from django.core.cache import cache
+from django.utils.dateparse import parse_datetime
+
+from ishemalink.redis_client import get_redis
+
+ENTRY_TTL = 60 * 60 * 24     # idle entries expire after a day
+
+
+def hot_key(tracking_code: str) -> str:
+    return f"track:{tracking_code}"
+
+
+def _iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts, tz=dt_timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+def _ts(iso: str) -> float:
+    return datetime.fromisoformat(iso.replace("Z", "+00:00")).timestamp()
+
+
+def last_fix(tracking_code: str):
+    """(ts, lat, lng) of the cached live fix, or None."""
+    redis = get_redis()
+    if redis is not None:
+        values = [v.decode() if isinstance(v, bytes) else v
+                  for v in redis.hmget(hot_key(tracking_code), "lat", "lng", "last_seen")]
+    else:
+        entry  = cache.get(hot_key(tracking_code)) or {}
+        values = [entry.get("lat"), entry.get("lng"), entry.get("last_seen")]
+    lat, lng, seen = values
+    if lat in (None, "") or not seen:
+        return None
+    return _ts(seen), float(lat), float(lng)
+
+
+def record_fix(tracking_code: str, lat: float, lng: float, ts: float, pipe=None):
+    """Latest GPS fix. Pass the caller's Redis pipeline to ride along with its round trip."""
+    fields = {"lat": lat, "lng": lng, "last_seen": _iso(ts)}
+    redis  = get_redis() if pipe is None else None
+    if pipe is not None or redis is not None:
+        own  = pipe is None
+        pipe = pipe if pipe is not None else redis.pipeline(transaction=False)
+        pipe.hset(hot_key(tracking_code), mapping=fields)
+        pipe.expire(hot_key(tracking_code), ENTRY_TTL)
+        if own:
+            pipe.execute()
+        return
+    entry = cache.get(hot_key(tracking_code)) or {}
+    entry.update(fields)
+    cache.set(hot_key(tracking_code), entry, ENTRY_TTL)
+
+
+def record_summary(tracking_code: str, status: str, driver: str = None, vehicle: str = None,
+                   origin: int = None, dest: int = None, assigned_at: str = None,
+                   location: dict = None):
+    """
+    Status and driver summary after a state transition or a DB read.
+    `location` (from the DB) is only used when no GPS fix is cached yet.
+    """
+    fields = {
+        "status": status, "driver": driver or "", "vehicle": vehicle or "",
+        "origin": origin, "dest": dest, "assigned_at": assigned_at or "",
+    }
+    redis  = get_redis()
+    if redis is not None:
+        pipe = redis.pipeline(transaction=False)
+        pipe.hset(hot_key(tracking_code), mapping=fields)
+        if location:
+            for name in ("lat", "lng", "last_seen"):
+                pipe.hsetnx(hot_key(tracking_code), name, location[name])
+        pipe.expire(hot_key(tracking_code), ENTRY_TTL)
+        pipe.execute()
+        return
+    entry = cache.get(hot_key(tracking_code)) or {}
+    entry.update(fields)
+    if location and "lat" not in entry:
+        entry.update(location)
+    cache.set(hot_key(tracking_code), entry, ENTRY_TTL)
+
+
+def get_live(tracking_code: str):
+    """LiveTrackingView payload from the hot entry, or None on a miss."""
+    redis = get_redis()
+    if redis is not None:
+        entry = {
+            (k.decode() if isinstance(k, bytes) else k): (v.decode() if isinstance(v, bytes) else v)
+            for k, v in redis.hgetall(hot_key(tracking_code)).items()
+        }
+    else:
+        entry = cache.get(hot_key(tracking_code))
+    if not entry or "origin" not in entry:
+        return None
+
+    from apps.shipments.eta import eta_engine
+
+    has_fix  = entry.get("lat") not in (None, "")
+    position = (float(entry["lat"]), float(entry["lng"])) if has_fix else None
+    eta = eta_engine.estimate(
+        int(entry["origin"]), int(entry["dest"]), entry["status"],
+        assigned_at=parse_datetime(entry["assigned_at"]) if entry["assigned_at"] else None,
+        position=position,
+    )
+    if not entry["driver"]:
+        return {"status": entry["status"], "location": None, "eta": eta}
+    return {
+        "tracking_code": tracking_code,
+        "status":        entry["status"],
+        "driver":        entry["driver"],
+        "vehicle":       entry["vehicle"],
+        "location": {
+            "lat":       position[0],
+            "lng":       position[1],
+            "last_seen": entry["last_seen"],
+        } if has_fix else None,
+        "eta":           eta,
+    }
+
+
+def summary_for(shipment) -> dict:
+    """record_summary() kwargs for a Shipment (driver and driver_profile should be loaded)."""
+    driver  = shipment.driver
+    profile = getattr(driver, "driver_profile", None) if driver else None
+    return {
+        "status":      shipment.status,
+        "driver":      driver.full_name if profile else None,
+        "vehicle":     profile.vehicle_plate if profile else None,
+        "origin":      shipment.origin_zone_id,
+        "dest":        shipment.dest_zone_id,
+        "assigned_at": shipment.assigned_at.isoformat() if shipment.assigned_at else None,
+    }
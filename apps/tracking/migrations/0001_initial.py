@@ -0,0 +1,33 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ("shipments", "0002_shipmentevent_audit_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TrajectoryChunk",
+            fields=[
+                ("id",          models.BigAutoField(auto_created=True, primary_key=True, serialize=False)),
+                ("started_at",  models.DateTimeField()),
+                ("ended_at",    models.DateTimeField()),
+                ("point_count", models.PositiveIntegerField()),
+                ("data",        models.BinaryField()),
+                ("shipment",    models.ForeignKey(
+                    on_delete=django.db.models.deletion.CASCADE,
+                    related_name="trajectory_chunks", to="shipments.shipment",
+                )),
+            ],
+            options={"ordering": ["started_at"]},
+        ),
+        migrations.AddIndex(
+            model_name="trajectorychunk",
+            index=models.Index(fields=["shipment", "started_at"], name="traj_ship_started_idx"),
+        ),
+    ]
@@ -0,0 +1,29 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("shipments", "0003_eta_transit_stats"),
+        ("tracking", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Geofence",
+            fields=[
+                ("id",        models.BigAutoField(auto_created=True, primary_key=True, serialize=False)),
+                ("name",      models.CharField(max_length=80, unique=True)),
+                ("kind",      models.CharField(
+                    choices=[("ZONE", "Zone boundary"), ("BORDER_POST", "Border post")], max_length=12,
+                )),
+                ("polygon",   models.JSONField()),
+                ("is_active", models.BooleanField(default=True)),
+                ("zone",      models.ForeignKey(
+                    on_delete=django.db.models.deletion.CASCADE,
+                    related_name="geofences", to="shipments.zone",
+                )),
+            ],
+        ),
+    ]
@@ -0,0 +1,47 @@
+"""Tracking models — compact GPS route history and geofences."""
+
+from django.db import models
+
+from apps.shipments.models import Shipment, Zone
+
+
+class TrajectoryChunk(models.Model):
+    """
+    Append-only slice of a shipment's GPS trail, delta-encoded by
+    apps.tracking.trajectory. One row per shipment per trail flush.
+    """
+    shipment    = models.ForeignKey(Shipment, on_delete=models.CASCADE, related_name="trajectory_chunks")
+    started_at  = models.DateTimeField()
+    ended_at    = models.DateTimeField()
+    point_count = models.PositiveIntegerField()
+    data        = models.BinaryField()
+
+    class Meta:
+        ordering = ["started_at"]
+        indexes  = [
+            models.Index(fields=["shipment", "started_at"], name="traj_ship_started_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.shipment_id} {self.started_at:%Y-%m-%d %H:%M} ({self.point_count} pts)"
+
+
+class Geofence(models.Model):
+    """
+    Polygon evaluated against live GPS fixes by apps.tracking.geofence.
+    ZONE fences outline a zone's delivery area (arrival, leaving origin);
+    BORDER_POST fences outline a customs crossing (AT_BORDER).
+    """
+
+    class Kind(models.TextChoices):
+        ZONE        = "ZONE",        "Zone boundary"
+        BORDER_POST = "BORDER_POST", "Border post"
+
+    name      = models.CharField(max_length=80, unique=True)
+    kind      = models.CharField(max_length=12, choices=Kind.choices)
+    zone      = models.ForeignKey(Zone, on_delete=models.CASCADE, related_name="geofences")
+    polygon   = models.JSONField()            # [[lat, lng], ...] — ring, closing point optional
+    is_active = models.BooleanField(default=True)
+
+    def __str__(self):
+        return f"{self.name} [{self.kind}]"
@@ -0,0 +1,89 @@
+"""
+Binary GPS frames for driver sockets — WebSocket subprotocol `ishemalink.gps.v1`.
+
+A frame carries a batch of fixes as fixed-width little-endian structs:
+
+    header  <BHIii   version (=1), count, t0 (unix s), lat0, lng0      15 bytes
+    deltas  <Hhh     Δt (s), Δlat, Δlng  — one per further fix          6 bytes
+
+Coordinates are in 1e-5° units (≈1.1 m, as in trajectory.py). A fix is
+6 bytes instead of ~40 bytes of JSON, and decoding is a single
+struct.iter_unpack plus running sums. A client starts a new frame when a
+delta would not fit (a gap over ~18 h or a jump over ~0.33°).
+
+Browsers that don't offer the subprotocol keep using JSON text frames.
+The offline upload endpoint accepts several frames back to back.
+
+valid_fixes() is the plausibility check every ingestion path (JSON, binary,
+offline upload) applies before a fix reaches the buffer or the geofences.
+"""
+
+import struct
+import time
+from itertools import accumulate
+
+SUBPROTOCOL    = "ishemalink.gps.v1"
+VERSION        = 1
+COORD_SCALE    = 100_000
+MAX_FIXES      = 0xFFFF
+FUTURE_SLACK_S = 300          # device clocks drift; later than this is rejected
+
+_HEADER = struct.Struct("<BHIii")
+_DELTA  = struct.Struct("<Hhh")
+
+
+class FrameError(ValueError):
+    pass
+
+
+def encode_frame(fixes) -> bytes:
+    """[(ts, lat, lng), ...] → one binary frame. Raises FrameError if a delta overflows."""
+    if not fixes or len(fixes) > MAX_FIXES:
+        raise FrameError(f"A frame carries 1..{MAX_FIXES} fixes.")
+    scaled = [(int(ts), round(lat * COORD_SCALE), round(lng * COORD_SCALE)) for ts, lat, lng in fixes]
+    out = bytearray(_HEADER.pack(VERSION, len(scaled), *scaled[0]))
+    try:
+        for (pt, plat, plng), (t, lat, lng) in zip(scaled, scaled[1:]):
+            out += _DELTA.pack(t - pt, lat - plat, lng - plng)
+    except struct.error as exc:
+        raise FrameError(f"Delta out of range, start a new frame: {exc}") from exc
+    return bytes(out)
+
+
+def valid_fixes(fixes) -> list:
+    """Keep (ts, lat, lng) fixes with in-range coordinates and a sane timestamp (NaN/inf fail too)."""
+    latest_ok = time.time() + FUTURE_SLACK_S
+    return [
+        fix for fix in fixes
+        if -90 <= fix[1] <= 90 and -180 <= fix[2] <= 180 and 0 < fix[0] <= latest_ok
+    ]
+
+
+def decode_frame(data: bytes) -> list:
+    """One binary frame → [(ts, lat, lng), ...] in the order sent."""
+    if len(data) < _HEADER.size:
+        raise FrameError("Frame shorter than its header.")
+    version, count, t0, lat0, lng0 = _HEADER.unpack_from(data)
+    if version != VERSION:
+        raise FrameError(f"Unsupported frame version {version}.")
+    if count < 1 or len(data) != _HEADER.size + (count - 1) * _DELTA.size:
+        raise FrameError("Frame length does not match its fix count.")
+
+    deltas = list(_DELTA.iter_unpack(memoryview(data)[_HEADER.size:]))
+    ts  = accumulate((d[0] for d in deltas), initial=t0)
+    lat = accumulate((d[1] for d in deltas), initial=lat0)
+    lng = accumulate((d[2] for d in deltas), initial=lng0)
+    return [(float(t), a / COORD_SCALE, b / COORD_SCALE) for t, a, b in zip(ts, lat, lng)]
+
+
+def decode_frames(data: bytes) -> list:
+    """Back-to-back frames (offline uploads) → one list of fixes."""
+    fixes, offset = [], 0
+    while offset < len(data):
+        if len(data) - offset < _HEADER.size:
+            raise FrameError("Trailing bytes after the last frame.")
+        count = _HEADER.unpack_from(data, offset)[1]
+        end   = offset + _HEADER.size + max(count - 1, 0) * _DELTA.size
+        fixes.extend(decode_frame(data[offset:end]))
+        offset = end
+    return fixes
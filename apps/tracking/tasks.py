@@ -0,0 +1,20 @@
+"""Tracking async tasks."""
+
+import logging
+from celery import shared_task
+
+logger = logging.getLogger("ishemalink.tracking.tasks")
+
+
+@shared_task
+def flush_gps_buffer():
+    """Beat task: persist buffered GPS fixes; sockets only ever write to the buffer."""
+    from apps.tracking.buffer import location_buffer
+    return location_buffer.flush()
+
+
+@shared_task
+def flush_gps_trails():
+    """Beat task: turn buffered GPS trails into compact TrajectoryChunk rows."""
+    from apps.tracking.buffer import location_buffer
+    return location_buffer.flush_trails()
@@ -0,0 +1,104 @@
+"""
+Compact GPS trajectories.
+
+A chunk is a sequence of (ts, lat, lng) fixes stored as zigzag-varint
+deltas: timestamps in whole seconds, coordinates quantised to 1e-5°
+(≈1.1 m). A truck pinging every 5 s moves a few metres per fix, so most
+points cost 4–6 bytes instead of a ~100-byte row.
+
+simplify() is Douglas–Peucker with a tolerance in metres, used by the
+replay endpoint to return a path sized for the map instead of every fix.
+"""
+
+import math
+
+COORD_SCALE = 100_000          # 1e-5 degree units
+EARTH_RADIUS_M = 6_371_000
+
+
+# ── Varint codec ──────────────────────────────────────────────────────────────
+def _write_varint(out: bytearray, value: int):
+    # zigzag: 0, -1, 1, -2 … → 0, 1, 2, 3 … so small negatives stay short
+    value = value * 2 if value >= 0 else -value * 2 - 1
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varints(data: bytes):
+    value = shift = 0
+    for byte in data:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        yield (value >> 1) if not value & 1 else -((value + 1) >> 1)
+        value = shift = 0
+
+
+def encode(points) -> bytes:
+    """[(ts, lat, lng), ...] → delta-encoded bytes (first point is a delta from zero)."""
+    out  = bytearray()
+    prev = (0, 0, 0)
+    for ts, lat, lng in points:
+        cur = (int(round(ts)), int(round(lat * COORD_SCALE)), int(round(lng * COORD_SCALE)))
+        for c, p in zip(cur, prev):
+            _write_varint(out, c - p)
+        prev = cur
+    return bytes(out)
+
+
+def decode(data: bytes) -> list:
+    """Inverse of encode(): [(ts, lat, lng), ...]."""
+    values = list(_read_varints(bytes(data)))
+    points, ts, lat, lng = [], 0, 0, 0
+    for i in range(0, len(values) - 2, 3):
+        ts  += values[i]
+        lat += values[i + 1]
+        lng += values[i + 2]
+        points.append((ts, lat / COORD_SCALE, lng / COORD_SCALE))
+    return points
+
+
+# ── Douglas–Peucker ───────────────────────────────────────────────────────────
+def _offset_m(lat, lng, ref_lat, ref_lng, cos_ref):
+    """Equirectangular projection — accurate to well under 1% across Rwanda."""
+    return (
+        math.radians(lng - ref_lng) * cos_ref * EARTH_RADIUS_M,
+        math.radians(lat - ref_lat) * EARTH_RADIUS_M,
+    )
+
+
+def simplify(points: list, tolerance_m: float) -> list:
+    """Drop fixes that lie within tolerance_m of the simplified path. Keeps endpoints."""
+    if len(points) < 3 or tolerance_m <= 0:
+        return list(points)
+
+    ref_lat, ref_lng = points[0][1], points[0][2]
+    cos_ref = math.cos(math.radians(ref_lat))
+    xy      = [_offset_m(lat, lng, ref_lat, ref_lng, cos_ref) for _, lat, lng in points]
+
+    keep  = [False] * len(points)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        (x1, y1), (x2, y2) = xy[first], xy[last]
+        dx, dy   = x2 - x1, y2 - y1
+        seg_len  = math.hypot(dx, dy)
+        max_dist, index = 0.0, None
+        for i in range(first + 1, last):
+            px, py = xy[i]
+            if seg_len:
+                dist = abs(dy * px - dx * py + x2 * y1 - y2 * x1) / seg_len
+            else:
+                dist = math.hypot(px - x1, py - y1)
+            if dist > max_dist:
+                max_dist, index = dist, i
+        if index is not None and max_dist > tolerance_m:
+            keep[index] = True
+            stack.append((first, index))
+            stack.append((index, last))
+
+    return [p for p, k in zip(points, keep) if k]
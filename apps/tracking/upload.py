@@ -0,0 +1,129 @@
+"""
+Offline GPS upload — fixes a driver app buffered while it had no socket.
+
+A batch arrives as JSON ({"fixes": [[ts, lat, lng], ...]}) or as
+back-to-back ishemalink.gps.v1 binary frames, optionally gzip-compressed.
+It is ingested in one go for every active shipment on the truck:
+
+    trail          one TrajectoryChunk per shipment (single bulk INSERT)
+    DriverProfile  one conditional UPDATE — only if the batch is newer
+    hot entry      newest fix, only if newer than what the socket sent
+    geofences      the batch replayed in time order, so a border crossed
+                   while offline still produces its transitions; fixes
+                   older than the socket's are skipped by the engine
+
+Retried uploads of the same body are recognised by their hash and ignored.
+"""
+
+import hashlib
+import json
+import logging
+import zlib
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+
+from . import hotcache
+from .protocol import FrameError, decode_frames, valid_fixes
+
+logger = logging.getLogger("ishemalink.tracking")
+
+UPLOAD_SEEN_TTL = 60 * 60 * 24
+
+
+class UploadError(ValueError):
+    """Malformed or oversized upload. `status` is the HTTP status to answer with."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def _inflate(body: bytes) -> bytes:
+    inflater = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    try:
+        data = inflater.decompress(body, settings.GPS_UPLOAD_MAX_BYTES)
+    except zlib.error as exc:
+        raise UploadError(f"Invalid gzip body: {exc}") from exc
+    if inflater.unconsumed_tail:
+        raise UploadError("Upload too large once decompressed.", status=413)
+    return data
+
+
+def parse_upload(body: bytes, content_type: str, content_encoding: str = "") -> list:
+    """Request body → [(ts, lat, lng), ...] sorted by time, invalid fixes dropped."""
+    if content_encoding.strip().lower() == "gzip" or body[:2] == b"\x1f\x8b":
+        body = _inflate(body)
+
+    if content_type.split(";")[0].strip() == "application/octet-stream":
+        try:
+            fixes = decode_frames(body)
+        except FrameError as exc:
+            raise UploadError(str(exc)) from exc
+    else:
+        try:
+            fixes = [(float(ts), float(lat), float(lng)) for ts, lat, lng in json.loads(body)["fixes"]]
+        except (ValueError, KeyError, TypeError) as exc:
+            raise UploadError('Expected {"fixes": [[ts, lat, lng], ...]}.') from exc
+
+    if len(fixes) > settings.GPS_UPLOAD_MAX_FIXES:
+        raise UploadError(f"At most {settings.GPS_UPLOAD_MAX_FIXES} fixes per upload.", status=413)
+    return sorted(valid_fixes(fixes))
+
+
+def upload_key(driver_id, body: bytes) -> str:
+    """Cache key remembering an accepted body, so a client retry after a timeout is a no-op."""
+    return f"gps:upload:{driver_id}:{hashlib.sha1(body).hexdigest()}"
+
+
+def ingest_batch(driver_id, codes, fixes) -> dict:
+    """Persist a sorted batch for every shipment in `codes`; returns counts for the response."""
+    from apps.authentication.models import DriverProfile
+    from apps.shipments.models import Shipment
+    from apps.tracking.geofence import apply_transitions, geofence_engine
+    from apps.tracking.models import TrajectoryChunk
+    from apps.tracking.trajectory import encode
+
+    newest     = fixes[-1]
+    newest_at  = datetime.fromtimestamp(newest[0], tz=dt_timezone.utc)
+    ids        = dict(Shipment.objects.filter(tracking_code__in=codes).values_list("tracking_code", "id"))
+
+    with transaction.atomic():
+        TrajectoryChunk.objects.bulk_create([
+            TrajectoryChunk(
+                shipment_id = ids[code],
+                started_at  = datetime.fromtimestamp(fixes[0][0], tz=dt_timezone.utc),
+                ended_at    = newest_at,
+                point_count = len(fixes),
+                data        = encode(fixes),
+            )
+            for code in codes if code in ids
+        ])
+        moved = (
+            DriverProfile.objects
+            .filter(Q(last_seen__isnull=True) | Q(last_seen__lt=newest_at), agent_id=driver_id)
+            .update(current_lat=newest[1], current_lng=newest[2], last_seen=newest_at)
+        )
+
+    # Geofences: replay the batch, then the truck's live fix once if the socket is
+    # already ahead of it; fixes older than what the engine has seen are skipped
+    ahead = []
+    for code in codes:
+        live = hotcache.last_fix(code)
+        if live is None or live[0] < newest[0]:
+            hotcache.record_fix(code, newest[1], newest[2], newest[0])
+        elif live[0] > newest[0]:
+            ahead.append(live)
+    track       = list(fixes) + ([max(ahead)] if ahead else [])
+    transitions = geofence_engine.evaluate_fixes(codes, track)
+    applied     = apply_transitions(transitions) if transitions else 0
+
+    logger.info("Offline upload: %d fixes for %s, %d transitions", len(fixes), ",".join(codes), applied)
+    return {
+        "accepted":        len(fixes),
+        "shipments":       len(ids),
+        "position_update": bool(moved),
+        "transitions":     applied,
+    }
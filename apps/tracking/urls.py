@@ -1,6 +1,8 @@
 from django.urls import path
-from .views import LiveTrackingView
+from .views import LiveTrackingView, OfflineFixUploadView, TrajectoryReplayView
 
 urlpatterns = [
-    path("<str:tracking_code>/live/", LiveTrackingView.as_view(), name="tracking-live"),
+    path("<str:tracking_code>/live/",   LiveTrackingView.as_view(),     name="tracking-live"),
+    path("<str:tracking_code>/replay/", TrajectoryReplayView.as_view(), name="tracking-replay"),
+    path("<str:tracking_code>/fixes/",  OfflineFixUploadView.as_view(), name="tracking-fixes"),
 ]
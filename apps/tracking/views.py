@@ -1,19 +1,34 @@
-"""REST polling fallback for live truck coordinates."""
+"""REST polling fallback for live truck coordinates, route replay and offline GPS upload."""
+
+from datetime import datetime, timezone as dt_timezone
 
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from drf_spectacular.utils import extend_schema
+from django.conf import settings
+from django.core.cache import cache
 from django.urls import path
 
+from apps.shipments.eta import eta_engine
 from apps.shipments.models import Shipment
+from apps.tracking.hotcache import get_live, record_summary, summary_for
 
 
 @extend_schema(tags=["Tracking"], summary="Polling endpoint for live truck coordinates")
 class LiveTrackingView(APIView):
+    """
+    Served from the hot tracking entry (apps.tracking.hotcache); beyond the
+    token's user lookup — which keeps deactivated accounts out — PostgreSQL
+    is read only on a miss.
+    """
     permission_classes = [IsAuthenticated]
 
     def get(self, request, tracking_code):
+        live = get_live(tracking_code)
+        if live is not None:
+            return Response(live)
+
         try:
             shipment = Shipment.objects.select_related(
                 "driver__driver_profile"
@@ -22,22 +37,113 @@ class LiveTrackingView(APIView):
             return Response({"error": "Not found"}, status=404)
 
         if not shipment.driver or not hasattr(shipment.driver, "driver_profile"):
-            return Response({"status": shipment.status, "location": None})
+            record_summary(tracking_code, **summary_for(shipment))
+            return Response({"status": shipment.status, "location": None, "eta": eta_engine.for_shipment(shipment)})
 
         dp = shipment.driver.driver_profile
+        location = {
+            "lat":       dp.current_lat,
+            "lng":       dp.current_lng,
+            "last_seen": dp.last_seen.isoformat().replace("+00:00", "Z") if dp.last_seen else None,
+        } if dp.current_lat else None
+        record_summary(tracking_code, location=location, **summary_for(shipment))
+        position = (location["lat"], location["lng"]) if location else None
         return Response({
             "tracking_code": tracking_code,
             "status":        shipment.status,
             "driver":        shipment.driver.full_name,
             "vehicle":       dp.vehicle_plate,
-            "location": {
-                "lat":       dp.current_lat,
-                "lng":       dp.current_lng,
-                "last_seen": dp.last_seen,
-            } if dp.current_lat else None,
+            "location":      location,
+            "eta":           eta_engine.for_shipment(shipment, position=position),
+        })
+
+
+@extend_schema(tags=["Tracking"], summary="Replay a shipment's GPS route (Douglas–Peucker simplified)")
+class TrajectoryReplayView(APIView):
+    """
+    Full recorded route for a shipment, simplified to ?tolerance= metres
+    (0 returns every stored fix). Fixes still in the write-behind buffer
+    appear after the next trail flush.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, tracking_code):
+        from apps.tracking.models import TrajectoryChunk
+        from apps.tracking.trajectory import decode, simplify
+
+        try:
+            tolerance = float(request.GET.get("tolerance", settings.GPS_REPLAY_TOLERANCE_M))
+        except ValueError:
+            return Response({"error": "tolerance must be a number of metres."}, status=400)
+
+        shipment_id = (
+            Shipment.objects.filter(tracking_code=tracking_code).values_list("id", flat=True).first()
+        )
+        if shipment_id is None:
+            return Response({"error": "Not found"}, status=404)
+
+        points = []
+        for data in (
+            TrajectoryChunk.objects.filter(shipment_id=shipment_id)
+            .order_by("started_at", "id").values_list("data", flat=True)
+        ):
+            points.extend(decode(data))
+        # Offline uploads overlap socket chunks in time: restore time order, drop repeats
+        points      = sorted(set(points))
+        path_points = simplify(points, tolerance)
+
+        return Response({
+            "tracking_code": tracking_code,
+            "tolerance_m":   tolerance,
+            "recorded":      len(points),
+            "returned":      len(path_points),
+            "path": [
+                {"lat": lat, "lng": lng, "at": datetime.fromtimestamp(ts, tz=dt_timezone.utc).isoformat()}
+                for ts, lat, lng in path_points
+            ],
         })
 
 
+@extend_schema(tags=["Tracking"], summary="Upload GPS fixes buffered while offline")
+class OfflineFixUploadView(APIView):
+    """
+    Batch of timestamped fixes from the assigned driver's app after a dead
+    zone — JSON or ishemalink.gps.v1 frames, optionally gzipped. Applies to
+    every active shipment on the truck (see apps.tracking.upload).
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, tracking_code):
+        from apps.tracking.consumers import load_driver_codes
+        from apps.tracking.upload import UPLOAD_SEEN_TTL, UploadError, ingest_batch, parse_upload, upload_key
+
+        row = Shipment.objects.filter(tracking_code=tracking_code).values_list("driver_id").first()
+        if row is None:
+            return Response({"error": "Not found"}, status=404)
+        driver_id = row[0]
+        if driver_id is None or driver_id != request.user.pk:
+            return Response({"error": "Only the assigned driver can upload fixes."}, status=403)
+
+        body = request.body
+        key  = upload_key(driver_id, body)
+        seen = cache.get(key)
+        if seen is not None:
+            return Response({**seen, "duplicate": True})
+
+        try:
+            fixes = parse_upload(body, request.content_type, request.headers.get("Content-Encoding", ""))
+        except UploadError as exc:
+            return Response({"error": str(exc)}, status=exc.status)
+        if not fixes:
+            return Response({"error": "No valid fixes in upload."}, status=400)
+
+        result = ingest_batch(driver_id, load_driver_codes(driver_id, tracking_code), fixes)
+        cache.set(key, result, UPLOAD_SEEN_TTL)
+        return Response(result, status=201)
+
+
 urlpatterns = [
-    path("<str:tracking_code>/live/", LiveTrackingView.as_view(), name="tracking-live"),
+    path("<str:tracking_code>/live/",   LiveTrackingView.as_view(),      name="tracking-live"),
+    path("<str:tracking_code>/replay/", TrajectoryReplayView.as_view(),  name="tracking-replay"),
+    path("<str:tracking_code>/fixes/",  OfflineFixUploadView.as_view(),  name="tracking-fixes"),
 ]
@@ -3,6 +3,9 @@ pytest configuration for IshemaLink.
 Sets Django settings and provides shared fixtures.
 """
 
+import uuid
+from decimal import Decimal
+
 import django
 import pytest
 from django.conf import settings
@@ -101,8 +104,66 @@ def pytest_configure(config):
             RRA_EBM_BASE_URL="http://ebm-mock:8001",
             RURA_API_BASE_URL="http://rura-mock:8002",
             SMS_GATEWAY_URL="http://sms-mock:8003",
+            SMS_GATEWAY_BULK=True,
+            SMS_BULK_SIZE=2,
+            SMS_BULK_TIMEOUT=1.0,
+            SMS_CONCURRENCY=4,
+            SMS_RATE_LIMIT=10000,
+            SMS_BROADCAST_CHUNK=3,
+            OUTBOX_BATCH_SIZE=3,
+            OUTBOX_MAX_ATTEMPTS=3,
+            OUTBOX_RETRY_BASE=30.0,
+            OUTBOX_CLAIM_TIMEOUT=120,
+            OUTBOX_DEDUPE_WINDOW=600,
+            SMS_COALESCE_WINDOW=0,
+            SMS_MAX_PARTS=3,
+            SMS_DLR_TOKEN="test-dlr-token",
+            SMS_DLR_MAX_RECEIPTS=5000,
+            SMS_DLR_CHUNK=2,
+            SWR_LOCK_TIMEOUT=60,
+            SWR_WAIT_TIMEOUT=1.0,
+            EXPORT_STORAGE={
+                "BACKEND": "django.core.files.storage.FileSystemStorage",
+                "OPTIONS": {"location": "/tmp/ishemalink_exports_test"},
+            },
+            EXPORT_FORMAT="csv",
+            EXPORT_CHUNK=2,
+            EXPORT_FILE_ROWS=1000,
+            EXPORT_SETTLE_SECONDS=0,
+            HLL_PRECISION=12,
+            DRIVER_STATS_ACCURACY=0.01,
             MTN_MOMO_BASE_URL="http://momo-mock",
             AIRTEL_MONEY_BASE_URL="http://airtel-mock",
+            GOVTECH_HTTP_POOL_SIZE=4,
+            GOVTECH_CONNECT_TIMEOUT=0.5,
+            EBM_READ_TIMEOUT=1.0,
+            EBM_BATCH_READ_TIMEOUT=1.0,
+            RURA_READ_TIMEOUT=1.0,
+            GOVTECH_CIRCUIT_BREAKERS={
+                "ebm":  {"min_calls": 4, "window": 60, "reset_timeout": 30, "max_concurrent": 4},
+                "rura": {"min_calls": 4, "window": 60, "reset_timeout": 30, "max_concurrent": 4},
+            },
+            EBM_BATCH_SIZE=2,
+            EBM_SIGN_CONCURRENCY=2,
+            EBM_SIGN_CHUNK_SIZE=100,
+            EBM_RESIGN_RATE=1000,
+            EBM_RESIGN_MAX_PER_RUN=100,
+            GPS_REPLAY_TOLERANCE_M=10.0,
+            GPS_FANOUT_RATE=20.0,
+            GPS_UPLOAD_MAX_FIXES=20000,
+            GPS_UPLOAD_MAX_BYTES=4000000,
+            FLEET_TILE_PRECISION=4,
+            FLEET_MAX_TILES=256,
+            FLEET_STALE_AFTER=600,
+            FLEET_PUSH_RATE=20.0,
+            GEOFENCE_CELL_DEG=0.05,
+            GEOFENCE_RELOAD_INTERVAL=0,
+            GEOFENCE_DWELL_FIXES=3,
+            GEOFENCE_DWELL_SECONDS=120,
+            ETA_MAX_SAMPLES=200,
+            ETA_MIN_SAMPLES=3,
+            ETA_MATRIX_TTL=0,
+            ETA_SETTLE_SECONDS=0,
             CACHES={
                 "default": {
                     "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
@@ -119,3 +180,28 @@ def pytest_configure(config):
                 "AUTH_HEADER_TYPES": ("Bearer",),
             },
         )
+
+
+@pytest.fixture
+def make_shipment(db):
+    """
+    Shipment factory: a 100 kg domestic booking declared at 10 000 RWF and
+    billed 5 900 RWF, CONFIRMED, unless `fields` say otherwise.
+    """
+    def _make(sender, zones, commodity, code=None, **fields):
+        from apps.shipments.models import Shipment
+
+        origin, dest = zones
+        defaults = {
+            "shipment_type":  Shipment.Type.DOMESTIC,
+            "weight_kg":      Decimal("100"),
+            "declared_value": Decimal("10000"),
+            "total_amount":   Decimal("5900"),
+            "status":         Shipment.Status.CONFIRMED,
+        }
+        return Shipment.objects.create(
+            tracking_code=code or f"TEST-{uuid.uuid4().hex[:8].upper()}",
+            sender=sender, origin_zone=origin, dest_zone=dest, commodity=commodity,
+            **{**defaults, **fields},
+        )
+    return _make
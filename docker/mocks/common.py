@@ -0,0 +1,249 @@
+"""
+Shared plumbing for the government / carrier mock servers.
+
+  - ThreadingHTTPServer with HTTP/1.1 keep-alive, so pooled clients reuse
+    connections and many requests are served concurrently.
+  - Fault injection configured per service from env vars (prefix "EBM",
+    "RURA", "SMS"; falls back to the generic MOCK_* name):
+
+        <PREFIX>_LATENCY_DIST     fixed | uniform | normal | exponential | lognormal
+        <PREFIX>_LATENCY_MS       mean added latency                (default 0)
+        <PREFIX>_LATENCY_JITTER_MS spread for uniform/normal/lognormal (default 0)
+        <PREFIX>_ERROR_RATE       fraction answered with 503        (default 0)
+        <PREFIX>_TIMEOUT_RATE     fraction that hang TIMEOUT_S first (default 0)
+        <PREFIX>_TIMEOUT_S        hang duration                      (default 30)
+        <PREFIX>_RATE_LIMIT       requests/second before 429, 0=off  (default 0)
+
+  - Control endpoints on every mock:
+        GET  /__stats__           request counters by route and status + latency
+        POST /__stats__/reset     zero the counters
+        GET  /__faults__          current fault config
+        POST /__faults__          change fault config at runtime (JSON body)
+
+  - A body that isn't a JSON object is answered 400, not a dropped connection.
+"""
+
+import json
+import math
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class BadRequest(ValueError):
+    """Request body the mock can't use — answered 400."""
+
+
+class FaultConfig:
+    FIELDS = {
+        "latency_dist":      ("LATENCY_DIST",      str,   "fixed"),
+        "latency_ms":        ("LATENCY_MS",        float, 0.0),
+        "latency_jitter_ms": ("LATENCY_JITTER_MS", float, 0.0),
+        "error_rate":        ("ERROR_RATE",        float, 0.0),
+        "timeout_rate":      ("TIMEOUT_RATE",      float, 0.0),
+        "timeout_s":         ("TIMEOUT_S",         float, 30.0),
+        "rate_limit":        ("RATE_LIMIT",        float, 0.0),
+    }
+
+    def __init__(self, prefix: str):
+        self._lock = threading.Lock()
+        for attr, (suffix, cast, default) in self.FIELDS.items():
+            raw = os.environ.get(f"{prefix}_{suffix}", os.environ.get(f"MOCK_{suffix}"))
+            setattr(self, attr, cast(raw) if raw is not None else default)
+        self._tokens      = self.rate_limit
+        self._last_refill = time.monotonic()
+
+    def as_dict(self) -> dict:
+        return {attr: getattr(self, attr) for attr in self.FIELDS}
+
+    def update(self, values: dict):
+        try:
+            changes = {attr: cast(values[attr]) for attr, (_, cast, _) in self.FIELDS.items() if attr in values}
+        except (TypeError, ValueError) as exc:
+            raise BadRequest(f"Invalid fault config: {exc}") from exc
+        with self._lock:
+            for attr, value in changes.items():
+                setattr(self, attr, value)
+            self._tokens = self.rate_limit
+
+    def sample_latency(self) -> float:
+        """Seconds of artificial latency for one request."""
+        mean, jitter = self.latency_ms, self.latency_jitter_ms
+        dist = self.latency_dist
+        if mean <= 0:
+            return 0.0
+        if dist == "uniform":
+            ms = random.uniform(max(0.0, mean - jitter), mean + jitter)
+        elif dist == "normal":
+            ms = random.gauss(mean, jitter)
+        elif dist == "exponential":
+            ms = random.expovariate(1.0 / mean)
+        elif dist == "lognormal":
+            # Long-tailed: median ≈ mean, jitter controls tail weight
+            sigma = math.log1p(jitter / mean) if jitter else 0.5
+            ms = random.lognormvariate(math.log(mean), sigma)
+        else:
+            ms = mean
+        return max(0.0, ms) / 1000.0
+
+    def allow(self) -> bool:
+        """Token bucket — False means answer 429."""
+        if self.rate_limit <= 0:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.rate_limit, self._tokens + (now - self._last_refill) * self.rate_limit)
+            self._last_refill = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+
+
+class Stats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started   = time.time()
+            self.counts    = defaultdict(lambda: defaultdict(int))
+            self.items     = defaultdict(int)     # records processed (batch endpoints count each)
+            self.latency_s = 0.0
+
+    def record(self, route: str, status: int, items: int, elapsed: float):
+        with self._lock:
+            self.counts[route][str(status)] += 1
+            self.items[route] += items
+            self.latency_s    += elapsed
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            total = sum(sum(c.values()) for c in self.counts.values())
+            return {
+                "uptime_s":       round(time.time() - self.started, 1),
+                "requests":       total,
+                "by_route":       {r: dict(c) for r, c in self.counts.items()},
+                "items":          dict(self.items),
+                "avg_latency_ms": round(self.latency_s / total * 1000, 2) if total else 0.0,
+            }
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    """
+    Subclasses set `routes = {("POST", "/path/"): "method_name", ...}` and
+    implement handlers returning (status, body_dict, items_processed).
+    Regex routes go in `pattern_routes = [("GET", re.compile(...), "method_name")]`.
+    """
+
+    protocol_version = "HTTP/1.1"
+    routes           = {}
+    pattern_routes   = []
+    faults: FaultConfig = None
+    stats:  Stats       = None
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def json_body(self) -> dict:
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError as exc:
+            raise BadRequest(f"Malformed JSON body: {exc}") from exc
+        if not isinstance(body, dict):
+            raise BadRequest("JSON body must be an object")
+        return body
+
+    def _dispatch(self, method: str):
+        if self.path.startswith("/__"):
+            return self._control(method)
+
+        started = time.monotonic()
+        handler, args = self.routes.get((method, self.path)), ()
+        if handler is None:
+            for m, pattern, name in self.pattern_routes:
+                match = pattern.match(self.path)
+                if m == method and match:
+                    handler, args = name, match.groups()
+                    break
+        if handler is None:
+            self._drain()
+            return self._respond(404, {"error": "Not found"})
+
+        route  = f"{method} {self.path if not args else handler}"
+        faults = self.faults
+        if not faults.allow():
+            self._drain()
+            status, body, items = 429, {"error": "Rate limit exceeded"}, 0
+        else:
+            delay = faults.sample_latency()
+            if faults.timeout_rate and random.random() < faults.timeout_rate:
+                delay = max(delay, faults.timeout_s)
+            if delay:
+                time.sleep(delay)
+            if faults.error_rate and random.random() < faults.error_rate:
+                self._drain()
+                status, body, items = 503, {"error": "Service temporarily unavailable"}, 0
+            else:
+                try:
+                    status, body, items = getattr(self, handler)(*args)
+                except BadRequest as exc:
+                    status, body, items = 400, {"error": str(exc)}, 0
+
+        self.stats.record(route, status, items, time.monotonic() - started)
+        self._respond(status, body)
+
+    def _control(self, method: str):
+        if self.path == "/__stats__" and method == "GET":
+            return self._respond(200, self.stats.as_dict())
+        if self.path == "/__stats__/reset" and method == "POST":
+            self._drain()
+            self.stats.reset()
+            return self._respond(200, {"reset": True})
+        if self.path == "/__faults__":
+            if method == "POST":
+                try:
+                    self.faults.update(self.json_body())
+                except BadRequest as exc:
+                    return self._respond(400, {"error": str(exc)})
+            return self._respond(200, self.faults.as_dict())
+        self._drain()
+        self._respond(404, {"error": "Not found"})
+
+    def _drain(self):
+        """Consume any unread request body so the keep-alive connection stays usable."""
+        length = int(self.headers.get("Content-Length", 0))
+        if length:
+            self.rfile.read(length)
+
+    def _respond(self, code, data):
+        payload = json.dumps(data).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *_):
+        pass
+
+
+class MockServer(ThreadingHTTPServer):
+    daemon_threads      = True
+    request_queue_size  = 1024
+
+
+def serve(handler_cls, prefix: str, port: int, name: str):
+    handler_cls.faults = FaultConfig(prefix)
+    handler_cls.stats  = Stats()
+    server = MockServer(("0.0.0.0", port), handler_cls)
+    print(f"{name} running on :{port} (threaded) faults={handler_cls.faults.as_dict()}", flush=True)
+    server.serve_forever()
@@ -1,44 +1,44 @@
 """
 EBM Mock Server — simulates Rwanda Revenue Authority EBM API.
 Run: python ebm_server.py
-Listens on port 8001.
+Listens on port 8001 (threaded; fault injection via EBM_* env vars, see common.py).
+
+  POST /api/ebm/sign/        one receipt
+  POST /api/ebm/sign-batch/  {"receipts": [...]} → {"receipts": [...]}
 """
 
-import hashlib, json, uuid
-from http.server import BaseHTTPRequestHandler, HTTPServer
+import hashlib, os, uuid
+
+from common import MockHandler, serve
 
 
-class EBMHandler(BaseHTTPRequestHandler):
-    def do_POST(self):
-        if self.path == "/api/ebm/sign/":
-            length = int(self.headers.get("Content-Length", 0))
-            body   = json.loads(self.rfile.read(length))
+def _sign(body):
+    receipt_num = f"EBM-RW-{uuid.uuid4().hex[:8].upper()}"
+    signature   = hashlib.sha256(
+        f"{body['transaction_id']}{body['amount']}{receipt_num}".encode()
+    ).hexdigest()
+    return {
+        "transaction_id": body["transaction_id"],
+        "receipt_number": receipt_num,
+        "signature":      signature,
+        "timestamp":      body.get("timestamp", ""),
+        "authority":      "Rwanda Revenue Authority",
+    }
 
-            receipt_num = f"EBM-RW-{uuid.uuid4().hex[:8].upper()}"
-            signature   = hashlib.sha256(
-                f"{body['transaction_id']}{body['amount']}{receipt_num}".encode()
-            ).hexdigest()
 
-            self._respond(200, {
-                "receipt_number": receipt_num,
-                "signature":      signature,
-                "timestamp":      body.get("timestamp", ""),
-                "authority":      "Rwanda Revenue Authority",
-            })
-        else:
-            self._respond(404, {"error": "Not found"})
+class EBMHandler(MockHandler):
+    routes = {
+        ("POST", "/api/ebm/sign/"):       "sign",
+        ("POST", "/api/ebm/sign-batch/"): "sign_batch",
+    }
 
-    def _respond(self, code, data):
-        self.send_response(code)
-        self.send_header("Content-Type", "application/json")
-        self.end_headers()
-        self.wfile.write(json.dumps(data).encode())
+    def sign(self):
+        return 200, _sign(self.json_body()), 1
 
-    def log_message(self, *_):
-        pass
+    def sign_batch(self):
+        receipts = [_sign(r) for r in self.json_body().get("receipts", [])]
+        return 200, {"receipts": receipts}, len(receipts)
 
 
 if __name__ == "__main__":
-    server = HTTPServer(("0.0.0.0", 8001), EBMHandler)
-    print("EBM Mock running on :8001")
-    server.serve_forever()
+    serve(EBMHandler, "EBM", int(os.environ.get("PORT", 8001)), "EBM Mock")
@@ -1,40 +1,43 @@
 """
 RURA Mock Server — simulates Rwanda Utilities Regulatory Authority license API.
 All licenses starting with 'INVALID' return invalid; others return valid.
-Listens on port 8002.
+Listens on port 8002 (threaded; fault injection via RURA_* env vars, see common.py).
+
+  GET  /api/gov/rura/verify-license/<license>/
+  POST /api/gov/rura/verify-licenses/   {"licenses": [...]} → {"results": [...]}
 """
 
-import json, re
-from http.server import BaseHTTPRequestHandler, HTTPServer
+import os, re
+
+from common import MockHandler, serve
+
+
+def _verify(license_no):
+    is_valid = not license_no.startswith("INVALID")
+    return {
+        "license_number":   license_no,
+        "valid":            is_valid,
+        "insurance_active": is_valid,
+        "expiry_date":      "2026-12-31" if is_valid else "2023-01-01",
+        "authority":        "RURA Rwanda",
+    }
 
 
-class RURAHandler(BaseHTTPRequestHandler):
-    def do_GET(self):
-        match = re.match(r"/api/gov/rura/verify-license/(.+)/", self.path)
-        if match:
-            license_no = match.group(1)
-            is_valid   = not license_no.startswith("INVALID")
-            self._respond(200, {
-                "license_number":   license_no,
-                "valid":            is_valid,
-                "insurance_active": is_valid,
-                "expiry_date":      "2026-12-31" if is_valid else "2023-01-01",
-                "authority":        "RURA Rwanda",
-            })
-        else:
-            self._respond(404, {"error": "Not found"})
+class RURAHandler(MockHandler):
+    routes = {
+        ("POST", "/api/gov/rura/verify-licenses/"): "verify_batch",
+    }
+    pattern_routes = [
+        ("GET", re.compile(r"^/api/gov/rura/verify-license/(.+)/$"), "verify"),
+    ]
 
-    def _respond(self, code, data):
-        self.send_response(code)
-        self.send_header("Content-Type", "application/json")
-        self.end_headers()
-        self.wfile.write(json.dumps(data).encode())
+    def verify(self, license_no):
+        return 200, _verify(license_no), 1
 
-    def log_message(self, *_):
-        pass
+    def verify_batch(self):
+        results = [_verify(l) for l in self.json_body().get("licenses", [])]
+        return 200, {"results": results}, len(results)
 
 
 if __name__ == "__main__":
-    server = HTTPServer(("0.0.0.0", 8002), RURAHandler)
-    print("RURA Mock running on :8002")
-    server.serve_forever()
+    serve(RURAHandler, "RURA", int(os.environ.get("PORT", 8002)), "RURA Mock")
@@ -0,0 +1,37 @@
+"""
+SMS Gateway Mock — simulates a Rwandan carrier SMS aggregator.
+Listens on port 8003 (threaded; fault injection via SMS_* env vars, see common.py).
+
+  POST /send        {"phone", "message"}                       → {"message_id", "status"}
+  POST /send-bulk   {"messages": [{"phone", "message"}, ...]}  → {"results": [...]}
+"""
+
+import os, uuid
+
+from common import MockHandler, serve
+
+
+def _accept(phone):
+    return {"phone": phone, "message_id": f"SMS-{uuid.uuid4().hex[:12]}", "status": "ACCEPTED"}
+
+
+class SMSHandler(MockHandler):
+    routes = {
+        ("POST", "/send"):      "send",
+        ("POST", "/send-bulk"): "send_bulk",
+    }
+
+    def send(self):
+        body = self.json_body()
+        if not body.get("phone") or not body.get("message"):
+            return 400, {"error": "phone and message are required"}, 0
+        return 200, _accept(body["phone"]), 1
+
+    def send_bulk(self):
+        messages = self.json_body().get("messages", [])
+        results  = [_accept(m.get("phone", "")) for m in messages]
+        return 200, {"results": results}, len(results)
+
+
+if __name__ == "__main__":
+    serve(SMSHandler, "SMS", int(os.environ.get("PORT", 8003)), "SMS Mock")
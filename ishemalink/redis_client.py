@@ -0,0 +1,14 @@
+"""Raw Redis access for hot-path data structures (hashes, pipelines)."""
+
+
+def get_redis():
+    """
+    The django-redis connection behind the default cache, or None when the
+    cache is not Redis-backed (tests, local dev) — callers fall back to an
+    in-process structure.
+    """
+    try:
+        from django_redis import get_redis_connection
+        return get_redis_connection("default")
+    except (ImportError, NotImplementedError):
+        return None
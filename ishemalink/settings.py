@@ -3,10 +3,13 @@ IshemaLink – Production-oriented Django settings.
 Rwanda data-sovereignty: all data stored in-country (AOS / KtRN cloud).
 """
 
+import json
 import os
 from pathlib import Path
 from datetime import timedelta
 
+from celery.schedules import crontab
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 SECRET_KEY = os.environ.get("DJANGO_SECRET_KEY", "CHANGE-ME-IN-PRODUCTION")
@@ -121,6 +124,41 @@ CELERY_TASK_SERIALIZER = "json"
 CELERY_ACCEPT_CONTENT  = ["json"]
 CELERY_TIMEZONE        = "Africa/Kigali"
 
+CELERY_BEAT_SCHEDULE = {
+    "sign-pending-ebm-receipts": {
+        "task":     "apps.govtech.tasks.sign_pending_ebm_receipts",
+        "schedule": 15.0,   # seconds
+    },
+    "resign-fallback-ebm-receipts": {
+        "task":     "apps.govtech.tasks.resign_fallback_receipts",
+        "schedule": 60.0,
+    },
+    "flush-gps-buffer": {
+        "task":     "apps.tracking.tasks.flush_gps_buffer",
+        "schedule": 5.0,
+    },
+    "refresh-eta-matrix": {
+        "task":     "apps.shipments.tasks.refresh_eta_matrix",
+        "schedule": 600.0,
+    },
+    "flush-gps-trails": {
+        "task":     "apps.tracking.tasks.flush_gps_trails",
+        "schedule": 300.0,
+    },
+    "dispatch-outbox": {
+        "task":     "apps.notifications.tasks.dispatch_outbox",
+        "schedule": 30.0,   # retries and anything whose on-commit dispatch was lost
+    },
+    "compact-analytics-cube": {
+        "task":     "apps.analytics.tasks.compact_analytics_cube",
+        "schedule": crontab(hour=2, minute=30),   # nightly, Africa/Kigali
+    },
+    "export-bulk-datasets": {
+        "task":     "apps.analytics.tasks.export_bulk_datasets",
+        "schedule": crontab(hour=3, minute=0),
+    },
+}
+
 # ── Auth ──────────────────────────────────────────────────────────────────────
 AUTH_USER_MODEL = "authentication.Agent"
 
@@ -210,5 +248,87 @@ RRA_EBM_BASE_URL    = os.environ.get("RRA_EBM_BASE_URL",    "http://ebm-mock:800
 RURA_API_BASE_URL   = os.environ.get("RURA_API_BASE_URL",   "http://rura-mock:8002")
 SMS_GATEWAY_URL     = os.environ.get("SMS_GATEWAY_URL",     "http://sms-mock:8003")
 
+# ── SMS throughput (broadcasts) ───────────────────────────────────────────────
+SMS_GATEWAY_BULK    = os.environ.get("SMS_GATEWAY_BULK", "True") == "True"    # gateway has /send-bulk
+SMS_BULK_SIZE       = int(os.environ.get("SMS_BULK_SIZE",       "100"))    # messages per bulk request
+SMS_BULK_TIMEOUT    = float(os.environ.get("SMS_BULK_TIMEOUT",  "10.0"))
+SMS_CONCURRENCY     = int(os.environ.get("SMS_CONCURRENCY",     "16"))     # parallel gateway requests per worker
+SMS_RATE_LIMIT      = int(os.environ.get("SMS_RATE_LIMIT",      "500"))    # messages/second, all workers
+SMS_BROADCAST_CHUNK = int(os.environ.get("SMS_BROADCAST_CHUNK", "1000"))   # recipients per Celery task
+
+# ── Notification outbox ───────────────────────────────────────────────────────
+OUTBOX_BATCH_SIZE    = int(os.environ.get("OUTBOX_BATCH_SIZE",      "200"))   # messages claimed per round
+OUTBOX_MAX_ATTEMPTS  = int(os.environ.get("OUTBOX_MAX_ATTEMPTS",    "6"))     # then FAILED
+OUTBOX_RETRY_BASE    = float(os.environ.get("OUTBOX_RETRY_BASE",    "30.0"))  # seconds, doubled per attempt
+OUTBOX_CLAIM_TIMEOUT = int(os.environ.get("OUTBOX_CLAIM_TIMEOUT",   "120"))   # lease before another worker retries
+OUTBOX_DEDUPE_WINDOW = int(os.environ.get("OUTBOX_DEDUPE_WINDOW",   "600"))   # identical message again → dropped
+SMS_COALESCE_WINDOW  = int(os.environ.get("SMS_COALESCE_WINDOW",    "15"))    # hold SMS to merge same-phone messages
+SMS_MAX_PARTS        = int(os.environ.get("SMS_MAX_PARTS",          "3"))     # largest coalesced multi-part SMS
+
+# ── Dashboard / analytics response cache (stale-while-revalidate) ─────────────
+SWR_LOCK_TIMEOUT = int(os.environ.get("SWR_LOCK_TIMEOUT",   "60"))    # max seconds one recompute may hold a key
+SWR_WAIT_TIMEOUT = float(os.environ.get("SWR_WAIT_TIMEOUT", "5.0"))   # how long a miss waits for another worker
+
+# ── SMS delivery receipts ─────────────────────────────────────────────────────
+SMS_DLR_TOKEN        = os.environ.get("SMS_DLR_TOKEN", "")                     # shared with the gateway; empty = endpoint off
+SMS_DLR_MAX_RECEIPTS = int(os.environ.get("SMS_DLR_MAX_RECEIPTS",   "20000"))  # per callback request
+SMS_DLR_CHUNK        = int(os.environ.get("SMS_DLR_CHUNK",          "1000"))   # receipts per SELECT + bulk_update
+
+# ── GovTech throughput (EBM batch signing) ────────────────────────────────────
+GOVTECH_HTTP_POOL_SIZE = int(os.environ.get("GOVTECH_HTTP_POOL_SIZE", "16"))
+GOVTECH_CONNECT_TIMEOUT = float(os.environ.get("GOVTECH_CONNECT_TIMEOUT", "1.0"))
+EBM_READ_TIMEOUT        = float(os.environ.get("EBM_READ_TIMEOUT",        "3.0"))
+EBM_BATCH_READ_TIMEOUT  = float(os.environ.get("EBM_BATCH_READ_TIMEOUT",  "10.0"))
+RURA_READ_TIMEOUT       = float(os.environ.get("RURA_READ_TIMEOUT",       "2.0"))
+EBM_BATCH_SIZE         = int(os.environ.get("EBM_BATCH_SIZE",         "50"))    # receipts per EBM request
+EBM_SIGN_CONCURRENCY   = int(os.environ.get("EBM_SIGN_CONCURRENCY",   "8"))     # parallel EBM requests
+EBM_SIGN_CHUNK_SIZE    = int(os.environ.get("EBM_SIGN_CHUNK_SIZE",    "1000"))  # payments per DB chunk
+EBM_RESIGN_RATE        = float(os.environ.get("EBM_RESIGN_RATE",      "20"))    # fallback re-signs per second
+EBM_RESIGN_MAX_PER_RUN = int(os.environ.get("EBM_RESIGN_MAX_PER_RUN", "1000"))  # per beat run (60 s)
+
+# Circuit breakers (apps.govtech.resilience) — state shared across processes via Redis
+GOVTECH_CIRCUIT_BREAKERS = {
+    "ebm":  {"failure_rate": 0.5, "min_calls": 10, "window": 30, "reset_timeout": 15, "max_concurrent": 16},
+    "rura": {"failure_rate": 0.5, "min_calls": 10, "window": 30, "reset_timeout": 15, "max_concurrent": 8},
+}
+
+# ── Live tracking ─────────────────────────────────────────────────────────────
+GPS_REPLAY_TOLERANCE_M   = float(os.environ.get("GPS_REPLAY_TOLERANCE_M",   "10.0"))   # default Douglas–Peucker tolerance
+GPS_FANOUT_RATE          = float(os.environ.get("GPS_FANOUT_RATE",          "0.5"))    # max WS publishes per driver per second
+GPS_UPLOAD_MAX_FIXES     = int(os.environ.get("GPS_UPLOAD_MAX_FIXES",       "20000"))  # per offline upload
+GPS_UPLOAD_MAX_BYTES     = int(os.environ.get("GPS_UPLOAD_MAX_BYTES",       "4000000")) # decompressed upload body
+FLEET_TILE_PRECISION     = int(os.environ.get("FLEET_TILE_PRECISION",       "4"))      # geohash chars (~39 × 20 km tiles)
+FLEET_MAX_TILES          = int(os.environ.get("FLEET_MAX_TILES",            "256"))    # per fleet viewport
+FLEET_STALE_AFTER        = float(os.environ.get("FLEET_STALE_AFTER",        "600"))    # seconds before a silent truck leaves the map
+FLEET_PUSH_RATE          = float(os.environ.get("FLEET_PUSH_RATE",          "1.0"))    # diff messages per fleet socket per second
+GEOFENCE_CELL_DEG        = float(os.environ.get("GEOFENCE_CELL_DEG",        "0.05"))   # grid index cell (~5.5 km)
+GEOFENCE_RELOAD_INTERVAL = float(os.environ.get("GEOFENCE_RELOAD_INTERVAL", "300"))    # seconds between fence/route reloads
+GEOFENCE_DWELL_FIXES     = int(os.environ.get("GEOFENCE_DWELL_FIXES",       "3"))      # consecutive fixes in the destination before DELIVERED
+GEOFENCE_DWELL_SECONDS   = float(os.environ.get("GEOFENCE_DWELL_SECONDS",   "120"))    # …or this long inside it, whichever comes first
+
+# ── ETA engine (apps.shipments.eta) ───────────────────────────────────────────
+ETA_MAX_SAMPLES    = int(os.environ.get("ETA_MAX_SAMPLES",    "200"))  # recent deliveries kept per zone pair
+ETA_MIN_SAMPLES    = int(os.environ.get("ETA_MIN_SAMPLES",    "3"))    # below this a corridor has no ETA
+ETA_MATRIX_TTL     = float(os.environ.get("ETA_MATRIX_TTL",   "60"))   # seconds between in-memory reloads
+ETA_SETTLE_SECONDS = int(os.environ.get("ETA_SETTLE_SECONDS", "300"))  # deliveries younger than this wait a refresh
+
+# ── Bulk dataset exports (MINICOM / RRA) ──────────────────────────────────────
+# Any Django storage backend; for MinIO e.g. EXPORT_STORAGE_BACKEND=storages.backends.s3.S3Storage
+# with EXPORT_STORAGE_OPTIONS='{"bucket_name": "ishemalink-exports", "endpoint_url": "http://minio:9000"}'
+EXPORT_STORAGE = {
+    "BACKEND": os.environ.get("EXPORT_STORAGE_BACKEND", "django.core.files.storage.FileSystemStorage"),
+    "OPTIONS": json.loads(os.environ.get("EXPORT_STORAGE_OPTIONS", "{}")) or {"location": str(BASE_DIR / "exports")},
+}
+EXPORT_FORMAT         = os.environ.get("EXPORT_FORMAT", "csv")                 # csv (gzip) | parquet (needs pyarrow)
+EXPORT_CHUNK          = int(os.environ.get("EXPORT_CHUNK",          "5000"))     # keyset page / Parquet row group
+EXPORT_FILE_ROWS      = int(os.environ.get("EXPORT_FILE_ROWS",      "1000000"))  # rows per file within a month
+EXPORT_SETTLE_SECONDS = int(os.environ.get("EXPORT_SETTLE_SECONDS", "300"))      # rows younger than this wait a run
+
+# ── Distinct-count sketches (apps.analytics.sketches) ─────────────────────────
+HLL_PRECISION = int(os.environ.get("HLL_PRECISION", "12"))   # 2^p registers: ±1.6% at 12; rebuild sketches after changing
+
+# ── Driver delivery stats (apps.analytics.drivers) ────────────────────────────
+DRIVER_STATS_ACCURACY = float(os.environ.get("DRIVER_STATS_ACCURACY", "0.01"))   # relative error of p50/p90 durations
+
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 CORS_ALLOW_ALL_ORIGINS = DEBUG
@@ -13,8 +13,9 @@ import pytest
 import uuid
 import json
 import threading
+import itertools
 from decimal import Decimal
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, ANY
 
 from django.test import TestCase, Client, TransactionTestCase
 from django.contrib.auth import get_user_model
@@ -28,6 +29,15 @@ Agent = get_user_model()
 # FIXTURES
 # ═══════════════════════════════════════════════════════════════════════════════
 
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Circuit breaker state and other shared counters live in the cache."""
+    from django.core.cache import cache
+    cache.clear()
+    yield
+    cache.clear()
+
+
 @pytest.fixture
 def api_client():
     return APIClient()
@@ -743,8 +753,8 @@ class TestNotifications:
         with patch("apps.notifications.service.NotificationService.send_sms", return_value=True):
             resp = admin_client.post("/api/notifications/broadcast/",
                                      {"message": "Test broadcast"}, format="json")
-        assert resp.status_code == 200
-        assert "sent_to" in resp.data
+        assert resp.status_code == 202
+        assert resp.data["status"] == "QUEUED" and "job_id" in resp.data
 
 
 @pytest.mark.django_db
@@ -784,3 +794,2221 @@ class TestRegistrationAndAuth:
         resp = auth_client.get("/api/auth/me/")
         assert resp.status_code == 200
         assert resp.data["phone"] == sender.phone
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# GOVTECH — Batched EBM receipt signing
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def _pay(shipment):
+    """A SUCCESS mobile-money payment for `shipment`."""
+    from apps.payments.models import Payment
+
+    return Payment.objects.create(
+        shipment=shipment, provider="MTN_MOMO",
+        amount=shipment.total_amount, payer_phone=shipment.sender.phone,
+        status=Payment.Status.SUCCESS,
+    )
+
+
+def _ebm_batch_response(*args, json=None, **kwargs):
+    resp = MagicMock(status_code=200)
+    resp.json.return_value = {"receipts": [
+        {"transaction_id": r["transaction_id"],
+         "receipt_number": f"EBM-RW-{r['transaction_id'][:8]}",
+         "signature": "sig"}
+        for r in json["receipts"]
+    ]}
+    return resp
+
+
+@pytest.mark.django_db
+class TestEBMBatchSigning:
+
+    def test_sweeper_signs_all_unsigned_payments(self, sender, zones, commodity, make_shipment):
+        from apps.govtech.tasks import sign_pending_ebm_receipts
+        from apps.payments.models import Payment
+
+        payments = [_pay(make_shipment(sender, zones, commodity, f"EBM-B-{i:03d}", status="PAID")) for i in range(5)]
+
+        session = MagicMock()
+        session.request.side_effect = _ebm_batch_response
+        with patch("apps.govtech.connectors.get_session", return_value=session):
+            signed = sign_pending_ebm_receipts()
+
+        assert signed == 5
+        assert session.request.call_count == 3          # EBM_BATCH_SIZE=2 in tests
+        assert not Payment.objects.filter(ebm_signed=False).exists()
+        for p in Payment.objects.select_related("shipment"):
+            assert p.shipment.ebm_receipt_number.startswith("EBM-RW-")
+
+    def test_batch_failure_falls_back_to_local_receipts(self, sender, zones, commodity, make_shipment):
+        import requests
+        from apps.govtech.connectors import RRAConnector
+
+        payments = [_pay(make_shipment(sender, zones, commodity, f"EBM-F-{i:03d}", status="PAID")) for i in range(3)]
+
+        session = MagicMock()
+        session.request.side_effect = requests.ConnectionError("RRA down")
+        with patch("apps.govtech.connectors.get_session", return_value=session):
+            results = RRAConnector().sign_receipts(payments)
+
+        assert len(results) == 3
+        assert all(r["fallback"] and r["receipt_number"].startswith("LOCAL-") for r in results.values())
+
+
+@pytest.mark.django_db
+class TestEBMFallbackResign:
+
+    def _fallback_payments(self, make_shipment, sender, zones, commodity, n):
+        import requests
+        from apps.govtech.tasks import sign_pending_ebm_receipts
+
+        for i in range(n):
+            _pay(make_shipment(sender, zones, commodity, f"EBM-L-{i:03d}", status="PAID"))
+        session = MagicMock()
+        session.request.side_effect = requests.ConnectionError("RRA down")
+        with patch("apps.govtech.connectors.get_session", return_value=session):
+            sign_pending_ebm_receipts()
+
+    def test_fallback_receipts_are_recorded(self, sender, zones, commodity, make_shipment):
+        from apps.payments.models import Payment
+
+        self._fallback_payments(make_shipment, sender, zones, commodity, 2)
+        for p in Payment.objects.select_related("shipment"):
+            assert p.ebm_status == Payment.EbmStatus.FALLBACK
+            assert p.ebm_fallback_at is not None
+            assert p.shipment.ebm_receipt_number.startswith("LOCAL-")
+
+    def test_sweeper_resigns_once_ebm_recovers(self, sender, zones, commodity, make_shipment):
+        from apps.govtech.tasks import resign_fallback_receipts
+        from apps.payments.models import Payment
+
+        self._fallback_payments(make_shipment, sender, zones, commodity, 3)
+        session = MagicMock()
+        session.request.side_effect = _ebm_batch_response
+        with patch("apps.govtech.connectors.get_session", return_value=session):
+            assert resign_fallback_receipts() == 3
+
+        assert not Payment.objects.filter(ebm_status=Payment.EbmStatus.FALLBACK).exists()
+        for p in Payment.objects.select_related("shipment"):
+            assert p.shipment.ebm_receipt_number.startswith("EBM-RW-")
+
+    def test_sweeper_leaves_fallbacks_while_ebm_down(self, sender, zones, commodity, make_shipment):
+        import requests
+        from apps.govtech.tasks import resign_fallback_receipts
+        from apps.payments.models import Payment
+
+        self._fallback_payments(make_shipment, sender, zones, commodity, 2)
+        session = MagicMock()
+        session.request.side_effect = requests.ConnectionError("still down")
+        with patch("apps.govtech.connectors.get_session", return_value=session):
+            assert resign_fallback_receipts() == 0
+        assert Payment.objects.filter(ebm_status=Payment.EbmStatus.FALLBACK).count() == 2
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# GOVTECH — Circuit breakers
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class TestCircuitBreaker:
+
+    def _failing(self):
+        import requests
+        raise requests.ConnectionError("RRA timeout")
+
+    def test_trips_after_failure_rate_and_fails_fast(self):
+        import requests
+        from apps.govtech.resilience import CircuitBreaker, CircuitOpenError, OPEN
+
+        breaker = CircuitBreaker("test-trip", min_calls=4, failure_rate=0.5)
+        for _ in range(4):
+            with pytest.raises(requests.ConnectionError):
+                breaker.call(self._failing)
+        assert breaker.state == OPEN
+
+        probe = MagicMock()
+        with pytest.raises(CircuitOpenError):
+            breaker.call(probe)
+        probe.assert_not_called()
+        assert breaker.rejections == 1
+
+    def test_half_open_probe_success_closes_circuit(self):
+        from apps.govtech.resilience import CircuitBreaker, CLOSED, HALF_OPEN
+
+        breaker = CircuitBreaker("test-probe", reset_timeout=0)
+        breaker.trip()
+        assert breaker.state == HALF_OPEN
+        assert breaker.call(lambda: "ok") == "ok"
+        assert breaker.state == CLOSED
+
+    def test_recovery_starts_a_fresh_window(self):
+        import requests
+        from apps.govtech.resilience import CircuitBreaker, CLOSED
+
+        breaker = CircuitBreaker("test-recover", min_calls=4, failure_rate=0.5, window=3600, reset_timeout=0)
+        for _ in range(4):
+            with pytest.raises(requests.ConnectionError):
+                breaker.call(self._failing)
+        assert breaker.call(lambda: "ok") == "ok"               # half-open probe closes it
+        with pytest.raises(requests.ConnectionError):
+            breaker.call(self._failing)
+        assert breaker.state == CLOSED
+
+    def test_unexpected_probe_error_releases_probe(self):
+        from apps.govtech.resilience import CircuitBreaker, HALF_OPEN
+
+        breaker = CircuitBreaker("test-probe-error", reset_timeout=0)
+        breaker.trip()
+
+        def bad_response():
+            raise ValueError("unparseable body")
+
+        with pytest.raises(ValueError):
+            breaker.call(bad_response)
+        assert breaker.state == HALF_OPEN
+        assert breaker.call(lambda: "ok") == "ok"
+
+    def test_open_rura_circuit_defers_instead_of_unverifying(self):
+        from apps.govtech.connectors import RURAConnector
+        from apps.govtech.resilience import get_breaker, ConnectorUnavailable
+
+        get_breaker("rura").trip()
+        with patch("apps.govtech.connectors.get_session") as session:
+            with pytest.raises(ConnectorUnavailable):
+                RURAConnector().verify_license("RW-DRV-001")
+        session.assert_not_called()
+
+    @pytest.mark.django_db
+    def test_rura_outage_retry_is_capped_by_the_task(self, sender, driver_agent, zones, commodity, django_capture_on_commit_callbacks, make_shipment):
+        from celery.exceptions import Retry
+        from apps.govtech.resilience import ConnectorUnavailable
+        from apps.shipments.service import BookingService
+        from apps.shipments.tasks import retry_driver_assignment
+
+        shipment = _pay(make_shipment(sender, zones, commodity, "CB-001", status="PAID")).shipment
+        rura     = MagicMock(verify_license=MagicMock(side_effect=ConnectorUnavailable("RURA down")))
+        with patch("apps.shipments.tasks.retry_driver_assignment.apply_async") as deferred:
+            with django_capture_on_commit_callbacks(execute=True):
+                BookingService(rura_connector=rura, notification_service=MagicMock()).assign_driver(shipment)
+                deferred.assert_not_called()             # queued only once the payment commits
+        deferred.assert_called_once()
+
+        with patch("apps.shipments.service.RURAConnector", return_value=rura), \
+             patch("apps.shipments.tasks.retry_driver_assignment.apply_async") as rescheduled, \
+             patch.object(retry_driver_assignment, "retry", side_effect=Retry()) as retry:
+            with pytest.raises(Retry):
+                retry_driver_assignment.run(str(shipment.pk))
+        rescheduled.assert_not_called()                  # no side chain past max_retries
+        assert isinstance(retry.call_args.kwargs["exc"], ConnectorUnavailable)
+
+    @pytest.mark.django_db
+    def test_rura_outage_retry_is_dropped_with_a_rolled_back_payment(self, sender, driver_agent, zones, commodity, django_capture_on_commit_callbacks, make_shipment):
+        from django.db import transaction
+        from apps.govtech.resilience import ConnectorUnavailable
+        from apps.shipments.service import BookingService
+
+        shipment = _pay(make_shipment(sender, zones, commodity, "CB-002", status="PAID")).shipment
+        rura     = MagicMock(verify_license=MagicMock(side_effect=ConnectorUnavailable("RURA down")))
+        with patch("apps.shipments.tasks.retry_driver_assignment.apply_async") as deferred, \
+             django_capture_on_commit_callbacks(execute=True) as callbacks:
+            with pytest.raises(RuntimeError), transaction.atomic():
+                BookingService(rura_connector=rura, notification_service=MagicMock()).assign_driver(shipment)
+                raise RuntimeError("confirm_payment failed after assignment was deferred")
+        assert callbacks == []
+        deferred.assert_not_called()
+
+    @pytest.mark.django_db
+    def test_rura_outage_returns_503(self, auth_client):
+        from apps.govtech.resilience import get_breaker
+
+        get_breaker("rura").trip()
+        resp = auth_client.get("/api/gov/rura/verify-license/RW-DRV-001/")
+        assert resp.status_code == 503
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# MOCKS — Fault injection & control endpoints
+# ═══════════════════════════════════════════════════════════════════════════════
+
+@pytest.fixture
+def mock_server(monkeypatch):
+    """An echo mock on an ephemeral port; yields a request(method, path, body) helper."""
+    import http.client
+    import pathlib
+    import sys
+
+    monkeypatch.syspath_prepend(str(pathlib.Path(__file__).resolve().parents[1] / "docker" / "mocks"))
+    from common import FaultConfig, MockHandler, MockServer, Stats
+
+    class EchoHandler(MockHandler):
+        routes = {("POST", "/echo/"): "echo"}
+
+        def echo(self):
+            body = self.json_body()
+            return 200, body, len(body)
+
+    EchoHandler.faults, EchoHandler.stats = FaultConfig("TEST_MOCK"), Stats()
+    server = MockServer(("127.0.0.1", 0), EchoHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    def request(method, path, body=None):
+        conn = http.client.HTTPConnection(*server.server_address, timeout=5)
+        raw  = body if isinstance(body, bytes) else (json.dumps(body).encode() if body is not None else None)
+        conn.request(method, path, body=raw, headers={"Content-Type": "application/json"})
+        response = conn.getresponse()
+        status, data = response.status, json.loads(response.read())
+        conn.close()
+        return status, data
+
+    yield request
+    server.shutdown()
+    server.server_close()
+    sys.modules.pop("common", None)
+
+
+class TestMockServers:
+
+    def test_malformed_json_is_answered_400(self, mock_server):
+        assert mock_server("POST", "/echo/", b"{not json")[0] == 400
+        assert mock_server("POST", "/echo/", [1, 2])[0] == 400
+        assert mock_server("POST", "/__faults__", b"{")[0] == 400
+        assert mock_server("POST", "/__faults__", {"error_rate": "lots"})[0] == 400
+        assert mock_server("GET", "/__faults__")[1]["error_rate"] == 0.0
+        assert mock_server("POST", "/echo/", {"ok": 1}) == (200, {"ok": 1})
+
+    def test_latency_knob_delays_responses(self, mock_server):
+        import time
+
+        mock_server("POST", "/__faults__", {"latency_dist": "fixed", "latency_ms": 150})
+        started = time.monotonic()
+        assert mock_server("POST", "/echo/", {})[0] == 200
+        assert time.monotonic() - started >= 0.15
+        assert mock_server("GET", "/__stats__")[1]["avg_latency_ms"] >= 150
+
+    def test_error_rate_knob_answers_503(self, mock_server):
+        mock_server("POST", "/__faults__", {"error_rate": 1.0})
+        assert mock_server("POST", "/echo/", {"a": 1})[0] == 503
+        mock_server("POST", "/__faults__", {"error_rate": 0})
+        assert mock_server("POST", "/echo/", {"a": 1})[0] == 200
+
+    def test_rate_limit_knob_answers_429_once_bucket_is_empty(self, mock_server):
+        mock_server("POST", "/__faults__", {"rate_limit": 1})
+        assert [mock_server("POST", "/echo/", {})[0] for _ in range(2)] == [200, 429]
+
+    def test_stats_count_routes_statuses_and_items_until_reset(self, mock_server):
+        mock_server("POST", "/echo/", {"a": 1, "b": 2})
+        mock_server("POST", "/echo/", b"{")
+        mock_server("GET", "/nowhere/")
+
+        _, stats = mock_server("GET", "/__stats__")
+        assert stats["requests"] == 2
+        assert stats["by_route"] == {"POST /echo/": {"200": 1, "400": 1}}
+        assert stats["items"] == {"POST /echo/": 2}
+
+        assert mock_server("POST", "/__stats__/reset") == (200, {"reset": True})
+        assert mock_server("GET", "/__stats__")[1]["requests"] == 0
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# GOVTECH — Audit log pagination & export
+# ═══════════════════════════════════════════════════════════════════════════════
+
+@pytest.mark.django_db
+class TestAuditLog:
+
+    @pytest.fixture
+    def events(self, sender, zones, commodity, make_shipment):
+        from apps.shipments.models import ShipmentEvent
+
+        first  = _pay(make_shipment(sender, zones, commodity, "AUD-001", status="PAID")).shipment
+        second = _pay(make_shipment(sender, zones, commodity, "AUD-002", status="PAID")).shipment
+        for i in range(5):
+            ShipmentEvent.objects.create(shipment=first, from_status="CREATED", to_status="PAID", actor=sender, note=f"a{i}")
+        for i in range(3):
+            ShipmentEvent.objects.create(shipment=second, from_status="PAID", to_status="ASSIGNED", note=f"b{i}")
+
+    def test_cursor_pages_cover_every_event_once(self, admin_client, events):
+        seen, cursor = [], None
+        while True:
+            params = {"limit": 3, **({"cursor": cursor} if cursor else {})}
+            resp   = admin_client.get("/api/gov/audit/access-log/", params)
+            assert resp.status_code == 200
+            seen  += [e["note"] for e in resp.data["events"]]
+            cursor = resp.data["next_cursor"]
+            if not cursor:
+                break
+        assert len(seen) == 8 and len(set(seen)) == 8
+        assert seen[0] == "b2"                          # newest first
+
+    def test_filter_by_tracking_code_and_bad_cursor(self, admin_client, events):
+        resp = admin_client.get("/api/gov/audit/access-log/", {"tracking_code": "AUD-002"})
+        assert resp.data["count"] == 3
+        assert all(e["actor"] == "System" for e in resp.data["events"])
+
+        resp = admin_client.get("/api/gov/audit/access-log/", {"cursor": "not-a-cursor"})
+        assert resp.status_code == 400
+
+    def test_limit_is_clamped_to_at_least_one(self, admin_client, events):
+        for limit in (0, -1):
+            resp = admin_client.get("/api/gov/audit/access-log/", {"limit": limit})
+            assert resp.data["count"] == 1 and resp.data["next_cursor"]
+
+    def test_invalid_actor_is_400(self, admin_client, events):
+        resp = admin_client.get("/api/gov/audit/access-log/", {"actor": "not-a-uuid"})
+        assert resp.status_code == 400
+        resp = admin_client.get("/api/gov/audit/access-log/export/", {"actor": "not-a-uuid"})
+        assert resp.status_code == 400
+
+    def test_export_pages_span_every_event(self, admin_client, events):
+        with patch("apps.govtech.views.AUDIT_EXPORT_CHUNK", 3):
+            resp  = admin_client.get("/api/gov/audit/access-log/export/")
+            lines = b"".join(resp.streaming_content).decode().splitlines()
+        notes = [json.loads(line)["note"] for line in lines]
+        assert notes == ["a0", "a1", "a2", "a3", "a4", "b0", "b1", "b2"]
+
+    def test_ndjson_export_streams_chronologically(self, admin_client, events):
+        resp = admin_client.get("/api/gov/audit/access-log/export/")
+        assert resp.status_code == 200
+        assert resp.streaming
+        lines = b"".join(resp.streaming_content).decode().splitlines()
+        assert len(lines) == 8
+        assert json.loads(lines[0])["note"] == "a0"
+
+    def test_csv_export_has_header(self, admin_client, events):
+        resp = admin_client.get("/api/gov/audit/access-log/export/", {"output": "csv", "tracking_code": "AUD-001"})
+        rows = b"".join(resp.streaming_content).decode().splitlines()
+        assert rows[0].startswith("shipment,from_status")
+        assert len(rows) == 6
+        assert resp["Content-Disposition"].endswith('audit-log.csv"')
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# TRACKING — Write-behind GPS buffer
+# ═══════════════════════════════════════════════════════════════════════════════
+
+@pytest.mark.django_db
+class TestGPSBuffer:
+
+    def test_flush_keeps_latest_fix_in_one_bulk_update(self, sender, driver_agent, zones, commodity, django_assert_num_queries, make_shipment):
+        from apps.tracking.buffer import LocationBuffer
+
+        make_shipment(sender, zones, commodity, "GPS-001", driver=driver_agent, status="IN_TRANSIT")
+        buffer = LocationBuffer()
+        buffer.push("GPS-001", -1.95, 30.06, ts=1000.0)
+        buffer.push("GPS-001", -1.50, 29.63, ts=1005.0)
+        buffer.push("GPS-UNKNOWN", 0.0, 0.0)
+
+        with django_assert_num_queries(2):          # code → profile lookup + bulk UPDATE
+            assert buffer.flush() == 1
+
+        driver_agent.driver_profile.refresh_from_db()
+        assert driver_agent.driver_profile.current_lat == -1.50
+        assert driver_agent.driver_profile.last_seen.timestamp() == 1005.0
+        assert buffer.flush() == 0
+
+    def test_flush_never_moves_driver_back_in_time(self, sender, driver_agent, zones, commodity, make_shipment):
+        from datetime import datetime, timezone as dt_timezone
+        from apps.tracking.buffer import LocationBuffer
+
+        make_shipment(sender, zones, commodity, "GPS-003", driver=driver_agent, status="IN_TRANSIT")
+        profile = driver_agent.driver_profile
+        profile.current_lat, profile.current_lng = -2.00, 30.10
+        profile.last_seen = datetime.fromtimestamp(2000.0, tz=dt_timezone.utc)
+        profile.save()
+
+        buffer = LocationBuffer()
+        buffer.push("GPS-003", -1.95, 30.06, ts=1500.0)     # older than the uploaded position
+        assert buffer.flush() == 0
+
+        profile.refresh_from_db()
+        assert profile.current_lat == -2.00
+        assert profile.last_seen.timestamp() == 2000.0
+
+    def test_consumer_fans_out_without_touching_db(self, sender, driver_agent, zones, commodity, make_shipment):
+        from asgiref.sync import async_to_sync
+        from apps.tracking.buffer import location_buffer
+
+        make_shipment(sender, zones, commodity, "GPS-002", driver=driver_agent, status="IN_TRANSIT")
+        location_buffer.flush()
+
+        consumer = _tracking_consumer("GPS-002", driver_agent)
+        async_to_sync(consumer.receive_json)({"lat": -1.95, "lng": 30.06})
+
+        groups = [c.args[0] for c in consumer.channel_layer.group_send.await_args_list]
+        assert groups.count(f"tracking_driver_{driver_agent.pk}") == 1
+        driver_agent.driver_profile.refresh_from_db()
+        assert driver_agent.driver_profile.current_lat is None     # not written yet
+        assert location_buffer.flush() == 1
+        driver_agent.driver_profile.refresh_from_db()
+        assert driver_agent.driver_profile.current_lat == -1.95
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# TRACKING — Connection-scoped authorization
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def _tracking_consumer(code, user=None, query_string=b"", subprotocols=()):
+    """A TrackingConsumer connected against a mocked channel layer and transport."""
+    from unittest.mock import AsyncMock
+    from asgiref.sync import async_to_sync
+    from django.contrib.auth.models import AnonymousUser
+    from apps.tracking.consumers import TrackingConsumer
+
+    consumer = TrackingConsumer()
+    consumer.scope = {
+        "url_route":    {"kwargs": {"tracking_code": code}},
+        "user":         user or AnonymousUser(),
+        "query_string": query_string,
+        "subprotocols": list(subprotocols),
+    }
+    consumer.channel_name  = "test-channel"
+    consumer.channel_layer = MagicMock(group_add=AsyncMock(), group_discard=AsyncMock(), group_send=AsyncMock())
+    consumer.base_send     = AsyncMock()
+    async_to_sync(consumer.connect)()
+    return consumer
+
+
+@pytest.mark.django_db
+class TestTrackingConsumerAuth:
+
+    def test_gps_from_non_driver_is_rejected_without_queries(self, sender, driver_agent, zones, commodity, django_assert_num_queries, make_shipment):
+        from asgiref.sync import async_to_sync
+
+        make_shipment(sender, zones, commodity, "AUTH-001", driver=driver_agent, status="IN_TRANSIT")
+        consumer = _tracking_consumer("AUTH-001", sender)
+        with django_assert_num_queries(0):
+            async_to_sync(consumer.receive_json)({"lat": -1.95, "lng": 30.06})
+        consumer.channel_layer.group_send.assert_not_awaited()
+        sent = json.loads(consumer.base_send.await_args.args[0]["text"])
+        assert sent["type"] == "error"
+
+    def test_driver_authenticates_with_jwt_query_token(self, sender, driver_agent, zones, commodity, make_shipment):
+        from rest_framework_simplejwt.tokens import AccessToken
+
+        make_shipment(sender, zones, commodity, "AUTH-002", driver=driver_agent, status="IN_TRANSIT")
+        token    = str(AccessToken.for_user(driver_agent))
+        consumer = _tracking_consumer("AUTH-002", query_string=f"token={token}".encode())
+        assert consumer.is_assigned_driver
+        assert not _tracking_consumer("AUTH-002", query_string=b"token=garbage").is_assigned_driver
+
+    def test_reassignment_event_refreshes_cached_driver(self, sender, driver_agent, zones, commodity, make_shipment):
+        from asgiref.sync import async_to_sync
+
+        make_shipment(sender, zones, commodity, "AUTH-003", driver=driver_agent, status="IN_TRANSIT")
+        consumer = _tracking_consumer("AUTH-003", driver_agent)
+        async_to_sync(consumer.shipment_changed)({
+            "type": "shipment_changed", "tracking_code": "AUTH-003",
+            "driver_id": str(uuid.uuid4()), "status": "ASSIGNED",
+        })
+        assert not consumer.is_assigned_driver
+
+    def test_assign_driver_notifies_after_commit(self, sender, driver_agent, zones, commodity, django_capture_on_commit_callbacks, make_shipment):
+        from apps.shipments.service import BookingService
+
+        shipment = _pay(make_shipment(sender, zones, commodity, "AUTH-004", status="PAID")).shipment
+        rura     = MagicMock(verify_license=MagicMock(return_value=True))
+        layer    = MagicMock()
+        with patch("apps.tracking.events.get_channel_layer", return_value=layer), \
+             patch("apps.tracking.events.async_to_sync", side_effect=lambda fn: fn):
+            with django_capture_on_commit_callbacks(execute=True):
+                BookingService(rura_connector=rura, notification_service=MagicMock()).assign_driver(shipment)
+
+        group, event = layer.group_send.call_args.args
+        assert group == "tracking_AUTH-004"
+        assert event["driver_id"] == str(driver_agent.pk)
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# TRACKING — Trajectory store & replay
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class TestTrajectoryCodec:
+
+    def test_round_trip_is_compact(self):
+        from apps.tracking.trajectory import encode, decode
+
+        points = [(1_700_000_000 + 5 * i, -1.9441 + i * 0.00004, 30.0619 + i * 0.00003) for i in range(720)]
+        data   = encode(points)
+        assert len(data) < 720 * 8                      # one hour of 5 s fixes in a few KB
+        for (ts, lat, lng), (dts, dlat, dlng) in zip(points, decode(data)):
+            assert dts == ts and abs(dlat - lat) < 1e-5 and abs(dlng - lng) < 1e-5
+
+    def test_simplify_drops_collinear_fixes(self):
+        from apps.tracking.trajectory import simplify
+
+        straight = [(i, -1.95 + i * 0.001, 30.06) for i in range(50)]
+        bent     = straight + [(50 + i, -1.901, 30.06 + (i + 1) * 0.001) for i in range(50)]
+        assert simplify(straight, 5) == [straight[0], straight[-1]]
+        assert len(simplify(bent, 5)) == 3
+        assert simplify(bent, 0) == bent
+
+
+@pytest.mark.django_db
+class TestTrajectoryReplay:
+
+    def test_trail_flush_and_replay(self, auth_client, sender, driver_agent, zones, commodity, make_shipment):
+        from apps.tracking.buffer import LocationBuffer
+        from apps.tracking.models import TrajectoryChunk
+
+        make_shipment(sender, zones, commodity, "TRAJ-001", driver=driver_agent, status="IN_TRANSIT")
+        buffer = LocationBuffer()
+        for i in range(30):
+            buffer.push("TRAJ-001", -1.95 + i * 0.001, 30.06, ts=1_700_000_000 + 5 * i)
+        assert buffer.flush_trails() == 1
+        assert TrajectoryChunk.objects.get().point_count == 30
+
+        resp = auth_client.get("/api/tracking/TRAJ-001/replay/", {"tolerance": 5})
+        assert resp.status_code == 200
+        assert resp.data["recorded"] == 30
+        assert resp.data["returned"] == 2
+        assert resp.data["path"][0]["lat"] == -1.95
+
+    def test_failed_trail_insert_keeps_fixes_for_next_run(self, sender, driver_agent, zones, commodity, make_shipment):
+        from django.db import DatabaseError
+        from apps.tracking.buffer import LocationBuffer
+        from apps.tracking.models import TrajectoryChunk
+
+        make_shipment(sender, zones, commodity, "TRAJ-003", driver=driver_agent, status="IN_TRANSIT")
+        buffer = LocationBuffer()
+        for i in range(3):
+            buffer.push("TRAJ-003", -1.95 + i * 0.001, 30.06, ts=1_700_000_000 + 5 * i)
+        with patch.object(TrajectoryChunk.objects, "bulk_create", side_effect=DatabaseError("disk full")):
+            with pytest.raises(DatabaseError):
+                buffer.flush_trails()
+
+        buffer.push("TRAJ-003", -1.94, 30.06, ts=1_700_000_020)
+        assert buffer.flush_trails() == 1
+        assert TrajectoryChunk.objects.get().point_count == 4
+
+    def test_overlapping_chunks_replay_in_time_order(self, auth_client, sender, driver_agent, zones, commodity, make_shipment):
+        from datetime import datetime, timezone as dt_timezone
+        from apps.tracking.models import TrajectoryChunk
+        from apps.tracking.trajectory import encode
+
+        shipment = make_shipment(sender, zones, commodity, "TRAJ-002", driver=driver_agent, status="IN_TRANSIT")
+        route    = [(1_700_000_000 + 5 * i, -1.95 + i * 0.001, 30.06 + (i % 2) * 0.01) for i in range(20)]
+        socket   = route[:3] + route[15:]               # socket chunk spans the dead zone
+        offline  = route[2:16]                          # upload fills it, repeating the edges
+        for points in (socket, offline):
+            TrajectoryChunk.objects.create(
+                shipment=shipment, point_count=len(points), data=encode(points),
+                started_at=datetime.fromtimestamp(points[0][0], tz=dt_timezone.utc),
+                ended_at=datetime.fromtimestamp(points[-1][0], tz=dt_timezone.utc),
+            )
+
+        resp = auth_client.get("/api/tracking/TRAJ-002/replay/", {"tolerance": 0})
+        assert resp.data["recorded"] == 20
+        stamps = [p["at"] for p in resp.data["path"]]
+        assert stamps == sorted(stamps) and len(set(stamps)) == 20
+
+    def test_replay_unknown_shipment(self, auth_client):
+        assert auth_client.get("/api/tracking/NOPE/replay/").status_code == 404
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# TRACKING — Hot location cache
+# ═══════════════════════════════════════════════════════════════════════════════
+
+@pytest.mark.django_db
+class TestLiveTrackingHotCache:
+
+    def test_miss_reads_db_once_then_serves_from_cache(self, api_client, sender, driver_agent, zones, commodity, django_assert_num_queries, settings, make_shipment):
+        from rest_framework_simplejwt.tokens import AccessToken
+        from apps.shipments.eta import eta_engine
+
+        make_shipment(sender, zones, commodity, "HOT-001", driver=driver_agent, status="IN_TRANSIT")
+        settings.ETA_MATRIX_TTL = 3600                  # matrix already in memory
+        eta_engine.reload()
+        api_client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(sender)}")
+
+        with django_assert_num_queries(2):             # token's user + shipment join
+            first = api_client.get("/api/tracking/HOT-001/live/")
+        with django_assert_num_queries(1):             # token's user only, no join
+            second = api_client.get("/api/tracking/HOT-001/live/")
+        assert first.status_code == second.status_code == 200
+        assert second.data == first.data
+        assert second.data["driver"] == "Driver Dave"
+
+    def test_deactivated_user_token_is_rejected(self, api_client, sender, driver_agent, zones, commodity, make_shipment):
+        from rest_framework_simplejwt.tokens import AccessToken
+
+        make_shipment(sender, zones, commodity, "HOT-004", driver=driver_agent, status="IN_TRANSIT")
+        api_client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(sender)}")
+        assert api_client.get("/api/tracking/HOT-004/live/").status_code == 200   # entry now warm
+
+        sender.is_active = False
+        sender.save(update_fields=["is_active"])
+        assert api_client.get("/api/tracking/HOT-004/live/").status_code == 401
+
+    def test_gps_push_is_visible_before_db_flush(self, auth_client, sender, driver_agent, zones, commodity, make_shipment):
+        from apps.tracking.buffer import LocationBuffer
+
+        make_shipment(sender, zones, commodity, "HOT-002", driver=driver_agent, status="IN_TRANSIT")
+        auth_client.get("/api/tracking/HOT-002/live/")
+        LocationBuffer().push("HOT-002", -1.70, 29.25, ts=1_700_000_000)
+
+        resp = auth_client.get("/api/tracking/HOT-002/live/")
+        assert resp.data["location"]["lat"] == -1.70
+        assert resp.data["location"]["last_seen"].startswith("2023-11-14T22:13:20")
+        driver_agent.driver_profile.refresh_from_db()
+        assert driver_agent.driver_profile.current_lat is None
+
+    def test_state_transition_refreshes_status_after_commit(self, auth_client, sender, zones, commodity, django_capture_on_commit_callbacks, make_shipment):
+        from apps.shipments.service import BookingService
+
+        shipment = _pay(make_shipment(sender, zones, commodity, "HOT-003", status="PAID")).shipment
+        assert auth_client.get("/api/tracking/HOT-003/live/").data["status"] == "PAID"
+
+        with django_capture_on_commit_callbacks(execute=True):
+            BookingService(notification_service=MagicMock()).handle_payment_failure(shipment, "Insufficient funds")
+        assert auth_client.get("/api/tracking/HOT-003/live/").data["status"] == "FAILED"
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# TRACKING — Coalesced fan-out
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class TestLatestWins:
+
+    def test_emits_first_then_latest_after_interval(self):
+        import asyncio
+        from apps.tracking.fanout import LatestWins
+
+        async def scenario():
+            sent = []
+
+            async def emit(item):
+                sent.append(item)
+            throttle = LatestWins(20, emit)          # one per 50 ms
+            for i in range(5):
+                await throttle.offer(i)
+            assert sent == [0]
+            await asyncio.sleep(0.08)
+            return sent
+
+        assert asyncio.run(scenario()) == [0, 4]
+
+
+@pytest.mark.django_db
+class TestCoalescedFanout:
+
+    def test_burst_of_fixes_is_one_publish_per_interval(self, sender, driver_agent, zones, commodity, make_shipment):
+        import asyncio
+        from asgiref.sync import async_to_sync
+        from apps.tracking.buffer import location_buffer
+
+        make_shipment(sender, zones, commodity, "FAN-001", driver=driver_agent, status="IN_TRANSIT")
+        make_shipment(sender, zones, commodity, "FAN-002", driver=driver_agent, status="IN_TRANSIT")
+        location_buffer.drain_trail()
+        consumer = _tracking_consumer("FAN-001", driver_agent)
+
+        async def burst():
+            for i in range(10):
+                await consumer.receive_json({"lat": -1.95 + i * 0.001, "lng": 30.06})
+            await asyncio.sleep(0.08)
+        async_to_sync(burst)()
+
+        sends = [
+            c.args for c in consumer.channel_layer.group_send.await_args_list
+            if c.args[0] == f"tracking_driver_{driver_agent.pk}"
+        ]
+        assert len(sends) == 2
+        group, event = sends[-1]
+        assert event["tracking_codes"] == ["FAN-001", "FAN-002"]     # one message for the whole truck
+        assert event["lat"] == pytest.approx(-1.941)
+        assert len(location_buffer.drain_trail()) == 20              # every fix still recorded
+
+    def test_subscriber_only_receives_its_own_shipment(self, sender, driver_agent, zones, commodity, make_shipment):
+        from asgiref.sync import async_to_sync
+
+        make_shipment(sender, zones, commodity, "FAN-003", driver=driver_agent, status="IN_TRANSIT")
+        watcher = _tracking_consumer("FAN-003", sender)
+        watcher.base_send.reset_mock()
+
+        async_to_sync(watcher.location_update)({"type": "location_update", "lat": 1, "lng": 2, "tracking_codes": ["FAN-999"]})
+        watcher.base_send.assert_not_awaited()
+        async_to_sync(watcher.location_update)({"type": "location_update", "lat": 1, "lng": 2, "tracking_codes": ["FAN-003", "FAN-999"]})
+        sent = json.loads(watcher.base_send.await_args.args[0]["text"])
+        assert sent == {"type": "location_update", "lat": 1, "lng": 2, "tracking_code": "FAN-003"}
+
+    def test_subscriber_rate_from_query_and_message(self, sender, driver_agent, zones, commodity, make_shipment):
+        from asgiref.sync import async_to_sync
+
+        make_shipment(sender, zones, commodity, "FAN-004", driver=driver_agent, status="IN_TRANSIT")
+        watcher = _tracking_consumer("FAN-004", sender, query_string=b"rate=2")
+        assert watcher.subscriber.rate == 2
+        async_to_sync(watcher.receive_json)({"type": "subscribe", "rate": 500})
+        assert watcher.subscriber.rate == 20                          # capped at GPS_FANOUT_RATE
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# TRACKING — Fleet map stream
+# ═══════════════════════════════════════════════════════════════════════════════
+
+KIGALI  = (-1.9441, 30.0619)
+RUSIZI  = (-2.4846, 28.9075)
+
+
+def _fleet_consumer(user):
+    from unittest.mock import AsyncMock
+    from asgiref.sync import async_to_sync
+    from apps.tracking.consumers import FleetConsumer
+
+    consumer = FleetConsumer()
+    consumer.scope         = {"user": user, "query_string": b""}
+    consumer.channel_name  = "fleet-channel"
+    consumer.channel_layer = MagicMock(group_add=AsyncMock(), group_discard=AsyncMock(), group_send=AsyncMock())
+    consumer.base_send     = AsyncMock()
+    async_to_sync(consumer.connect)()
+    return consumer
+
+
+def _sent(consumer):
+    return json.loads(consumer.base_send.await_args.args[0]["text"])
+
+
+class TestGeohashTiles:
+
+    def test_geohash_and_viewport_tiles(self):
+        from apps.tracking.geo import geohash, tiles_for_bbox
+
+        assert geohash(57.64911, 10.40744, 11) == "u4pruydqqvj"      # reference value
+        tiles = tiles_for_bbox(-2.9, 28.8, -1.0, 30.9, precision=4)  # all of Rwanda
+        assert geohash(*KIGALI, 4) in tiles and geohash(*RUSIZI, 4) in tiles
+        assert len(tiles) < 100
+        with pytest.raises(ValueError):
+            tiles_for_bbox(-12, 20, 5, 45, precision=4, max_tiles=256)
+
+
+@pytest.mark.django_db
+class TestFleetConsumer:
+
+    def test_non_admin_is_refused(self, sender):
+        consumer = _fleet_consumer(sender)
+        assert consumer.base_send.await_args.args[0]["type"] == "websocket.close"
+
+    def test_viewport_snapshot_then_diffs(self, admin):
+        import time
+        from asgiref.sync import async_to_sync
+        from apps.tracking.fleet import record_position, tile_of
+
+        kigali_tile = tile_of(*KIGALI)
+        truck = {"driver_id": "drv-1", "lat": KIGALI[0], "lng": KIGALI[1],
+                 "tracking_codes": ["A"], "tile": kigali_tile, "ts": time.time()}
+        record_position("drv-1", kigali_tile, truck)
+        consumer = _fleet_consumer(admin)
+        async_to_sync(consumer.receive_json)({"type": "viewport", "bbox": [-2.1, 29.9, -1.8, 30.2]})
+        snap = _sent(consumer)
+        assert [t["driver_id"] for t in snap["upsert"]] == ["drv-1"]
+        consumer.channel_layer.group_add.assert_any_await(f"fleet_tile_{kigali_tile}", "fleet-channel")
+
+        # Truck drives out of the viewport → remove diff
+        async_to_sync(consumer.fleet_leave)({"type": "fleet_leave", "driver_id": "drv-1", "tile": tile_of(*RUSIZI)})
+        assert _sent(consumer) == {"type": "diff", "upsert": [], "remove": ["drv-1"]}
+
+        # Updates for tiles outside the viewport are ignored
+        consumer.base_send.reset_mock()
+        async_to_sync(consumer.fleet_update)({"type": "fleet_update", "truck": {"driver_id": "drv-2", "tile": tile_of(*RUSIZI)}})
+        consumer.base_send.assert_not_awaited()
+
+    def test_silent_truck_is_removed_once_stale(self, settings, admin):
+        import time
+        from asgiref.sync import async_to_sync
+        from apps.tracking.fleet import record_position, tile_of
+
+        settings.FLEET_STALE_AFTER = 600
+        tile = tile_of(*KIGALI)
+        for driver_id, age in (("drv-old", 500), ("drv-new", 10)):
+            record_position(driver_id, tile, {"driver_id": driver_id, "lat": KIGALI[0], "lng": KIGALI[1],
+                                              "tracking_codes": [], "tile": tile, "ts": time.time() - age})
+        consumer = _fleet_consumer(admin)
+        async_to_sync(consumer.receive_json)({"type": "viewport", "bbox": [-2.1, 29.9, -1.8, 30.2]})
+        assert len(_sent(consumer)["upsert"]) == 2
+
+        consumer.base_send.reset_mock()
+        async_to_sync(consumer._expire_stale)()
+        consumer.base_send.assert_not_awaited()
+
+        settings.FLEET_STALE_AFTER = 300                    # drv-old has now been silent too long
+        async_to_sync(consumer._expire_stale)()
+        assert _sent(consumer) == {"type": "diff", "upsert": [], "remove": ["drv-old"]}
+        assert list(consumer.visible) == ["drv-new"]
+
+    def test_driver_publish_feeds_its_tile(self, sender, driver_agent, zones, commodity, make_shipment):
+        from asgiref.sync import async_to_sync
+        from apps.tracking.fleet import snapshot, tile_of
+
+        make_shipment(sender, zones, commodity, "FLEET-001", driver=driver_agent, status="IN_TRANSIT")
+        consumer = _tracking_consumer("FLEET-001", driver_agent)
+        async_to_sync(consumer.receive_json)({"lat": KIGALI[0], "lng": KIGALI[1]})
+
+        tile = tile_of(*KIGALI)
+        consumer.channel_layer.group_send.assert_any_await(f"fleet_tile_{tile}", ANY)
+        assert snapshot([tile])[str(driver_agent.pk)]["tracking_codes"] == ["FLEET-001"]
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# SHIPMENTS — ETA engine
+# ═══════════════════════════════════════════════════════════════════════════════
+
+@pytest.fixture
+def delivered_history(make_shipment):
+    """One delivered shipment per duration, ASSIGNED → DELIVERED `hours` apart."""
+    from datetime import timedelta
+    from django.utils import timezone
+    from apps.shipments.models import ShipmentEvent
+
+    def _make(sender, zones, commodity, hours):
+        base = timezone.now() - timedelta(days=30)
+        for i, h in enumerate(hours):
+            shipment = make_shipment(
+                sender, zones, commodity, f"HIST-{zones[0].pk}-{i}-{h}", status="DELIVERED",
+            )
+            assigned  = ShipmentEvent.objects.create(shipment=shipment, from_status="PAID", to_status="ASSIGNED")
+            delivered = ShipmentEvent.objects.create(shipment=shipment, from_status="IN_TRANSIT", to_status="DELIVERED")
+            ShipmentEvent.objects.filter(pk=assigned.pk).update(occurred_at=base)
+            ShipmentEvent.objects.filter(pk=delivered.pk).update(occurred_at=base + timedelta(hours=h))
+    return _make
+
+
+@pytest.mark.django_db
+class TestEtaEngine:
+
+    def test_refresh_builds_percentiles_incrementally(self, sender, zones, commodity, delivered_history):
+        from apps.shipments.eta import refresh_transit_stats
+        from apps.shipments.models import TransitStat
+
+        delivered_history(sender, zones, commodity, [2, 4, 6])
+        assert refresh_transit_stats() == 3
+        stat = TransitStat.objects.get(origin_zone=zones[0], dest_zone=zones[1])
+        assert (stat.samples, stat.median_s, stat.p90_s) == (3, 4 * 3600, 6 * 3600)
+
+        assert refresh_transit_stats() == 0             # nothing new past the watermark
+        delivered_history(sender, zones, commodity, [10])
+        assert refresh_transit_stats() == 1
+        stat.refresh_from_db()
+        assert stat.samples == 4 and stat.p90_s == 10 * 3600
+
+    def test_unsettled_delivery_is_folded_once_it_settles(self, settings, sender, zones, commodity, delivered_history):
+        from datetime import timedelta
+        from django.utils import timezone
+        from apps.shipments.eta import refresh_transit_stats
+        from apps.shipments.models import ShipmentEvent, TransitStat
+
+        settings.ETA_SETTLE_SECONDS = 300
+        delivered_history(sender, zones, commodity, [2, 4])
+        delivered_history(sender, zones[::-1], commodity, [6])
+        late = ShipmentEvent.objects.filter(to_status="DELIVERED").order_by("id").first()
+        ShipmentEvent.objects.filter(pk=late.pk).update(occurred_at=timezone.now())    # still in flight
+        assert refresh_transit_stats() == 2
+
+        # Commits later with its original, lower id and an older timestamp than the next refresh
+        ShipmentEvent.objects.filter(pk=late.pk).update(occurred_at=timezone.now() - timedelta(minutes=10))
+        assert refresh_transit_stats() == 1
+        assert TransitStat.objects.get(origin_zone=zones[0], dest_zone=zones[1]).samples == 2
+
+    def test_estimate_scales_with_remaining_distance(self, sender, zones, commodity, delivered_history):
+        from apps.shipments.eta import eta_engine, refresh_transit_stats
+
+        origin, dest = zones
+        origin.center_lat, origin.center_lng = -1.9441, 30.0619
+        dest.center_lat,   dest.center_lng   = -1.4996, 29.6350
+        origin.save(); dest.save()
+        delivered_history(sender, zones, commodity, [4, 4, 4])
+        refresh_transit_stats()
+
+        at_origin  = eta_engine.estimate(origin.pk, dest.pk, "IN_TRANSIT", position=(-1.9441, 30.0619))
+        halfway    = eta_engine.estimate(origin.pk, dest.pk, "IN_TRANSIT", position=(-1.72185, 29.84845))
+        not_moving = eta_engine.estimate(origin.pk, dest.pk, "PAID")
+        assert at_origin["basis"] == "gps_progress" and at_origin["remaining_minutes"] == 240
+        assert 110 <= halfway["remaining_minutes"] <= 130
+        assert not_moving["basis"] == "zone_history" and not_moving["remaining_minutes"] == 240
+        assert eta_engine.estimate(origin.pk, dest.pk, "DELIVERED") is None
+
+    def test_too_little_history_gives_no_eta(self, sender, zones, commodity, delivered_history):
+        from apps.shipments.eta import eta_engine, refresh_transit_stats
+
+        delivered_history(sender, zones, commodity, [4])
+        refresh_transit_stats()
+        assert eta_engine.estimate(zones[0].pk, zones[1].pk, "IN_TRANSIT") is None
+
+    def test_detail_and_live_tracking_expose_eta(self, auth_client, sender, driver_agent, zones, commodity, delivered_history, make_shipment):
+        from datetime import timedelta
+        from django.utils import timezone
+        from apps.shipments.eta import refresh_transit_stats
+        from apps.shipments.models import Shipment
+
+        delivered_history(sender, zones, commodity, [3, 3, 3])
+        refresh_transit_stats()
+        shipment = make_shipment(sender, zones, commodity, "ETA-001", driver=driver_agent, status="IN_TRANSIT")
+        Shipment.objects.filter(pk=shipment.pk).update(assigned_at=timezone.now() - timedelta(hours=1))
+
+        detail = auth_client.get("/api/shipments/ETA-001/").data
+        live   = auth_client.get("/api/tracking/ETA-001/live/").data
+        cached = auth_client.get("/api/tracking/ETA-001/live/").data
+        assert detail["eta"]["basis"] == "zone_history"
+        assert 115 <= detail["eta"]["remaining_minutes"] <= 120
+        assert live["eta"]["remaining_minutes"] == cached["eta"]["remaining_minutes"] == detail["eta"]["remaining_minutes"]
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# TRACKING — Geofencing
+# ═══════════════════════════════════════════════════════════════════════════════
+
+MUSANZE = (-1.4996, 29.6344)
+BORDER  = (-1.7000, 29.8500)
+OPEN_ROAD = (-1.8000, 29.9500)
+
+
+def _square(centre, half=0.01):
+    lat, lng = centre
+    return [[lat - half, lng - half], [lat - half, lng + half], [lat + half, lng + half], [lat + half, lng - half]]
+
+
+def _fences(zones):
+    from apps.tracking.models import Geofence
+
+    origin, dest = zones
+    Geofence.objects.create(name="Kigali depot", kind="ZONE", zone=origin, polygon=_square(KIGALI))
+    Geofence.objects.create(name="Musanze depot", kind="ZONE", zone=dest, polygon=_square(MUSANZE))
+    Geofence.objects.create(name="Test border post", kind="BORDER_POST", zone=dest, polygon=_square(BORDER))
+
+
+class TestGeofenceIndex:
+
+    def test_point_in_concave_polygon(self):
+        from apps.tracking.geofence import point_in_polygon
+
+        l_shape = [[0, 0], [0, 2], [1, 2], [1, 1], [2, 1], [2, 0]]
+        assert point_in_polygon(0.5, 1.5, l_shape)
+        assert point_in_polygon(1.5, 0.5, l_shape)
+        assert not point_in_polygon(1.5, 1.5, l_shape)         # the notch
+        assert not point_in_polygon(3.0, 0.5, l_shape)
+
+    def test_grid_only_returns_containing_fences(self):
+        from apps.tracking.geofence import GridIndex, build_fence
+
+        fences = [
+            build_fence(i, f"f{i}", "ZONE", i, _square((-2.0 + i * 0.02, 30.0), half=0.005))
+            for i in range(500)
+        ]
+        index = GridIndex(fences, cell_deg=0.05)
+        assert [f.id for f in index.locate(-2.0 + 42 * 0.02, 30.001)] == [42]
+        assert index.locate(-2.0 + 42 * 0.02 + 0.01, 30.0) == []   # between fences
+        assert index.locate(10.0, 10.0) == []
+
+
+@pytest.mark.django_db
+class TestGeofenceTransitions:
+
+    @patch("apps.notifications.service.NotificationService.send_sms", return_value=True)
+    def test_trip_drives_status_machine(self, _sms, sender, driver_agent, zones, commodity, make_shipment):
+        from apps.shipments.models import Shipment
+        from apps.tracking.geofence import GeofenceEngine, apply_transitions
+
+        _fences(zones)
+        shipment = make_shipment(sender, zones, commodity, "GEO-001", driver=driver_agent, status="IN_TRANSIT")
+        Shipment.objects.filter(pk=shipment.pk).update(status="ASSIGNED", shipment_type="INTERNATIONAL")
+        driver_agent.driver_profile.__class__.objects.filter(pk=driver_agent.driver_profile.pk).update(is_available=False)
+        engine = GeofenceEngine()
+
+        statuses = []
+        for point in (KIGALI, OPEN_ROAD, BORDER, OPEN_ROAD, MUSANZE, MUSANZE, MUSANZE):
+            apply_transitions(engine.evaluate_many(["GEO-001"], *point))
+            statuses.append(Shipment.objects.get(pk=shipment.pk).status)
+        assert statuses == ["ASSIGNED", "IN_TRANSIT", "AT_BORDER", "IN_TRANSIT", "IN_TRANSIT", "IN_TRANSIT", "DELIVERED"]
+
+        shipment.refresh_from_db()
+        driver_agent.driver_profile.refresh_from_db()
+        assert shipment.delivered_at is not None
+        assert driver_agent.driver_profile.is_available is True
+        assert list(shipment.events.values_list("note", flat=True))[-1] == "Geofence: Arrived in Musanze depot"
+
+    def test_steady_state_fixes_do_not_query(self, sender, driver_agent, zones, commodity, settings, django_assert_num_queries, make_shipment):
+        from apps.tracking.geofence import GeofenceEngine
+
+        settings.GEOFENCE_RELOAD_INTERVAL = 300
+        _fences(zones)
+        make_shipment(sender, zones, commodity, "GEO-002", driver=driver_agent, status="IN_TRANSIT")
+        engine = GeofenceEngine()
+        engine.evaluate_many(["GEO-002"], *OPEN_ROAD)
+
+        with django_assert_num_queries(0):
+            for i in range(1000):
+                assert engine.evaluate_many(["GEO-002"], OPEN_ROAD[0] + i * 1e-6, OPEN_ROAD[1]) == []
+
+    def test_domestic_shipment_ignores_border_posts(self, sender, driver_agent, zones, commodity, make_shipment):
+        from apps.shipments.service import BookingService
+
+        make_shipment(sender, zones, commodity, "GEO-003", driver=driver_agent, status="IN_TRANSIT")
+        service = BookingService(notification_service=MagicMock())
+        assert service.record_transition("GEO-003", "AT_BORDER") is False
+        assert service.record_transition("GEO-003", "ASSIGNED") is False         # not GPS-driven
+
+    @patch("apps.notifications.service.NotificationService.send_sms", return_value=True)
+    def test_driver_socket_fix_triggers_transition(self, _sms, sender, driver_agent, zones, commodity, make_shipment):
+        from asgiref.sync import async_to_sync
+        from apps.shipments.models import Shipment
+
+        _fences(zones)
+        make_shipment(sender, zones, commodity, "GEO-004", driver=driver_agent, status="IN_TRANSIT")
+        consumer = _tracking_consumer("GEO-004", driver_agent)
+        async_to_sync(consumer.receive_json)({"lat": OPEN_ROAD[0], "lng": OPEN_ROAD[1]})
+        for _ in range(3):
+            assert Shipment.objects.get(tracking_code="GEO-004").status == "IN_TRANSIT"
+            async_to_sync(consumer.receive_json)({"lat": MUSANZE[0], "lng": MUSANZE[1]})
+        assert Shipment.objects.get(tracking_code="GEO-004").status == "DELIVERED"
+
+    def test_first_fix_and_a_passing_fix_do_not_deliver(self, sender, driver_agent, zones, commodity, make_shipment):
+        from apps.tracking.geofence import GeofenceEngine
+
+        _fences(zones)
+        for code in ("GEO-005", "GEO-006"):
+            make_shipment(sender, zones, commodity, code, driver=driver_agent, status="IN_TRANSIT")
+        engine = GeofenceEngine()
+
+        # Already inside the destination when first seen: nothing was crossed
+        assert [engine.evaluate_many(["GEO-005"], *MUSANZE) for _ in range(5)] == [[]] * 5
+
+        # One jittery fix inside, then back out: the dwell starts over
+        engine.evaluate_many(["GEO-006"], *OPEN_ROAD)
+        for point in (MUSANZE, MUSANZE, OPEN_ROAD, MUSANZE, MUSANZE):
+            assert engine.evaluate_many(["GEO-006"], *point) == []
+        assert engine.evaluate_many(["GEO-006"], *MUSANZE) == [("GEO-006", "DELIVERED", "Arrived in Musanze depot")]
+        assert engine.evaluate_many(["GEO-006"], *MUSANZE) == []
+
+    def test_dwell_time_delivers_before_the_fix_count(self, settings, sender, driver_agent, zones, commodity, make_shipment):
+        from apps.tracking.geofence import GeofenceEngine
+
+        settings.GEOFENCE_DWELL_FIXES, settings.GEOFENCE_DWELL_SECONDS = 10, 120
+        _fences(zones)
+        make_shipment(sender, zones, commodity, "GEO-007", driver=driver_agent, status="IN_TRANSIT")
+        engine = GeofenceEngine()
+
+        fixes = [(1000, *OPEN_ROAD), (1060, *MUSANZE), (1120, *MUSANZE), (1180, *MUSANZE)]
+        assert engine.evaluate_fixes(["GEO-007"], fixes[:3]) == []
+        assert engine.evaluate_fixes(["GEO-007"], fixes[3:]) == [("GEO-007", "DELIVERED", "Arrived in Musanze depot")]
+
+    def test_edge_state_is_shared_through_redis(self, sender, driver_agent, zones, commodity, make_shipment):
+        from apps.tracking.geofence import GeofenceEngine
+
+        class FakeRedis(dict):
+            def mget(self, keys):
+                return [self.get(key) for key in keys]
+
+            def pipeline(self, transaction=True):
+                return self
+
+            def set(self, key, value, ex=None):
+                self[key] = value.encode()
+
+            def execute(self):
+                pass
+
+        _fences(zones)
+        make_shipment(sender, zones, commodity, "GEO-008", driver=driver_agent, status="IN_TRANSIT")
+        redis = FakeRedis()
+        with patch("apps.tracking.geofence.get_redis", return_value=redis):
+            first, second = GeofenceEngine(), GeofenceEngine()       # two workers
+            first.evaluate_many(["GEO-008"], *OPEN_ROAD)
+            assert first.evaluate_many(["GEO-008"], *MUSANZE) == []
+            assert second.evaluate_many(["GEO-008"], *MUSANZE) == []
+            assert first.evaluate_many(["GEO-008"], *MUSANZE)[0][1] == "DELIVERED"
+        assert list(redis) == ["geofence:state:GEO-008"] and not first._state
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# TRACKING — Binary GPS subprotocol
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def _drive(start, n, step=5):
+    """n fixes every `step` seconds heading north-west from `start`."""
+    return [(1_700_000_000 + i * step, start[0] + i * 0.0003, start[1] - i * 0.0002) for i in range(n)]
+
+
+class TestGPSFrames:
+
+    def test_round_trip_and_size(self):
+        from apps.tracking.protocol import decode_frame, encode_frame
+
+        fixes = _drive(KIGALI, 60)
+        frame = encode_frame(fixes)
+        assert len(frame) == 15 + 59 * 6
+        as_json = sum(len(json.dumps({"lat": lat, "lng": lng, "ts": ts})) for ts, lat, lng in fixes)
+        assert len(frame) * 5 < as_json
+        for (t1, a1, b1), (t2, a2, b2) in zip(fixes, decode_frame(frame)):
+            assert t1 == t2 and abs(a1 - a2) < 1e-5 and abs(b1 - b2) < 1e-5
+
+    def test_rejects_malformed_frames(self):
+        from apps.tracking.protocol import FrameError, decode_frame, encode_frame
+
+        frame = encode_frame(_drive(KIGALI, 3))
+        with pytest.raises(FrameError):
+            decode_frame(frame[:-1])                       # truncated
+        with pytest.raises(FrameError):
+            decode_frame(b"\x02" + frame[1:])              # unknown version
+        with pytest.raises(FrameError):
+            encode_frame([(0, 0.0, 0.0), (1, 1.0, 0.0)])   # 1° jump doesn't fit a delta
+
+
+@pytest.mark.django_db
+class TestBinaryTrackingSocket:
+
+    def test_negotiated_batch_is_buffered(self, sender, driver_agent, zones, commodity, make_shipment):
+        from asgiref.sync import async_to_sync
+        from apps.tracking.buffer import location_buffer
+        from apps.tracking.protocol import SUBPROTOCOL, encode_frame
+
+        make_shipment(sender, zones, commodity, "BIN-001", driver=driver_agent, status="IN_TRANSIT")
+        location_buffer.drain_trail()
+        consumer = _tracking_consumer("BIN-001", driver_agent, subprotocols=["other", SUBPROTOCOL])
+        consumer.base_send.assert_any_await({"type": "websocket.accept", "subprotocol": SUBPROTOCOL})
+
+        fixes = _drive(KIGALI, 20)
+        async_to_sync(consumer.receive)(bytes_data=encode_frame(fixes))
+        assert len([row for row in location_buffer.drain_trail() if row[0] == "BIN-001"]) == 20
+        assert location_buffer.drain()["BIN-001"][2] == fixes[-1][0]
+
+    def test_out_of_range_binary_fixes_are_dropped(self, sender, driver_agent, zones, commodity, make_shipment):
+        from asgiref.sync import async_to_sync
+        from apps.tracking.buffer import location_buffer
+        from apps.tracking.protocol import SUBPROTOCOL, encode_frame
+
+        make_shipment(sender, zones, commodity, "BIN-003", driver=driver_agent, status="IN_TRANSIT")
+        location_buffer.drain_trail()
+        consumer = _tracking_consumer("BIN-003", driver_agent, subprotocols=[SUBPROTOCOL])
+        consumer.base_send.reset_mock()
+
+        async_to_sync(consumer.receive)(bytes_data=encode_frame([(1_700_000_000, 91.0, 30.0)]))
+        sent = json.loads(consumer.base_send.await_args.args[0]["text"])
+        assert sent["type"] == "error"
+        assert not [row for row in location_buffer.drain_trail() if row[0] == "BIN-003"]
+
+    def test_malformed_json_fix_gets_error_and_keeps_socket(self, sender, driver_agent, zones, commodity, make_shipment):
+        from asgiref.sync import async_to_sync
+        from apps.tracking.buffer import location_buffer
+
+        make_shipment(sender, zones, commodity, "BIN-004", driver=driver_agent, status="IN_TRANSIT")
+        location_buffer.drain()
+        consumer = _tracking_consumer("BIN-004", driver_agent)
+        for bad in ({"lat": "abc", "lng": 30.0}, {"lat": [1], "lng": 30.0},
+                    {"lat": "nan", "lng": 30.0}, {"lat": 95.0, "lng": 30.0}):
+            consumer.base_send.reset_mock()
+            async_to_sync(consumer.receive_json)(bad)
+            sent = json.loads(consumer.base_send.await_args.args[0]["text"])
+            assert sent["type"] == "error"
+        assert "BIN-004" not in location_buffer.drain()
+
+    def test_binary_without_subprotocol_is_refused(self, sender, driver_agent, zones, commodity, make_shipment):
+        from asgiref.sync import async_to_sync
+        from apps.tracking.protocol import encode_frame
+
+        make_shipment(sender, zones, commodity, "BIN-002", driver=driver_agent, status="IN_TRANSIT")
+        consumer = _tracking_consumer("BIN-002", driver_agent)
+        consumer.base_send.assert_any_await({"type": "websocket.accept", "subprotocol": None})
+        consumer.base_send.reset_mock()
+
+        async_to_sync(consumer.receive)(bytes_data=encode_frame(_drive(KIGALI, 2)))
+        sent = json.loads(consumer.base_send.await_args.args[0]["text"])
+        assert sent["type"] == "error" and "ishemalink.gps.v1" in sent["error"]
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# TRACKING — Offline GPS upload
+# ═══════════════════════════════════════════════════════════════════════════════
+
+@pytest.mark.django_db
+class TestOfflineFixUpload:
+
+    def _client(self, api_client, agent):
+        api_client.force_authenticate(user=agent)
+        return api_client
+
+    def test_gzipped_json_batch_is_one_bulk_write(self, api_client, sender, driver_agent, zones, commodity, django_assert_max_num_queries, make_shipment):
+        import gzip
+        from apps.tracking.models import TrajectoryChunk
+
+        make_shipment(sender, zones, commodity, "OFF-001", driver=driver_agent, status="IN_TRANSIT")
+        fixes = [[ts, lat, lng] for ts, lat, lng in _drive(OPEN_ROAD, 3000)]
+        body  = gzip.compress(json.dumps({"fixes": fixes}).encode())
+        client = self._client(api_client, driver_agent)
+
+        with django_assert_max_num_queries(12):             # independent of batch size
+            resp = client.generic("POST", "/api/tracking/OFF-001/fixes/", body,
+                                  content_type="application/json", HTTP_CONTENT_ENCODING="gzip")
+        assert resp.status_code == 201, resp.data
+        assert resp.data["accepted"] == 3000 and resp.data["position_update"] is True
+        assert TrajectoryChunk.objects.get(shipment__tracking_code="OFF-001").point_count == 3000
+        driver_agent.driver_profile.refresh_from_db()
+        assert driver_agent.driver_profile.current_lat == pytest.approx(fixes[-1][1])
+
+    @patch("apps.notifications.service.NotificationService.send_sms", return_value=True)
+    def test_binary_batch_replays_geofences_and_retry_is_noop(self, _sms, api_client, sender, driver_agent, zones, commodity, make_shipment):
+        from apps.shipments.models import Shipment
+        from apps.tracking.models import TrajectoryChunk
+        from apps.tracking.protocol import encode_frame
+
+        _fences(zones)
+        shipment = make_shipment(sender, zones, commodity, "OFF-002", driver=driver_agent, status="IN_TRANSIT")
+        Shipment.objects.filter(pk=shipment.pk).update(status="ASSIGNED")
+        leaving = _drive(KIGALI, 10, step=60)
+        arrived = [(leaving[-1][0] + 3600 + i * 60, *MUSANZE) for i in range(3)]   # next frame: too far for a delta
+        body    = encode_frame(leaving) + encode_frame(arrived)
+        client  = self._client(api_client, driver_agent)
+
+        resp = client.generic("POST", "/api/tracking/OFF-002/fixes/", body, content_type="application/octet-stream")
+        assert resp.status_code == 201 and resp.data["transitions"] == 2       # IN_TRANSIT, DELIVERED
+        assert Shipment.objects.get(pk=shipment.pk).status == "DELIVERED"
+
+        retry = client.generic("POST", "/api/tracking/OFF-002/fixes/", body, content_type="application/octet-stream")
+        assert retry.status_code == 200 and retry.data["duplicate"] is True
+        assert TrajectoryChunk.objects.filter(shipment=shipment).count() == 1
+
+    @patch("apps.notifications.service.NotificationService.send_sms", return_value=True)
+    def test_batch_older_than_the_socket_does_not_replay_crossings(self, _sms, api_client, sender, driver_agent, zones, commodity, make_shipment):
+        from apps.shipments.models import Shipment
+        from apps.tracking.geofence import geofence_engine
+
+        _fences(zones)
+        shipment = make_shipment(sender, zones, commodity, "OFF-010", driver=driver_agent, status="AT_BORDER")
+        Shipment.objects.filter(pk=shipment.pk).update(shipment_type="INTERNATIONAL")
+        geofence_engine.evaluate_fixes(["OFF-010"], [(1_700_010_000, *OPEN_ROAD), (1_700_010_060, *BORDER)])
+
+        # Fixes from the drive up to the post, uploaded while the truck waits there
+        earlier = [(1_700_009_000, *OPEN_ROAD), (1_700_009_060, *BORDER), (1_700_009_120, *OPEN_ROAD)]
+        resp = self._client(api_client, driver_agent).post(
+            "/api/tracking/OFF-010/fixes/", {"fixes": [list(fix) for fix in earlier]}, format="json",
+        )
+        assert resp.status_code == 201 and resp.data["transitions"] == 0
+        assert Shipment.objects.get(pk=shipment.pk).status == "AT_BORDER"
+        assert not shipment.events.exists()
+
+    def test_live_fix_counts_once_per_truck_toward_dwell(self, api_client, sender, driver_agent, zones, commodity, make_shipment):
+        from apps.shipments.models import Shipment
+        from apps.tracking import hotcache
+        from apps.tracking.geofence import geofence_engine
+
+        _fences(zones)
+        codes = ["OFF-011", "OFF-012"]
+        for code in codes:
+            make_shipment(sender, zones, commodity, code, driver=driver_agent, status="IN_TRANSIT")
+        geofence_engine.evaluate_fixes(codes, [(1_700_020_000, *OPEN_ROAD), (1_700_020_060, *MUSANZE)])
+        for code in codes:
+            hotcache.record_fix(code, *MUSANZE, 1_700_020_070)
+
+        resp = self._client(api_client, driver_agent).post(
+            "/api/tracking/OFF-011/fixes/", {"fixes": [[1_700_020_030, *MUSANZE]]}, format="json",
+        )
+        assert resp.status_code == 201 and resp.data["transitions"] == 0    # 2 of 3 dwell fixes
+        assert set(Shipment.objects.filter(tracking_code__in=codes).values_list("status", flat=True)) == {"IN_TRANSIT"}
+
+    def test_older_batch_keeps_newer_position(self, api_client, sender, driver_agent, zones, commodity, make_shipment):
+        from django.utils import timezone
+        from apps.authentication.models import DriverProfile
+
+        make_shipment(sender, zones, commodity, "OFF-003", driver=driver_agent, status="IN_TRANSIT")
+        DriverProfile.objects.filter(agent=driver_agent).update(current_lat=-1.5, current_lng=29.6, last_seen=timezone.now())
+        client = self._client(api_client, driver_agent)
+
+        resp = client.post("/api/tracking/OFF-003/fixes/", {"fixes": [[1_700_000_000, -1.9, 30.0]]}, format="json")
+        assert resp.status_code == 201 and resp.data["position_update"] is False
+        driver_agent.driver_profile.refresh_from_db()
+        assert driver_agent.driver_profile.current_lat == -1.5
+
+    def test_only_assigned_driver_and_valid_bodies(self, api_client, sender, driver_agent, zones, commodity, make_shipment):
+        make_shipment(sender, zones, commodity, "OFF-004", driver=driver_agent, status="IN_TRANSIT")
+        assert self._client(api_client, sender).post(
+            "/api/tracking/OFF-004/fixes/", {"fixes": [[1_700_000_000, -1.9, 30.0]]}, format="json",
+        ).status_code == 403
+        client = self._client(api_client, driver_agent)
+        assert client.post("/api/tracking/OFF-004/fixes/", {"points": []}, format="json").status_code == 400
+        assert client.generic("POST", "/api/tracking/OFF-004/fixes/", b"\x01\x02",
+                              content_type="application/octet-stream").status_code == 400
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# NOTIFICATIONS — Background broadcast jobs
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def _gateway(accept=lambda phone: True):
+    """Mocked pooled session: the gateway accepts the phones `accept` approves, with message ids."""
+    ids = itertools.count(1)
+
+    def result(phone):
+        if not accept(phone):
+            return {"phone": phone, "status": "REJECTED"}
+        return {"phone": phone, "message_id": f"SMS-{next(ids):06d}", "status": "ACCEPTED"}
+
+    def post(url, json=None, timeout=None):
+        resp = MagicMock(status_code=200)
+        if url.endswith("/send-bulk"):
+            resp.json.return_value = {"results": [result(m["phone"]) for m in json["messages"]]}
+        else:
+            resp.json.return_value = result(json["phone"])
+        return resp
+    return MagicMock(post=MagicMock(side_effect=post))
+
+
+@pytest.mark.django_db
+class TestBroadcastJobs:
+
+    def _drivers(self, make_agent, n):
+        return [make_agent(phone=f"+25078800{i:04d}", role="DRIVER") for i in range(n)]
+
+    def test_broadcast_runs_in_chunks_and_reports_progress(self, admin_client, make_agent, django_capture_on_commit_callbacks):
+        self._drivers(make_agent, 7)
+        session = _gateway(accept=lambda phone: not phone.endswith("3"))
+
+        with patch("apps.notifications.service.get_session", return_value=session), \
+                django_capture_on_commit_callbacks(execute=True):
+            resp = admin_client.post("/api/notifications/broadcast/", {"message": "Road closed"}, format="json")
+        assert resp.status_code == 202
+
+        job = admin_client.get(f"/api/notifications/broadcast/{resp.data['job_id']}/").data
+        assert (job["status"], job["total"], job["sent"], job["failed"]) == ("DONE", 7, 6, 1)
+        bulk_calls = [c for c in session.post.call_args_list if c.args[0].endswith("/send-bulk")]
+        assert len(bulk_calls) == 5                          # chunks 3+3+1 → batches of ≤ 2
+        assert job["finished_at"] is not None
+
+    def test_single_send_fallback_when_gateway_has_no_bulk_api(self, make_agent, settings):
+        from apps.notifications.service import NotificationService
+
+        settings.SMS_GATEWAY_BULK = False
+        session = _gateway()
+        with patch("apps.notifications.service.get_session", return_value=session):
+            sent = NotificationService().send_bulk([(f"+2507880000{i}", "hi") for i in range(5)])
+        assert sent == 5
+        assert {c.args[0] for c in session.post.call_args_list} == {"http://sms-mock:8003/send"}
+
+    def test_rate_limit_spills_into_next_second(self, settings):
+        from apps.notifications.service import acquire_send_budget
+
+        class Clock:
+            now = 1_000.2
+            slept = []
+
+            def time(self):
+                return self.now
+
+            def sleep(self, seconds):
+                self.slept.append(round(seconds, 1))
+                self.now += seconds
+
+        settings.SMS_RATE_LIMIT = 3
+        clock = Clock()
+        with patch("apps.notifications.service.time", clock):
+            acquire_send_budget(2)
+            acquire_send_budget(1)
+            assert clock.slept == []
+            acquire_send_budget(2)                          # 5 > 3 → waits for the next window
+        assert clock.slept == [0.8]
+
+    def test_job_status_is_admin_only(self, auth_client):
+        from apps.notifications.models import BroadcastJob
+
+        job = BroadcastJob.objects.create(message="x")
+        assert auth_client.get(f"/api/notifications/broadcast/{job.id}/").status_code == 403
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# NOTIFICATIONS — Transactional outbox
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def _outbox(n, channel="SMS"):
+    from apps.notifications.models import OutboundMessage
+    return [
+        OutboundMessage.objects.create(channel=channel, recipient=f"+25078811{i:04d}", body=f"msg {i}")
+        for i in range(n)
+    ]
+
+
+@pytest.mark.django_db
+class TestNotificationOutbox:
+
+    def test_booking_writes_outbox_and_sends_only_after_commit(self, sender, zones, commodity, django_capture_on_commit_callbacks, make_shipment):
+        from apps.notifications.models import OutboundMessage
+        from apps.shipments.service import BookingService
+
+        shipment = _pay(make_shipment(sender, zones, commodity, "OBX-001", status="PAID")).shipment
+        session  = _gateway()
+        with patch("apps.notifications.service.get_session", return_value=session):
+            with django_capture_on_commit_callbacks(execute=True):
+                BookingService().handle_payment_failure(shipment, "Insufficient funds")
+                assert not session.post.called                    # no HTTP while the booking holds locks
+                assert OutboundMessage.objects.get(reference="OBX-001").status == "PENDING"
+
+        message = OutboundMessage.objects.get(reference="OBX-001")
+        assert (message.status, message.attempts, message.recipient) == ("SENT", 1, sender.phone)
+        assert message.sent_at is not None
+        assert session.post.call_args.kwargs["json"]["messages"][0]["phone"] == sender.phone
+
+    def test_rolled_back_booking_leaves_no_message(self, sender, zones, commodity, make_shipment):
+        from django.db import transaction
+        from apps.notifications.models import OutboundMessage
+        from apps.shipments.service import BookingService
+
+        shipment = _pay(make_shipment(sender, zones, commodity, "OBX-002", status="PAID")).shipment
+        with pytest.raises(RuntimeError):
+            with transaction.atomic():
+                BookingService().handle_payment_failure(shipment, "Timeout")
+                raise RuntimeError("later step failed")
+        assert not OutboundMessage.objects.filter(reference="OBX-002").exists()
+
+    def test_rejected_message_backs_off_then_fails(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from apps.notifications.models import OutboundMessage
+        from apps.notifications.outbox import dispatch_due
+
+        ok, bad = _outbox(2)
+        session = _gateway(accept=lambda phone: phone == ok.recipient)
+        with patch("apps.notifications.service.get_session", return_value=session):
+            assert dispatch_due() == {"sent": 1, "failed": 1}
+            bad.refresh_from_db()
+            assert (bad.status, bad.attempts) == ("PENDING", 1)
+            assert bad.next_attempt_at > timezone.now() + timedelta(seconds=25)
+            assert dispatch_due() == {"sent": 0, "failed": 0}          # not due yet
+
+            for _ in range(2):
+                OutboundMessage.objects.filter(pk=bad.pk).update(next_attempt_at=timezone.now())
+                dispatch_due()
+        bad.refresh_from_db()
+        assert (bad.status, bad.attempts) == ("FAILED", 3)
+        assert OutboundMessage.objects.get(pk=ok.pk).status == "SENT"
+
+    def test_claims_are_leased_to_one_worker(self):
+        from apps.notifications.outbox import claim_due, dispatch_due
+
+        _outbox(5, channel="EMAIL")
+        first, second = claim_due(3), claim_due(3)
+        assert len(first) == 3 and len(second) == 2
+        assert not {m.pk for m in first} & {m.pk for m in second}
+        assert claim_due(3) == [] and dispatch_due() == {"sent": 0, "failed": 0}
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# NOTIFICATIONS — SMS coalescing, dedupe and templates
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class TestSMSCoalescing:
+
+    def test_segment_counting(self):
+        from apps.notifications.coalesce import sms_parts
+
+        assert [sms_parts("a" * n) for n in (160, 161, 306, 307)] == [1, 2, 2, 3]
+        assert sms_parts("€" * 80) == 1 and sms_parts("€" * 81) == 2         # escape chars take two units
+        assert sms_parts("ш" * 70) == 1 and sms_parts("ш" * 71) == 2         # UCS-2
+
+    def test_merges_dedupes_and_never_costs_more_segments(self):
+        from apps.notifications.coalesce import coalesce
+        from apps.notifications.templates import render_sms
+
+        paid   = render_sms("payment_received", code="IL-1", amount="5900.00")
+        driver = render_sms("driver_assigned", driver="Jean", plate="RAB 123A", code="IL-1")
+        assert coalesce([paid, driver, paid], max_parts=3) == [
+            (paid + " " + driver.removeprefix("IshemaLink: "), [0, 1, 2]),
+        ]
+        full = ["x" * 160, "y" * 160]                                       # 1 + 1 apart, 3 merged
+        assert coalesce(full, max_parts=3) == [(full[0], [0]), (full[1], [1])]
+        assert len(coalesce(["z" * 150, "w" * 150], max_parts=1)) == 2
+
+    def test_templates_are_checked(self):
+        from apps.notifications.templates import MessageTemplate, SMS_TEMPLATES
+
+        assert SMS_TEMPLATES["delivered"].fields == {"code"}
+        with pytest.raises(KeyError):
+            SMS_TEMPLATES["payment_failed"].render(code="IL-1")
+        with pytest.raises(ValueError):
+            MessageTemplate("bad", "{amount:.2f}")
+
+
+@pytest.mark.django_db
+class TestOutboxCoalescing:
+
+    def test_booking_sms_go_out_as_one_message(self, sender, driver_agent, zones, commodity, django_capture_on_commit_callbacks, make_shipment):
+        from apps.notifications.models import OutboundMessage
+        from apps.shipments.models import Shipment
+        from apps.shipments.service import BookingService
+
+        payment = _pay(make_shipment(sender, zones, commodity, "OBX-010", status="PAID"))
+        Shipment.objects.filter(pk=payment.shipment_id).update(status=Shipment.Status.CONFIRMED)
+        payment.shipment.refresh_from_db()
+        rura    = MagicMock(verify_license=MagicMock(return_value=True))
+        session = _gateway()
+        with patch("apps.notifications.service.get_session", return_value=session), \
+             django_capture_on_commit_callbacks(execute=True):
+            BookingService(rura_connector=rura).confirm_payment(payment.shipment, payment)
+
+        rows = OutboundMessage.objects.filter(reference="OBX-010")
+        assert list(rows.values_list("status", flat=True)) == ["SENT", "SENT"]
+        (call,) = session.post.call_args_list
+        (sms,)  = call.kwargs["json"]["messages"]
+        assert sms["message"].count("IshemaLink:") == 1 and "is on the way" in sms["message"]
+
+    def test_repeated_message_is_dropped_and_holds_are_shared(self, settings):
+        from apps.notifications.models import OutboundMessage
+        from apps.notifications.service import NotificationService
+
+        settings.SMS_COALESCE_WINDOW = 15
+        notifier = NotificationService()
+        first    = notifier.enqueue_sms("+250788000001", "IshemaLink: Hello")
+        again    = notifier.enqueue_sms("+250788000001", "IshemaLink: Hello")
+        other    = notifier.enqueue_sms("+250788000001", "IshemaLink: Goodbye")
+        assert again.pk == first.pk and OutboundMessage.objects.count() == 2
+        assert other.next_attempt_at == first.next_attempt_at
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# NOTIFICATIONS — SMS delivery receipts
+# ═══════════════════════════════════════════════════════════════════════════════
+
+@pytest.mark.django_db
+class TestDeliveryReceipts:
+
+    def _dlr(self, api_client, receipts, token="test-dlr-token"):
+        return api_client.post("/api/notifications/dlr/", {"receipts": receipts},
+                               format="json", HTTP_X_DLR_TOKEN=token)
+
+    def test_sends_are_recorded_with_gateway_ids(self):
+        from apps.notifications.models import OutboundMessage, SmsMessage
+        from apps.notifications.outbox import dispatch_due
+
+        _outbox(2)
+        session = _gateway()
+        with patch("apps.notifications.service.get_session", return_value=session):
+            dispatch_due()
+        records = {m.phone: m for m in SmsMessage.objects.all()}
+        assert set(records) == {"+250788110000", "+250788110001"}
+        assert {m.carrier for m in records.values()} == {"MTN"}
+        assert set(OutboundMessage.objects.values_list("gateway_id", flat=True)) == {m.gateway_id for m in records.values()}
+
+    def test_bulk_receipts_apply_in_few_queries(self, api_client, django_assert_max_num_queries):
+        from apps.notifications.models import SmsMessage
+
+        SmsMessage.objects.bulk_create(
+            SmsMessage(gateway_id=f"SMS-{i:06d}", phone=f"+25072200{i:04d}", carrier="AIRTEL") for i in range(6)
+        )
+        receipts = [{"message_id": f"SMS-{i:06d}", "status": "DELIVRD", "done_at": 1_700_000_000} for i in range(4)]
+        receipts += [
+            {"message_id": "SMS-000004", "status": "UNDELIV", "error_code": "001"},
+            {"message_id": "SMS-999999", "status": "DELIVRD"},                 # not ours
+            {"message_id": "SMS-000005", "status": "ENROUTE"},                 # not a final status
+        ]
+        with django_assert_max_num_queries(10):
+            resp = self._dlr(api_client, receipts)
+        assert resp.status_code == 200
+        assert resp.data == {"applied": 5, "unknown": 1, "ignored": 1}
+        assert SmsMessage.objects.filter(status="DELIVERED", delivered_at__isnull=False).count() == 4
+        assert SmsMessage.objects.get(gateway_id="SMS-000004").error_code == "001"
+
+    def test_unusable_done_at_falls_back_to_now(self, api_client):
+        from apps.notifications.models import SmsMessage
+
+        SmsMessage.objects.create(gateway_id="SMS-BIG", phone="+250788000001")
+        SmsMessage.objects.create(gateway_id="SMS-NAN", phone="+250788000002")
+        body = ('{"receipts": [{"message_id": "SMS-BIG", "status": "DELIVRD", "done_at": 1e20},'
+                ' {"message_id": "SMS-NAN", "status": "DELIVRD", "done_at": NaN}]}')
+        resp = api_client.post("/api/notifications/dlr/", body, content_type="application/json",
+                               HTTP_X_DLR_TOKEN="test-dlr-token")
+        assert resp.status_code == 200 and resp.data["applied"] == 2
+        assert SmsMessage.objects.filter(status="DELIVERED", delivered_at__isnull=False).count() == 2
+
+    def test_final_status_is_not_overwritten_and_token_is_required(self, api_client):
+        from apps.notifications.models import SmsMessage
+
+        SmsMessage.objects.create(gateway_id="SMS-1", phone="+250788000001", status="DELIVERED")
+        assert self._dlr(api_client, [{"message_id": "SMS-1", "status": "EXPIRED"}]).data["ignored"] == 1
+        assert SmsMessage.objects.get(gateway_id="SMS-1").status == "DELIVERED"
+        assert self._dlr(api_client, [], token="wrong").status_code == 403
+
+    def test_carrier_delivery_rates(self, admin_client):
+        from apps.notifications.models import SmsMessage
+        from apps.notifications.receipts import carrier_for
+
+        for i, (phone, status) in enumerate([
+            ("+250788000001", "DELIVERED"), ("0789000002", "DELIVERED"), ("+250788000003", "FAILED"),
+            ("+250722000004", "DELIVERED"), ("+250733000005", "ACCEPTED"),
+        ]):
+            SmsMessage.objects.create(gateway_id=f"S{i}", phone=phone, carrier=carrier_for(phone), status=status)
+
+        resp = admin_client.get("/api/notifications/sms/stats/?days=7")
+        by_carrier = {row["carrier"]: row for row in resp.data["carriers"]}
+        assert by_carrier["MTN"]["sent"] == 3 and by_carrier["MTN"]["delivery_rate"] == pytest.approx(2 / 3, abs=1e-4)
+        assert (by_carrier["AIRTEL"]["delivered"], by_carrier["AIRTEL"]["pending"]) == (1, 1)
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# ANALYTICS — Daily fact cube
+# ═══════════════════════════════════════════════════════════════════════════════
+
+@pytest.fixture
+def book(make_shipment):
+    """n shipments recorded in the cube and sketches as the booking service would; the first `paid` get a SUCCESS payment."""
+    from apps.analytics.cube import record_bookings, record_payment
+    from apps.analytics.sketches import record_senders
+
+    def _make(sender, zones, commodity, n, kg="100", amount="5900", paid=0):
+        shipments = [
+            make_shipment(sender, zones, commodity, weight_kg=Decimal(kg), total_amount=Decimal(amount))
+            for _ in range(n)
+        ]
+        record_bookings(shipments)
+        record_senders(shipments)
+        for shipment in shipments[:paid]:
+            record_payment(_pay(shipment))
+        return shipments
+    return _make
+
+
+@pytest.mark.django_db
+class TestAnalyticsCube:
+
+    def test_views_read_the_cube_not_shipments(self, admin_client, sender, zones, commodity, book):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        book(sender, zones, commodity, 3, kg="250", paid=2)
+        with CaptureQueriesContext(connection) as queries:
+            routes  = admin_client.get("/api/analytics/routes/top/").data
+            goods   = admin_client.get("/api/analytics/commodities/breakdown/").data
+            heat    = admin_client.get("/api/analytics/revenue/heatmap/").data
+            monthly = admin_client.get("/api/analytics/monthly-summary/").data
+        assert not any('"shipments_shipment"' in q["sql"] or '"payments_payment"' in q["sql"] for q in queries)
+
+        assert (routes[0]["origin"], routes[0]["shipment_count"], routes[0]["total_weight_kg"]) == ("Kigali Central", 3, Decimal("750"))
+        assert (goods[0]["commodity_name"], goods[0]["count"], goods[0]["total_value"]) == ("Potatoes", 3, Decimal("30000"))
+        assert (heat[0]["zone"], heat[0]["shipment_count"], heat[0]["total_revenue"]) == ("Kigali Central", 2, Decimal("11800"))
+        assert (monthly[0]["count"], monthly[0]["total_revenue"]) == (3, Decimal("17700"))
+
+    def test_compaction_folds_past_days_and_keeps_totals(self, sender, zones, commodity, book):
+        from datetime import timedelta
+        from django.db.models import Sum
+        from django.utils import timezone
+        from apps.analytics.cube import compact
+        from apps.analytics.models import DailyShipmentFact
+
+        book(sender, zones, commodity, 4, paid=3)
+        before = DailyShipmentFact.objects.aggregate(b=Sum("bookings"), r=Sum("revenue"))
+        assert DailyShipmentFact.objects.count() == 4                      # 1 booking delta + 3 payment deltas
+
+        assert compact() == 0                                              # today's deltas stay as they are
+        assert compact(before=timezone.localdate() + timedelta(days=1)) == 3
+        assert DailyShipmentFact.objects.get().compacted is True
+        assert DailyShipmentFact.objects.aggregate(b=Sum("bookings"), r=Sum("revenue")) == before
+
+    def test_rebuild_matches_incremental_maintenance(self, sender, zones, commodity, book):
+        from apps.analytics.cube import rebuild
+        from apps.analytics.models import DailyShipmentFact
+
+        book(sender, zones, commodity, 5, kg="120.50", paid=4)
+        fields      = ("bookings", "weight_kg", "declared_value", "booked_amount", "payments", "revenue")
+        incremental = DailyShipmentFact.objects.values(*fields)
+        totals      = {f: sum(row[f] for row in incremental) for f in fields}
+
+        assert rebuild() == 1
+        assert DailyShipmentFact.objects.values(*fields).get() == totals
+
+    def test_rebuild_range_bounds_booking_timestamps(self, sender, zones, commodity, book):
+        from datetime import timedelta
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from django.utils import timezone
+        from apps.analytics.cube import rebuild
+        from apps.analytics.models import DailyShipmentFact
+        from apps.shipments.models import Shipment
+
+        [old] = book(sender, zones, commodity, 1)
+        book(sender, zones, commodity, 2)
+        today = timezone.localdate()
+        Shipment.objects.filter(pk=old.pk).update(created_at=old.created_at - timedelta(days=3))
+
+        with CaptureQueriesContext(connection) as ctx:
+            assert rebuild(today, today) == 1
+        scan = next(q["sql"] for q in ctx.captured_queries if "shipments_shipment" in q["sql"])
+        assert "created_at\" >=" in scan and "created_at\" <" in scan
+        assert DailyShipmentFact.objects.filter(day=today).get().bookings == 2
+
+
+    def test_booking_committed_during_rebuild_is_kept(self, sender, zones, commodity, book):
+        from django.db.models import Sum
+        from apps.analytics import cube
+        from apps.analytics.models import DailyShipmentFact
+
+        book(sender, zones, commodity, 2, paid=1)
+        read = cube._totals
+
+        def read_then_book(day):
+            totals = read(day)
+            book(sender, zones, commodity, 1)          # lands between the read and the swap
+            return totals
+
+        with patch("apps.analytics.cube._totals", side_effect=read_then_book):
+            cube.rebuild()
+        assert DailyShipmentFact.objects.aggregate(b=Sum("bookings"), p=Sum("payments")) == {"b": 3, "p": 1}
+        assert DailyShipmentFact.objects.filter(compacted=False).count() == 1          # the late delta
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# OPS — Stale-while-revalidate response cache
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class _Counter:
+    """A registered aggregation that counts how often it is computed."""
+
+    def __init__(self, name, ttl=10):
+        from apps.ops.caching import cached_view
+        self.calls = 0
+        self.name  = name
+        cached_view(name, ttl=ttl)(self)
+
+    def __call__(self, **params):
+        self.calls += 1
+        return {"calls": self.calls, **params}
+
+
+class TestStaleWhileRevalidate:
+
+    def test_miss_then_hit_per_params(self):
+        from apps.ops.caching import fetch
+
+        agg = _Counter("test.counter")
+        assert fetch(agg.name) == ({"calls": 1}, "MISS")
+        assert fetch(agg.name) == ({"calls": 1}, "HIT")
+        assert fetch(agg.name, {"province": "Kigali"}) == ({"calls": 2, "province": "Kigali"}, "MISS")
+        assert agg.calls == 2
+
+    def test_stale_entry_is_served_while_refreshed_in_background(self):
+        from apps.ops import caching
+
+        agg   = _Counter("test.stale", ttl=10)
+        clock = MagicMock(return_value=1_000.0)
+        with patch.object(caching.time, "time", clock):
+            caching.fetch(agg.name)
+            clock.return_value = 1_011.0                               # past the TTL, inside the stale window
+            with patch("apps.ops.tasks.refresh_cached_view.delay") as delay:
+                assert caching.fetch(agg.name) == ({"calls": 1}, "STALE")
+                assert caching.fetch(agg.name) == ({"calls": 1}, "STALE")
+            delay.assert_called_once_with(agg.name, agg.__module__, {})   # one refresh, not one per reader
+
+            caching.refresh(agg.name, agg.__module__, {})
+            assert caching.fetch(agg.name) == ({"calls": 2}, "HIT")
+
+    def test_concurrent_miss_waits_for_the_leader(self):
+        from django.core.cache import cache
+        from apps.ops import caching
+
+        agg = _Counter("test.single_flight")
+        key = caching._key(agg.name, {})
+        cache.add(f"{key}:lock", 1)                                   # another worker is computing
+
+        def leader():
+            cache.set(key, {"data": {"calls": 0, "from": "leader"}, "fresh_until": 10 ** 12})
+
+        timer = threading.Timer(0.1, leader)
+        timer.start()
+        try:
+            assert caching.fetch(agg.name) == ({"calls": 0, "from": "leader"}, "HIT")
+        finally:
+            timer.join()
+        assert agg.calls == 0
+
+
+@pytest.mark.django_db
+class TestCachedDashboards:
+
+    def test_analytics_and_dashboard_are_served_from_cache(self, admin_client, sender, zones, commodity, django_assert_num_queries, book):
+        book(sender, zones, commodity, 2)
+        first = admin_client.get("/api/analytics/routes/top/")
+        assert first["X-Cache"] == "MISS" and first.data[0]["shipment_count"] == 2
+
+        book(sender, zones, commodity, 1)
+        with django_assert_num_queries(0):
+            cached = admin_client.get("/api/analytics/routes/top/")
+        assert cached["X-Cache"] == "HIT" and cached.data[0]["shipment_count"] == 2
+
+        assert admin_client.get("/api/admin/dashboard/summary/")["X-Cache"] == "MISS"
+        assert admin_client.get("/api/admin/dashboard/summary/")["X-Cache"] == "HIT"
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# ANALYTICS — Date-range and dimension filters
+# ═══════════════════════════════════════════════════════════════════════════════
+
+@pytest.mark.django_db
+class TestAnalyticsFilters:
+
+    def _history(self, book, sender, zones, commodity):
+        from datetime import date
+        from apps.analytics.models import DailyShipmentFact
+
+        book(sender, zones, commodity, 2)
+        book(sender, zones[::-1], commodity, 1)                           # Musanze → Kigali
+        DailyShipmentFact.objects.filter(origin_zone=zones[1]).update(day=date(2025, 3, 10))
+
+    def test_range_and_dimension_filters(self, admin_client, sender, zones, commodity, book):
+        from django.utils import timezone
+
+        self._history(book, sender, zones, commodity)
+        today = timezone.localdate().isoformat()
+
+        season = admin_client.get("/api/analytics/routes/top/?from=2025-03-01&to=2025-03-31").data
+        assert [(r["origin"], r["shipment_count"]) for r in season] == [("Musanze", 1)]
+        recent = admin_client.get(f"/api/analytics/commodities/breakdown/?from={today}").data
+        assert recent[0]["count"] == 2
+        assert admin_client.get("/api/analytics/routes/top/?province=northern").data[0]["origin"] == "Musanze"
+        assert admin_client.get("/api/analytics/monthly-summary/?shipment_type=international").data == []
+        assert admin_client.get(f"/api/analytics/routes/top/?commodity={commodity.pk}").data[0]["shipment_count"] == 2
+        assert admin_client.get("/api/analytics/routes/top/?commodity=Coffee").data == []
+
+    def test_invalid_filters_are_rejected(self, admin_client):
+        assert admin_client.get("/api/analytics/routes/top/?from=last-week").status_code == 400
+        assert admin_client.get("/api/analytics/routes/top/?from=2026-02-01&to=2026-01-01").status_code == 400
+        assert admin_client.get("/api/analytics/revenue/heatmap/?shipment_type=AIR").status_code == 400
+
+    def test_leaderboard_filters_on_delivery_day(self, admin_client, sender, driver_agent, zones, commodity, book):
+        from datetime import datetime, timedelta
+        from django.utils import timezone
+        from apps.analytics import drivers
+        from apps.shipments.models import Shipment
+
+        shipments = book(sender, zones, commodity, 2)
+        late_evening = timezone.make_aware(datetime(2026, 5, 31, 23, 30))
+        Shipment.objects.filter(pk=shipments[0].pk).update(status="DELIVERED", driver=driver_agent, delivered_at=late_evening)
+        Shipment.objects.filter(pk=shipments[1].pk).update(status="DELIVERED", driver=driver_agent,
+                                                           delivered_at=late_evening + timedelta(hours=1))
+        drivers.rebuild()
+        may = admin_client.get("/api/analytics/drivers/leaderboard/?from=2026-05-01&to=2026-05-31").data
+        assert may[0]["deliveries"] == 1                                   # 00:30 on 1 June is June
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# ANALYTICS — Bulk dataset exports (MINICOM / RRA)
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def _export_rows(tmp_path, name):
+    import csv
+    import gzip
+
+    with gzip.open(tmp_path / name, "rt", newline="") as fh:
+        return list(csv.DictReader(fh))
+
+
+@pytest.mark.django_db
+class TestBulkExport:
+
+    @pytest.fixture(autouse=True)
+    def _storage(self, settings, tmp_path):
+        settings.EXPORT_STORAGE = {
+            "BACKEND": "django.core.files.storage.FileSystemStorage",
+            "OPTIONS": {"location": str(tmp_path)},
+        }
+
+    def test_csv_export_is_month_partitioned_and_anonymised(self, tmp_path, sender, zones, commodity, book):
+        from datetime import datetime
+        from django.utils import timezone
+        from apps.analytics.export import export_dataset
+        from apps.shipments.models import Shipment
+
+        shipments = book(sender, zones, commodity, 3, paid=1)
+        april = timezone.make_aware(datetime(2025, 4, 15, 9, 0))
+        Shipment.objects.filter(pk=shipments[2].pk).update(created_at=april, updated_at=april)
+
+        result = export_dataset("shipments")
+        month  = timezone.localdate().strftime("%Y-%m")
+        assert result["rows"] == 3
+        assert result["files"] == [
+            "shipments/month=2025-04/part-00001.csv.gz",
+            f"shipments/month={month}/part-00002.csv.gz",
+        ]
+        rows = _export_rows(tmp_path, result["files"][1])
+        assert len(rows) == 2 and rows[0]["origin_zone"] == zones[0].name and rows[0]["weight_kg"] == "100.00"
+        assert not {"tracking_code", "sender", "driver", "notes"} & set(rows[0])
+
+        payments = export_dataset("payments")
+        paid     = _export_rows(tmp_path, payments["files"][0])
+        assert [p["shipment_id"] for p in paid] == [str(shipments[0].pk)]
+        assert "payer_phone" not in paid[0] and "gateway_ref" not in paid[0]
+
+    def test_incremental_export_resumes_from_watermark(self, settings, tmp_path, sender, zones, commodity, book):
+        from apps.analytics.export import export_dataset
+        from apps.analytics.models import ExportWatermark
+
+        settings.EXPORT_FILE_ROWS = 2
+        book(sender, zones, commodity, 3)
+        first = export_dataset("shipments")
+        assert first["rows"] == 3 and len(first["files"]) == 2        # split at EXPORT_FILE_ROWS
+
+        assert export_dataset("shipments") == {"rows": 0, "files": []}
+        later = book(sender, zones, commodity, 1)
+        second = export_dataset("shipments")
+        assert second["files"][0].endswith("part-00003.csv.gz")
+        assert [r["shipment_id"] for r in _export_rows(tmp_path, second["files"][0])] == [str(later[0].pk)]
+
+        mark = ExportWatermark.objects.get(dataset="shipments", format="csv")
+        assert (mark.rows, mark.files, mark.last_id) == (4, 3, later[0].pk)
+
+    def test_status_change_after_export_is_exported_again(self, tmp_path, sender, zones, commodity, book):
+        from django.utils import timezone
+        from apps.analytics.export import export_dataset
+        from apps.shipments.models import Shipment
+
+        shipment = book(sender, zones, commodity, 1)[0]
+        first    = export_dataset("shipments")
+        assert _export_rows(tmp_path, first["files"][0])[0]["delivered_at"] == ""
+
+        shipment.status, shipment.delivered_at = Shipment.Status.DELIVERED, timezone.now()
+        shipment.save(update_fields=["status", "delivered_at", "updated_at"])
+        second = export_dataset("shipments")
+        rows   = _export_rows(tmp_path, second["files"][0])
+        assert [(r["shipment_id"], r["status"]) for r in rows] == [(str(shipment.pk), "DELIVERED")]
+        assert rows[0]["delivered_at"]
+
+    def test_rows_are_read_in_keyset_pages(self, settings, tmp_path, sender, zones, commodity, book):
+        from apps.analytics.export import export_dataset
+
+        settings.EXPORT_CHUNK = 2
+        shipments = book(sender, zones, commodity, 5)
+        result    = export_dataset("shipments")
+        ids       = [r["shipment_id"] for r in _export_rows(tmp_path, result["files"][0])]
+        assert result["rows"] == 5
+        assert sorted(ids) == sorted(str(s.pk) for s in shipments) and len(set(ids)) == 5
+
+    def test_unsettled_rows_wait_for_the_next_run(self, settings, sender, zones, commodity, book):
+        from apps.analytics.export import export_dataset
+
+        settings.EXPORT_SETTLE_SECONDS = 300
+        book(sender, zones, commodity, 2)
+        assert export_dataset("shipments")["rows"] == 0
+
+    def test_parquet_export(self, tmp_path, sender, zones, commodity, book):
+        pq = pytest.importorskip("pyarrow.parquet")
+        from apps.analytics.export import export_dataset
+
+        book(sender, zones, commodity, 3, paid=2)
+        result = export_dataset("payments", "parquet")
+        table  = pq.read_table(tmp_path / result["files"][0])
+        assert table.num_rows == 2 and "payer_phone" not in table.column_names
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# ANALYTICS — Distinct-count sketches (HyperLogLog)
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class TestDistinctSketch:
+
+    def test_estimates_within_error_and_merges_without_double_counting(self):
+        from apps.analytics.hll import DistinctSketch
+
+        a, b = DistinctSketch(), DistinctSketch()
+        for i in range(30000):
+            a.add(f"sender-{i}")
+        for i in range(20000, 50000):
+            b.add(f"sender-{i}")
+        assert abs(a.count() - 30000) <= 3 * a.standard_error * 30000
+        assert not a.add("sender-7")                                       # seen: no register grows
+
+        union = DistinctSketch.from_bytes(a.to_bytes()).merge_bytes(b.to_bytes())
+        assert abs(union.count() - 50000) <= 3 * union.standard_error * 50000
+
+    def test_small_sketches_are_exact_and_sparse(self):
+        from apps.analytics.hll import DistinctSketch
+
+        sketch = DistinctSketch()
+        for value in ["a", "b", "c", "a", "b"]:
+            sketch.add(value)
+        blob = sketch.to_bytes()
+        assert sketch.count() == 3 and len(blob) == 2 + 3 * 3
+        assert DistinctSketch.from_bytes(blob).registers == sketch.registers
+        assert DistinctSketch().count() == 0
+
+
+@pytest.mark.django_db
+class TestUniqueCountEndpoints:
+
+    def test_unique_senders_per_corridor_and_zone(self, admin_client, make_agent, zones, commodity, book):
+        senders = [make_agent() for _ in range(3)]
+        for sender in senders:
+            book(sender, zones, commodity, 2)
+        book(senders[0], zones[::-1], commodity, 1)
+
+        corridors = admin_client.get("/api/analytics/unique/corridors/").data
+        assert [(r["origin"], r["unique"]) for r in corridors] == [(zones[0].name, 3), (zones[1].name, 1)]
+        assert "margin_95" in corridors[0]
+        by_zone = {r["zone"]: r["unique"] for r in admin_client.get("/api/analytics/unique/zones/").data}
+        assert by_zone == {zones[0].name: 3, zones[1].name: 3}
+        northern = admin_client.get("/api/analytics/unique/zones/?province=northern").data
+        assert [r["zone"] for r in northern] == [zones[1].name]
+
+    def test_day_range_merges_without_double_counting(self, admin_client, sender, make_agent, zones, commodity, book):
+        from datetime import date
+        from apps.analytics.models import CorridorSketch
+
+        book(sender, zones, commodity, 1)
+        CorridorSketch.objects.update(day=date(2025, 3, 1))
+        book(sender, zones, commodity, 1)
+        book(make_agent(), zones, commodity, 1)
+
+        assert admin_client.get("/api/analytics/unique/corridors/?from=2025-01-01").data[0]["unique"] == 2
+        assert admin_client.get("/api/analytics/unique/corridors/?to=2025-12-31").data[0]["unique"] == 1
+
+    def test_driver_counts_and_rebuild_match_incremental(self, admin_client, sender, driver_agent, zones, commodity, book):
+        from django.utils import timezone
+        from apps.analytics import sketches
+        from apps.analytics.models import CorridorSketch, ZoneSketch
+
+        for shipment in book(sender, zones, commodity, 2):
+            shipment.driver, shipment.assigned_at = driver_agent, timezone.now()
+            shipment.save(update_fields=["driver", "assigned_at"])
+            sketches.record_driver(shipment)
+        drivers = admin_client.get("/api/analytics/unique/corridors/?metric=drivers").data
+        assert drivers[0]["unique"] == 1
+
+        def snapshot():
+            return sorted(
+                (m._meta.model_name, str(key), metric, bytes(blob))
+                for m, field in ((CorridorSketch, "origin_zone_id"), (ZoneSketch, "zone_id"))
+                for key, metric, blob in m.objects.values_list(field, "metric", "sketch")
+            )
+        before = snapshot()
+        sketches.rebuild()
+        assert snapshot() == before
+
+    def test_rebuild_replaces_each_day_and_clears_stale_ones(self, sender, make_agent, zones, commodity, book):
+        from datetime import timedelta
+        from django.utils import timezone
+        from apps.analytics import sketches
+        from apps.analytics.models import CorridorSketch, ZoneSketch
+        from apps.shipments.models import Shipment
+
+        early = book(sender, zones, commodity, 1)[0]
+        book(make_agent(), zones, commodity, 1)
+        Shipment.objects.filter(pk=early.pk).update(created_at=timezone.now() - timedelta(days=3))
+        today = timezone.localdate()
+        CorridorSketch.objects.update(day=today - timedelta(days=30))                 # stale: nothing booked then
+        ZoneSketch.objects.update(day=today - timedelta(days=30))
+
+        with patch("apps.analytics.sketches._rebuild_day", wraps=sketches._rebuild_day) as per_day:
+            sketches.rebuild()
+        assert per_day.call_count == 4
+        assert sorted(CorridorSketch.objects.values_list("day", flat=True)) == [today - timedelta(days=3), today]
+        assert ZoneSketch.objects.filter(day=today - timedelta(days=30)).count() == 0
+
+    def test_unsupported_filters_are_rejected(self, admin_client):
+        assert admin_client.get("/api/analytics/unique/corridors/?metric=buyers").status_code == 400
+        assert admin_client.get("/api/analytics/unique/zones/?commodity=1").status_code == 400
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# ANALYTICS — Driver delivery stats (on-time rate, duration percentiles)
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class TestQuantileSketch:
+
+    def test_quantiles_within_relative_accuracy_after_merge(self):
+        import math
+        import random
+        from apps.analytics.quantiles import QuantileSketch
+
+        rng    = random.Random(7)
+        values = [rng.uniform(600, 36000) for _ in range(4000)]
+        early, late = QuantileSketch(), QuantileSketch()
+        for v in values[:1500]:
+            early.add(v)
+        for v in values[1500:]:
+            late.add(v)
+        merged = QuantileSketch.from_dict(early.to_dict()).merge(late)
+
+        ordered = sorted(values)
+        for q in (0.5, 0.9):
+            exact = ordered[math.ceil(q * len(ordered)) - 1]                 # nearest rank
+            assert abs(merged.quantile(q) - exact) <= 0.011 * exact
+        assert merged.count == 4000 and QuantileSketch().quantile(0.5) is None
+
+
+@pytest.mark.django_db
+class TestDriverDeliveryStats:
+
+    def _deliver(self, make_shipment, sender, driver, zones, commodity, code, hours):
+        from datetime import timedelta
+        from django.utils import timezone
+        from apps.shipments.models import Shipment
+        from apps.shipments.service import BookingService
+
+        shipment = make_shipment(sender, zones, commodity, code, driver=driver, status="IN_TRANSIT")
+        Shipment.objects.filter(pk=shipment.pk).update(assigned_at=timezone.now() - timedelta(hours=hours))
+        assert BookingService(notification_service=MagicMock()).record_transition(code, "DELIVERED")
+
+    def test_delivery_updates_on_time_rate_and_percentiles(self, admin_client, sender, driver_agent, zones, commodity, make_shipment):
+        from apps.shipments.models import TransitStat
+
+        TransitStat.objects.create(origin_zone=zones[0], dest_zone=zones[1], samples=5,
+                                   median_s=3 * 3600, p90_s=4 * 3600)
+        self._deliver(make_shipment, sender, driver_agent, zones, commodity, "DDS-001", hours=2)
+        self._deliver(make_shipment, sender, driver_agent, zones, commodity, "DDS-002", hours=5)
+
+        [row] = admin_client.get("/api/analytics/drivers/leaderboard/").data
+        assert (row["driver_name"], row["vehicle"], row["deliveries"]) == ("Driver Dave", "RAB 123 A", 2)
+        assert row["on_time_rate"] == 0.5
+        assert abs(row["p50_minutes"] - 120) <= 2 and abs(row["p90_minutes"] - 300) <= 3
+
+    def test_corridor_without_history_is_unrated(self, admin_client, sender, driver_agent, zones, commodity, make_shipment):
+        self._deliver(make_shipment, sender, driver_agent, zones, commodity, "DDS-003", hours=1)
+        [row] = admin_client.get("/api/analytics/drivers/leaderboard/").data
+        assert row["deliveries"] == 1 and row["on_time_rate"] is None and row["p50_minutes"] == 60
+
+    def test_ranking_reads_stats_and_rebuild_matches(self, admin_client, sender, driver_agent, make_agent,
+                                                     zones, commodity, django_assert_max_num_queries, make_shipment):
+        from apps.analytics import drivers
+        from apps.analytics.models import DriverDeliveryStats
+
+        other = make_agent(role="DRIVER", full_name="Driver Eve")
+        self._deliver(make_shipment, sender, other, zones, commodity, "DDS-004", hours=3)
+        for i in range(2):
+            self._deliver(make_shipment, sender, driver_agent, zones, commodity, f"DDS-01{i}", hours=2)
+
+        with django_assert_max_num_queries(3):                              # sums, names, sketches
+            board = drivers.leaderboard()
+        assert [(r["driver_name"], r["deliveries"], r["vehicle"]) for r in board] == [
+            ("Driver Dave", 2, "RAB 123 A"), ("Driver Eve", 1, None),
+        ]
+
+        before = sorted(DriverDeliveryStats.objects.values_list("driver_id", "day", "deliveries", "total_kg", "durations"))
+        drivers.rebuild()
+        assert sorted(DriverDeliveryStats.objects.values_list("driver_id", "day", "deliveries", "total_kg", "durations")) == before
+
+    def test_rebuild_walks_one_delivery_day_at_a_time(self, sender, driver_agent, zones, commodity, make_shipment):
+        from datetime import timedelta
+        from django.utils import timezone
+        from apps.analytics import drivers
+        from apps.analytics.models import DriverDeliveryStats
+        from apps.shipments.models import Shipment
+
+        for code in ("DDS-030", "DDS-031"):
+            self._deliver(make_shipment, sender, driver_agent, zones, commodity, code, hours=2)
+        Shipment.objects.filter(tracking_code="DDS-030").update(
+            delivered_at=timezone.now() - timedelta(days=2), assigned_at=timezone.now() - timedelta(days=2, hours=2),
+        )
+        stale = DriverDeliveryStats.objects.get()
+        DriverDeliveryStats.objects.create(
+            driver=driver_agent, day=stale.day - timedelta(days=10), origin_zone=zones[0],
+            commodity=commodity, shipment_type=stale.shipment_type, deliveries=7,
+        )
+
+        with patch("apps.analytics.drivers._rebuild_day", wraps=drivers._rebuild_day) as per_day:
+            assert drivers.rebuild() == 2
+        assert per_day.call_count == 3                                      # two days ago → today, empty day included
+        today = timezone.localdate()
+        assert sorted(DriverDeliveryStats.objects.values_list("day", "deliveries")) == [
+            (today - timedelta(days=2), 1), (today, 1),
+        ]
+
+    def test_leaderboard_takes_dimension_filters(self, admin_client, sender, driver_agent, zones, commodity, make_shipment):
+        self._deliver(make_shipment, sender, driver_agent, zones, commodity, "DDS-020", hours=2)
+        origin = zones[0]
+
+        [row] = admin_client.get(f"/api/analytics/drivers/leaderboard/?province={origin.province}").data
+        assert row["deliveries"] == 1
+        assert admin_client.get(f"/api/analytics/drivers/leaderboard/?commodity={commodity.pk}").data[0]["deliveries"] == 1
+        assert admin_client.get("/api/analytics/drivers/leaderboard/?shipment_type=INTERNATIONAL").data == []
+        assert admin_client.get("/api/analytics/drivers/leaderboard/?province=Nowhere").data == []